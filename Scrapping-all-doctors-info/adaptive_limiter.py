@@ -0,0 +1,168 @@
+# adaptive_limiter.py
+# AIMD pacing for page loads: how many may be in flight and how far apart
+# they start.
+#
+# Every navigation goes through AdaptiveLimiter.slot() and reports back how
+# it went. Fast successes raise the concurrency limit additively (+1/limit
+# per success, so about +1 per round of requests) and shrink the gap between
+# request starts a little. Responses slower than the target latency
+# back off gently. Timeouts, HTTP 429/5xx and challenge pages back off hard:
+# the limit halves and the gap doubles. Only requests started after the last
+# back-off can trigger another one, so a burst of failures from requests
+# already in flight counts once.
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 4
+MIN_DELAY, MAX_DELAY = 0.3, 30.0  # seconds between request starts
+START_DELAY = 1.0
+TARGET_LATENCY_S = 6.0
+DELAY_STEP = 0.05       # additive decrease of the gap per fast success
+SLOW_FACTOR = 0.9       # limit multiplier for a slow response
+BACKOFF_FACTOR = 0.5    # limit multiplier for a timeout / challenge / 429 / 5xx
+JITTER = 0.25           # gap is randomised by +-25%
+
+# markers of a Cloudflare (or similar) interstitial instead of the real page
+CHALLENGE_STATUSES = {403, 429, 503}
+CHALLENGE_TITLES = ("just a moment", "attention required", "checking your browser")
+
+
+def is_challenge(status: Optional[int], headers: Optional[Dict[str, str]] = None,
+                 title: Optional[str] = None) -> bool:
+    headers = headers or {}
+    if headers.get("cf-mitigated") == "challenge":
+        return True
+    if status in CHALLENGE_STATUSES and "cloudflare" in (headers.get("server") or "").lower():
+        return True
+    return bool(title) and title.strip().lower().startswith(CHALLENGE_TITLES)
+
+
+class AdaptiveLimiter:
+    def __init__(self, min_concurrency: int = MIN_CONCURRENCY, max_concurrency: int = MAX_CONCURRENCY,
+                 min_delay: float = MIN_DELAY, max_delay: float = MAX_DELAY,
+                 start_delay: float = START_DELAY, target_latency: float = TARGET_LATENCY_S,
+                 log=print):
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.min_delay, self.max_delay = min_delay, max(min_delay, max_delay)
+        self.target_latency = target_latency
+        self.limit = float(self.min_concurrency)
+        self.delay = min(self.max_delay, max(self.min_delay, start_delay))
+        self.log = log
+        self.in_flight = 0
+        self._next_start = 0.0
+        self._last_backoff = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+        self._latencies: List[float] = []
+        self.counts = {"ok": 0, "slow": 0, "timeout": 0, "challenge": 0, "error": 0, "backoffs": 0}
+
+    # ---------- pacing ----------
+    def _condition(self) -> asyncio.Condition:
+        # created lazily so the limiter can be built outside the event loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    @asynccontextmanager
+    async def slot(self):
+        # async with limiter.slot() as ticket: ...; ticket.ok() / .timeout() / ...
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            gap = self.delay * random.uniform(1 - JITTER, 1 + JITTER)
+            self._next_start = start + gap
+        if start > now:
+            await asyncio.sleep(start - now)
+        ticket = _Ticket(self, time.monotonic())
+        try:
+            yield ticket
+        except asyncio.CancelledError:
+            ticket.reported = True
+            raise
+        except Exception:
+            ticket.error()
+            raise
+        else:
+            ticket.ok()
+        finally:
+            async with cond:
+                self.in_flight -= 1
+                cond.notify_all()
+
+    async def pause(self):
+        # wait out the current gap, e.g. between cities
+        await asyncio.sleep(self.delay * random.uniform(1 - JITTER, 1 + JITTER))
+
+    # ---------- feedback ----------
+    def _increase(self):
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        self.delay = max(self.min_delay, self.delay - DELAY_STEP)
+
+    def _decrease(self, started: float, factor: float, delay_factor: float, reason: str):
+        if started < self._last_backoff:
+            return
+        self._last_backoff = time.monotonic()
+        self.counts["backoffs"] += 1
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        self.delay = min(self.max_delay, max(self.delay, self.min_delay, 0.1) * delay_factor)
+        self.log(f"[pacing] {reason}: backing off to {self.status()}")
+
+    def _report(self, kind: str, started: float):
+        latency = time.monotonic() - started
+        if kind == "ok" and latency > self.target_latency:
+            kind = "slow"
+        self.counts[kind] += 1
+        if kind in ("ok", "slow"):
+            self._latencies.append(latency)
+            del self._latencies[:-200]
+        if kind == "ok":
+            self._increase()
+        elif kind == "slow":
+            self._decrease(started, SLOW_FACTOR, 1.2, f"slow response ({latency:.1f}s)")
+        else:
+            self._decrease(started, BACKOFF_FACTOR, 2.0, kind)
+
+    def status(self) -> str:
+        lat = sorted(self._latencies)
+        p50 = f"{lat[len(lat) // 2]:.2f}s" if lat else "-"
+        return (f"concurrency {int(self.limit)} ({self.limit:.2f}, {self.in_flight} in flight), "
+                f"gap {self.delay:.2f}s, p50 {p50}, "
+                f"{self.counts['timeout']} timeouts, {self.counts['challenge']} challenges")
+
+    def stats(self) -> Dict:
+        out = dict(self.counts)
+        out.update({"limit": round(self.limit, 2), "delay_s": round(self.delay, 3)})
+        return out
+
+
+class _Ticket:
+    # outcome of one request; the first call wins. A slot left without a report
+    # counts as ok, one left by an exception as an error.
+    def __init__(self, limiter: AdaptiveLimiter, started: float):
+        self.limiter = limiter
+        self.started = started
+        self.reported = False
+
+    def _report(self, kind: str):
+        if not self.reported:
+            self.reported = True
+            self.limiter._report(kind, self.started)
+
+    def ok(self):
+        self._report("ok")
+
+    def timeout(self):
+        self._report("timeout")
+
+    def challenge(self):
+        self._report("challenge")
+
+    def error(self):
+        self._report("error")
@@ -0,0 +1,212 @@
+# browser_pool.py
+# Page reuse and context recycling for long Playwright crawls.
+#
+# Opening a fresh page for every profile and pagination probe, all on one
+# BrowserContext that lives for the whole run, lets Chromium's memory grow for
+# hours. BrowserPool hands out pages from a small idle set instead (a released
+# page is parked on about:blank, which drops the old document), and retires
+# the context pages come from after MAX_NAVIGATIONS page loads or when the
+# browser's process tree grows past MAX_RSS_MB. A retired context is closed
+# as soon as its last page is released, which frees its renderer processes.
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+POOL_PAGES = 4              # idle pages kept for reuse
+MAX_NAVIGATIONS = 200       # page loads per context before it is recycled
+MAX_RSS_MB = 1500           # recycle when this process tree (incl. Chromium) is larger
+RSS_CHECK_EVERY = 10        # page releases between RSS samples
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    # RSS of this process and all descendants (the Playwright driver and Chromium)
+    pid = pid or os.getpid()
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            procs = [proc] + proc.children(recursive=True)
+            return round(sum(p.memory_info().rss for p in procs if p.is_running()) / 2**20, 1)
+        except psutil.Error:
+            return None
+    # Linux without psutil: walk /proc for the descendants of pid
+    if not os.path.isdir("/proc"):
+        return None
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(")") + 2:].split()
+        ppid, rss = int(fields[1]), int(fields[21])
+        children.setdefault(ppid, []).append(int(entry))
+        rss_pages[int(entry)] = rss
+    total, todo = 0, [pid]
+    while todo:
+        p = todo.pop()
+        total += rss_pages.get(p, 0)
+        todo.extend(children.get(p, []))
+    return round(total * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+
+class _Slot:
+    # one BrowserContext and its bookkeeping
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.navigations = 0
+        self.in_use = 0
+        self.retired = False
+        self.created = time.monotonic()
+
+
+class BrowserPool:
+    def __init__(self, browser: Browser, size: int = POOL_PAGES,
+                 max_navigations: int = MAX_NAVIGATIONS, max_rss_mb: Optional[float] = MAX_RSS_MB,
+                 context_options: Optional[Dict] = None, init_script: Optional[str] = None):
+        self.browser = browser
+        self.size = size
+        self.max_navigations = max_navigations
+        self.max_rss_mb = max_rss_mb
+        self.context_options = context_options or {}
+        self.init_script = init_script
+        self._slot: Optional[_Slot] = None
+        self._idle: List[Tuple[_Slot, Page]] = []
+        self._lock = asyncio.Lock()
+        self._releases = 0
+        self._stats = {
+            "contexts_created": 0, "contexts_recycled": 0, "pages_created": 0,
+            "pages_reused": 0, "navigations": 0, "recycled_for_navigations": 0,
+            "recycled_for_rss": 0, "rss_mb": None, "peak_rss_mb": None,
+        }
+
+    # ---------- contexts ----------
+    async def context(self) -> BrowserContext:
+        # the context new pages currently come from (e.g. for context.request)
+        return (await self._current_slot()).context
+
+    async def _current_slot(self) -> _Slot:
+        async with self._lock:
+            if self._slot is None or self._slot.retired:
+                context = await self.browser.new_context(**self.context_options)
+                if self.init_script:
+                    await context.add_init_script(self.init_script)
+                self._slot = _Slot(context)
+                self._stats["contexts_created"] += 1
+            return self._slot
+
+    async def _retire(self, slot: _Slot, reason: str):
+        if slot.retired:
+            return
+        slot.retired = True
+        self._stats["contexts_recycled"] += 1
+        self._stats[f"recycled_for_{reason}"] += 1
+        keep = []
+        for s, page in self._idle:
+            if s is slot:
+                await self._close_page(page)
+            else:
+                keep.append((s, page))
+        self._idle = keep
+        if slot.in_use == 0:
+            await self._close_context(slot)
+
+    async def _close_context(self, slot: _Slot):
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _close_page(page: Page):
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception:
+            pass
+
+    def _sample_rss(self) -> Optional[float]:
+        rss = process_tree_rss_mb()
+        if rss is not None:
+            self._stats["rss_mb"] = rss
+            self._stats["peak_rss_mb"] = max(rss, self._stats["peak_rss_mb"] or 0)
+        return rss
+
+    # ---------- pages ----------
+    async def _acquire(self) -> Tuple[_Slot, Page]:
+        while self._idle:
+            slot, page = self._idle.pop()
+            if slot.retired or page.is_closed():
+                await self._close_page(page)
+                continue
+            self._stats["pages_reused"] += 1
+            slot.in_use += 1
+            return slot, page
+        slot = await self._current_slot()
+        slot.in_use += 1
+        try:
+            page = await slot.context.new_page()
+        except Exception:
+            slot.in_use -= 1
+            raise
+        self._stats["pages_created"] += 1
+        return slot, page
+
+    async def _release(self, slot: _Slot, page: Page, reusable: bool):
+        slot.in_use -= 1
+        self._releases += 1
+        if not slot.retired and slot.navigations >= self.max_navigations:
+            await self._retire(slot, "navigations")
+        if self.max_rss_mb and self._releases % RSS_CHECK_EVERY == 0:
+            rss = self._sample_rss()
+            if rss is not None and rss > self.max_rss_mb and self._slot is not None:
+                await self._retire(self._slot, "rss")
+
+        if reusable and not slot.retired and len(self._idle) < self.size and not page.is_closed():
+            try:
+                await page.goto("about:blank")
+                self._idle.append((slot, page))
+            except Exception:
+                await self._close_page(page)
+        else:
+            await self._close_page(page)
+        if slot.retired and slot.in_use == 0:
+            await self._close_context(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        # one navigation's worth of page: async with pool.page() as page: await page.goto(...)
+        slot, page = await self._acquire()
+        slot.navigations += 1
+        self._stats["navigations"] += 1
+        ok = False
+        try:
+            yield page
+            ok = True
+        finally:
+            await self._release(slot, page, reusable=ok)
+
+    def stats(self) -> Dict:
+        out = dict(self._stats)
+        out["idle_pages"] = len(self._idle)
+        out["context_navigations"] = self._slot.navigations if self._slot else 0
+        return out
+
+    async def close(self):
+        for _, page in self._idle:
+            await self._close_page(page)
+        self._idle = []
+        if self._slot is not None:
+            await self._close_context(self._slot)
+            self._slot = None
@@ -0,0 +1,212 @@
+# crawl_cluster.py
+# Coordinator / worker mode for the batch crawler, so a country-wide crawl can
+# run on several browsers, processes and machines at once.
+#
+#   python crawl_cluster.py coordinator [--queue URL]         discover cities, enqueue page 1 of each
+#   python crawl_cluster.py coordinator --sitemap             enqueue every listing URL in the sitemaps
+#   python crawl_cluster.py worker [--queue URL] [--processes 4] [--exit-when-idle 60]
+#   python crawl_cluster.py status [--queue URL]
+#   python crawl_cluster.py export [--queue URL] [--out doctors_knowledge_base.csv | --db PATH]
+#   python crawl_cluster.py coverage [--queue URL]            sitemap profiles missing from the results
+#
+# Each work unit is one listing page. A worker claims it with a lease, crawls
+# it with the same functions as scrape_doctors.main(), stores its rows
+# (idempotent: keyed on profile_url + hospital + consultation type), enqueues
+# the next page and marks the unit done. --queue takes a sqlite path (one
+# machine), postgresql:// or redis:// URL (several machines); see work_queue.py.
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from playwright.async_api import async_playwright, BrowserContext
+
+import kb_store
+import scrape_doctors as sd
+import sitemap
+from html_archive import HtmlArchive
+from reparse import city_from_url
+from work_queue import DEFAULT_QUEUE, LEASE_SECONDS, listing_unit, open_queue
+
+QUEUE_URL = os.getenv("MARHAM_QUEUE", DEFAULT_QUEUE)
+POLL_SECONDS = 5.0
+MISSING_FILE = "sitemap_missing_profiles.txt"
+
+
+async def new_context(p):
+    # pages come from a per-process BrowserPool (sd.open_page), so long-running
+    # workers recycle their browser context instead of growing without bound;
+    # each process paces its own page loads (sd.LIMITER)
+    browser = await p.chromium.launch(headless=sd.HEADLESS)
+    sd.POOL = sd.new_pool(browser)
+    sd.LIMITER = sd.new_limiter()
+    context = await sd.POOL.context()
+    return browser, context
+
+
+# ---------- Coordinator ----------
+async def coordinate(queue_url: str) -> int:
+    queue = open_queue(queue_url)
+    async with async_playwright() as p:
+        browser, context = await new_context(p)
+        cities = await sd.discover_city_links(context)
+        await browser.close()
+    if not cities:
+        print("No cities discovered — run with HEADLESS=False to bypass Cloudflare.")
+        return 0
+    if sd.CITY_LIMIT:
+        cities = cities[:sd.CITY_LIMIT]
+    added = queue.enqueue(listing_unit(name, url) for name, url in cities)
+    print(f"Discovered {len(cities)} cities; enqueued {added} new units. Queue: {queue.stats()}")
+    return added
+
+
+def coordinate_sitemap(queue_url: str, out: str = sitemap.OUT_FILE) -> int:
+    # plain HTTP, no browser; profile URLs are kept in out for `coverage`
+    queue = open_queue(queue_url)
+    found = sitemap.discover(sd.BASE_URL)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(found, f, ensure_ascii=False, indent=1)
+    units = []
+    for entry in found["listing"]:
+        page = parse_qs(urlparse(entry["url"]).query).get("page", ["1"])[0]
+        units.append(listing_unit(city_from_url(entry["url"]), entry["url"],
+                                  int(page) if page.isdigit() else 1, kind="sitemap_listing"))
+    added = queue.enqueue(units)
+    print(f"Sitemaps list {len(found['listing'])} listing pages and {len(found['profile'])} profiles; "
+          f"enqueued {added} new units. Queue: {queue.stats()}")
+    return added
+
+
+# ---------- Worker ----------
+async def keep_lease(queue, unit_id: str, worker: str, lease: float):
+    while True:
+        await asyncio.sleep(lease / 3)
+        if not queue.heartbeat(unit_id, worker, lease):
+            print(f"[{worker}] lost lease on {unit_id}")
+            return
+
+
+async def crawl_unit(context: BrowserContext, unit: Dict) -> Tuple[List[Dict], Optional[str]]:
+    # one page load: the next-page link is read from the page the rows came from
+    rows, next_url = await sd.extract_listing_page(context, unit["city"], unit["url"])
+    capped = unit.get("kind") != "sitemap_listing" and unit["page"] >= sd.MAX_PAGES_PER_CITY
+    if not rows or capped:
+        return rows, None
+    return rows, next_url
+
+
+async def work(queue_url: str, worker: str, lease: float = LEASE_SECONDS,
+               exit_when_idle: Optional[float] = None) -> int:
+    queue = open_queue(queue_url)
+    sd.ARCHIVE = HtmlArchive(sd.ARCHIVE_DIR) if sd.ARCHIVE_DIR else None
+    done = 0
+    async with async_playwright() as p:
+        browser, context = await new_context(p)
+        idle = 0.0
+        while True:
+            unit = queue.claim(worker, lease)
+            if unit is None:
+                if exit_when_idle is not None and idle >= exit_when_idle:
+                    break
+                await asyncio.sleep(POLL_SECONDS)
+                idle += POLL_SECONDS
+                continue
+            idle = 0.0
+            heartbeat = asyncio.create_task(keep_lease(queue, unit["id"], worker, lease))
+            try:
+                rows, next_url = await crawl_unit(context, unit)
+                queue.put_rows(rows, unit["id"])
+                if next_url:
+                    queue.enqueue([listing_unit(unit["city"], next_url, unit["page"] + 1,
+                                                unit.get("kind") or "listing")])
+                queue.complete(unit["id"], worker)
+                done += 1
+                print(f"[{worker}] {unit['city']} p{unit['page']}: {len(rows)} rows; {sd.LIMITER.status()}")
+            except Exception as e:
+                queue.fail(unit["id"], worker, f"{type(e).__name__}: {e}")
+                print(f"[{worker}] Failed {unit['url']}: {e}")
+            finally:
+                heartbeat.cancel()
+        await sd.POOL.close()
+        await browser.close()
+    print(f"[{worker}] idle, exiting after {done} units ({sd.pool_summary()})")
+    return done
+
+
+def _run_worker(queue_url: str, worker: str, lease: float, exit_when_idle: Optional[float]):
+    asyncio.run(work(queue_url, worker, lease, exit_when_idle))
+
+
+# ---------- Coverage ----------
+def coverage(queue_url: str, sitemap_file: str = sitemap.OUT_FILE, out: str = MISSING_FILE) -> int:
+    # profiles the sitemaps know about that no crawled listing page produced a row for
+    with open(sitemap_file, "r", encoding="utf-8") as f:
+        listed = {urlparse(e["url"]).path.rstrip("/") for e in json.load(f)["profile"]}
+    crawled = {urlparse(r.get("profile_url") or "").path.rstrip("/") for r in open_queue(queue_url).rows()}
+    missing = sorted(listed - crawled)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write("".join(p + "\n" for p in missing))
+    pct = 100.0 * (len(listed) - len(missing)) / len(listed) if listed else 100.0
+    print(f"{len(listed) - len(missing)}/{len(listed)} sitemap profiles crawled ({pct:.1f}%); "
+          f"{len(missing)} missing, listed in {out}")
+    return len(missing)
+
+
+# ---------- Export ----------
+def export(queue_url: str, out_csv: Optional[str], out_db: Optional[str]) -> int:
+    rows = list(open_queue(queue_url).rows())
+    if out_db:
+        kb_store.write_rows(rows, out_db, upsert=True)
+    else:
+        sd.rewrite_csv(rows, out_csv or sd.OUTPUT_CSV)
+    print(f"Exported {len(rows)} rows to {out_db or out_csv or sd.OUTPUT_CSV}")
+    return len(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Distributed Marham crawl")
+    ap.add_argument("command", choices=["coordinator", "worker", "status", "export", "coverage"])
+    ap.add_argument("--queue", default=QUEUE_URL, help="sqlite path, postgresql:// or redis:// URL")
+    ap.add_argument("--processes", type=int, default=1, help="worker processes (one browser each)")
+    ap.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}", help="worker id prefix")
+    ap.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    ap.add_argument("--exit-when-idle", type=float, default=None,
+                    help="stop a worker after this many seconds without work")
+    ap.add_argument("--sitemap", action="store_true",
+                    help="coordinator: enqueue the listing pages from the sitemaps instead of rendering /doctors")
+    ap.add_argument("--out", help="export: CSV path (overwritten)")
+    ap.add_argument("--db", help="export: upsert into this SQLite store instead")
+    args = ap.parse_args()
+
+    if args.command == "coordinator" and args.sitemap:
+        coordinate_sitemap(args.queue)
+    elif args.command == "coordinator":
+        asyncio.run(coordinate(args.queue))
+    elif args.command == "coverage":
+        coverage(args.queue)
+    elif args.command == "status":
+        for k, v in open_queue(args.queue).stats().items():
+            print(f"{k:15s} {v}")
+    elif args.command == "export":
+        export(args.queue, args.out, args.db)
+    elif args.processes <= 1:
+        _run_worker(args.queue, args.id, args.lease, args.exit_when_idle)
+    else:
+        procs = [multiprocessing.Process(target=_run_worker,
+                                         args=(args.queue, f"{args.id}-{i}", args.lease, args.exit_when_idle))
+                 for i in range(args.processes)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# entities.py
+# Stable doctor and hospital IDs, and the write-time merge of duplicate rows.
+#
+# extract_doctors_from_city_page writes one row per doctor card x product
+# card, and the same doctor is listed under several specialty listings, in
+# several cities and under two kinds of profile URL:
+#   /doctors/<city>/<spec>/<slug>
+#   /online-consultation/<spec>/<city>/<slug>-22743
+# Marham's numeric doctor ID is in the online-consultation URL and in the
+# photo URL (staticconnect.marham.pk/assets/doctors/13822/..._80X80.webp), so
+# doctor_id() keys on that number when either URL has it, then on the profile
+# path, then on name + image. hospital_id() keys a practice on the normalized
+# hospital name and city: "Hameed Latif Hospital" and "Hameed latif hospital ."
+# are one hospital. merge_rows() keeps one row per doctor x hospital x
+# consultation type; kb_store, kb_delta and work_queue key rows the same way.
+#
+#   python entities.py doctors_knowledge_base.csv [--out compact.csv]
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+IMAGE_ID_RE = re.compile(r"/assets/doctors/(\d+)/")
+PROFILE_ID_RE = re.compile(r"-(\d{3,})$")  # short suffixes (-2) are slug counters, not IDs
+# practices that are not a place
+NO_HOSPITAL = {"", "unknown", "video consultation"}
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+
+def profile_path(url: Optional[str]) -> str:
+    # host-independent, like kb_delta.page_id
+    return urlparse((url or "").strip()).path.rstrip("/").lower()
+
+
+def marham_id(profile_url: Optional[str], image_url: Optional[str]) -> Optional[str]:
+    m = IMAGE_ID_RE.search(image_url or "") or PROFILE_ID_RE.search(profile_path(profile_url))
+    return m.group(1) if m else None
+
+
+def doctor_id(row: Dict) -> str:
+    # "D13822" from Marham's ID; "P..." / "N..." digests for cards without one
+    if row.get("doctor_id"):
+        return row["doctor_id"]
+    number = marham_id(row.get("profile_url"), row.get("image_url"))
+    if number:
+        return f"D{number}"
+    path = profile_path(row.get("profile_url"))
+    if path:
+        return f"P{_digest(path)}"
+    return f"N{_digest((row.get('name') or '').strip().lower() + '|' + (row.get('image_url') or '').strip())}"
+
+
+def normalize_name(name: Optional[str]) -> str:
+    s = unicodedata.normalize("NFKC", name or "").lower().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", s).split())
+
+
+def hospital_id(row: Dict) -> str:
+    # "H..." per normalized hospital name and city; "" for video consultations
+    if row.get("hospital_id"):
+        return row["hospital_id"]
+    name = normalize_name(row.get("hospital_name"))
+    if name in NO_HOSPITAL:
+        return ""
+    city = normalize_name(row.get("hospital_city") or row.get("city"))
+    return f"H{_digest(city + '|' + name)}"
+
+
+def practice_key(row: Dict) -> Tuple[str, str, str]:
+    # one practice of one doctor (video and "Unknown" practices differ by type)
+    return doctor_id(row), hospital_id(row), (row.get("consultation_type") or "").strip()
+
+
+def assign_ids(rows: List[Dict]) -> List[Dict]:
+    # sets doctor_id / hospital_id on every row. A profile path seen anywhere
+    # with a Marham ID gives that ID to its rows that lack one (placeholder photo)
+    known: Dict[str, str] = {}
+    for r in rows:
+        path = profile_path(r.get("profile_url"))
+        if not path:
+            continue
+        if (r.get("doctor_id") or "").startswith("D"):
+            known.setdefault(path, r["doctor_id"])
+        else:
+            number = marham_id(r.get("profile_url"), r.get("image_url"))
+            if number:
+                known.setdefault(path, f"D{number}")
+    for r in rows:
+        if not r.get("doctor_id") or r["doctor_id"][0] != "D":
+            r["doctor_id"] = known.get(profile_path(r.get("profile_url"))) or doctor_id(dict(r, doctor_id=""))
+        if not r.get("hospital_id"):
+            r["hospital_id"] = hospital_id(r)
+    return rows
+
+
+def _filled(v) -> bool:
+    return v is not None and v != ""
+
+
+def merge_rows(rows: Iterable[Dict]) -> List[Dict]:
+    # one row per practice_key, in first-seen order. Later (or more recently
+    # scraped) rows win field by field; empty values never overwrite. The first
+    # listing URL and hospital spelling are kept so the row stays with the
+    # listing page it was first stored under (kb_delta.same_listing).
+    rows = assign_ids(list(rows))
+    merged: Dict[Tuple[str, str, str], Dict] = {}
+    for r in rows:
+        key = practice_key(r)
+        cur = merged.get(key)
+        if cur is None:
+            merged[key] = dict(r)
+            continue
+        newer = (r.get("scraped_at") or "") >= (cur.get("scraped_at") or "")
+        for k, v in r.items():
+            if k in ("raw_source_url", "hospital_name") and _filled(cur.get(k)):
+                continue
+            if _filled(v) and (newer or not _filled(cur.get(k))):
+                cur[k] = v
+    return list(merged.values())
+
+
+def entity_counts(rows: List[Dict]) -> Dict[str, int]:
+    return {"rows": len(rows), "doctors": len({doctor_id(r) for r in rows}),
+            "hospitals": len({hospital_id(r) for r in rows} - {""})}
+
+
+# ---------- CLI: compact an existing knowledge-base CSV ----------
+def main():
+    from kb_store import CSV_COLUMNS
+
+    ap = argparse.ArgumentParser(description="Merge duplicate doctors/practices in a knowledge-base CSV")
+    ap.add_argument("csv", help="knowledge-base CSV")
+    ap.add_argument("--out", help="write here instead of replacing the input")
+    args = ap.parse_args()
+
+    with open(args.csv, "r", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    before = os.path.getsize(args.csv)
+    t0 = time.perf_counter()
+    merged = merge_rows(rows)
+    merge_s = time.perf_counter() - t0
+    out = args.out or args.csv
+    tmp = out + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for r in merged:
+            writer.writerow({k: (r.get(k) if r.get(k) is not None else "") for k in CSV_COLUMNS})
+    os.replace(tmp, out)
+    counts = entity_counts(merged)
+    print(f"✅ {len(rows)} rows -> {counts['rows']} ({counts['doctors']} doctors, "
+          f"{counts['hospitals']} hospitals) in {merge_s:.2f}s; "
+          f"{before / 1024:.0f} KB -> {os.path.getsize(out) / 1024:.0f} KB. File: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
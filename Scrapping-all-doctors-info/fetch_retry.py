@@ -0,0 +1,226 @@
+# fetch_retry.py
+# Failure handling for page fetches: categorised errors, jittered exponential
+# backoff, a per-host circuit breaker and a persisted dead-letter queue.
+#
+# A transient failure (timeout, network error, 429/5xx, challenge page) is
+# retried up to MAX_RETRIES times with "full jitter" backoff: a random wait
+# between 0 and min(RETRY_CAP_S, RETRY_BASE_S * 2**attempt). A permanent one
+# (404/410, other 4xx) is not. After BREAKER_THRESHOLD consecutive failures
+# against a host its breaker opens and fetches to that host wait out a
+# cooldown (doubling while the host keeps failing) instead of piling on.
+# URLs that still fail go to a dead-letter file that
+# `scrape_doctors.py --retry-failed` drains later.
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from metrics import METRICS
+
+MAX_RETRIES = 3
+RETRY_BASE_S = 2.0
+RETRY_CAP_S = 60.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_S = 60.0
+BREAKER_MAX_COOLDOWN_S = 900.0
+FAILED_FILE = "failed_urls.json"
+
+# error categories; the first five are worth retrying
+TIMEOUT, NETWORK, RATE_LIMITED, SERVER, CHALLENGE = "timeout", "network", "rate_limited", "server", "challenge"
+NOT_FOUND, CLIENT, UNKNOWN = "not_found", "client", "unknown"
+RETRYABLE = {TIMEOUT, NETWORK, RATE_LIMITED, SERVER, CHALLENGE}
+# the host answered, just not with the page: proof that it is up
+ANSWERED = {NOT_FOUND, CLIENT}
+
+
+class FetchError(Exception):
+    def __init__(self, category: str, url: str, message: str = "", status: Optional[int] = None):
+        super().__init__(f"{category}: {message or url}")
+        self.category = category
+        self.url = url
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.category in RETRYABLE
+
+
+def status_category(status: Optional[int]) -> Optional[str]:
+    # None for a usable response
+    if status is None or status < 400:
+        return None
+    if status == 429:
+        return RATE_LIMITED
+    if status in (404, 410):
+        return NOT_FOUND
+    if status >= 500:
+        return SERVER
+    return CLIENT
+
+
+def exception_category(exc: BaseException) -> str:
+    if isinstance(exc, FetchError):
+        return exc.category
+    name, text = type(exc).__name__, str(exc)
+    if "Timeout" in name or "Timeout" in text:
+        return TIMEOUT
+    if "net::ERR_" in text or isinstance(exc, (ConnectionError, OSError)):
+        return NETWORK
+    return UNKNOWN
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    base = RETRY_BASE_S if base is None else base
+    cap = RETRY_CAP_S if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def host_of(url: str) -> str:
+    return urlparse(url or "").netloc.lower()
+
+
+# ---------- Circuit breaker ----------
+class CircuitBreaker:
+    # per-host: closed -> (threshold failures) -> open -> (cooldown) -> half-open,
+    # where one probe request decides between closed and open again
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_S,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN_S, log=print):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.log = log
+        self.hosts: Dict[str, Dict] = {}
+
+    def _host(self, host: str) -> Dict:
+        return self.hosts.setdefault(host, {"failures": 0, "open_until": 0.0, "cooldown": self.cooldown,
+                                            "probing": False, "opened": 0})
+
+    def state(self, host: str) -> str:
+        h = self._host(host)
+        if h["open_until"] == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < h["open_until"] else "half-open"
+
+    async def wait(self, host: str):
+        # returns once a request to host may go out
+        while True:
+            h = self._host(host)
+            state = self.state(host)
+            if state == "closed":
+                return
+            if state == "half-open" and not h["probing"]:
+                h["probing"] = True
+                return
+            remaining = h["open_until"] - time.monotonic()
+            await asyncio.sleep(min(5.0, max(0.5, remaining)))
+
+    def success(self, host: str):
+        h = self._host(host)
+        if h["open_until"]:
+            self.log(f"[breaker] {host} closed")
+        h.update(failures=0, open_until=0.0, cooldown=self.cooldown, probing=False)
+
+    def release(self, host: str):
+        # the probe ended without an answer from the host (cancelled, or an error
+        # on our side): let the next request probe
+        self._host(host)["probing"] = False
+
+    def failure(self, host: str):
+        h = self._host(host)
+        h["failures"] += 1
+        if h["probing"]:
+            h["cooldown"] = min(self.max_cooldown, h["cooldown"] * 2)
+        elif h["failures"] < self.threshold or self.state(host) == "open":
+            return
+        h["probing"] = False
+        h["open_until"] = time.monotonic() + h["cooldown"]
+        h["opened"] += 1
+        self.log(f"[breaker] {host} open for {h['cooldown']:.0f}s after {h['failures']} failures")
+
+    def stats(self) -> Dict[str, Dict]:
+        return {host: {"state": self.state(host), "failures": h["failures"], "opened": h["opened"]}
+                for host, h in self.hosts.items()}
+
+
+async def with_retries(fetch: Callable[[], Awaitable], url: str, breaker: Optional[CircuitBreaker] = None,
+                       retries: int = MAX_RETRIES, log=print):
+    # run fetch() until it succeeds, fails permanently or runs out of retries;
+    # the last error is raised as a FetchError
+    host = host_of(url)
+    for attempt in range(retries + 1):
+        if breaker is not None:
+            await breaker.wait(host)
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release(host)
+            raise
+        except Exception as e:
+            err = e if isinstance(e, FetchError) else FetchError(exception_category(e), url, str(e))
+            if breaker is not None:
+                if err.retryable:
+                    breaker.failure(host)
+                elif err.category in ANSWERED:
+                    breaker.success(host)
+                else:
+                    # UNKNOWN: a parser bug or a closed page says nothing about the host
+                    breaker.release(host)
+            if not err.retryable or attempt == retries:
+                raise err from (None if err is e else e)
+            wait = backoff_delay(attempt)
+            METRICS.inc("retries", kind=err.category)
+            log(f"[retry] {err.category} on {url}; attempt {attempt + 2}/{retries + 1} in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            continue
+        if breaker is not None:
+            breaker.success(host)
+        return result
+
+
+# ---------- Dead-letter queue ----------
+class DeadLetterQueue:
+    # URLs that failed after all retries, keyed on kind + url, kept in a JSON
+    # file so a later run can retry just these
+    def __init__(self, path: str = FAILED_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = {f"{e['kind']} {e['url']}": e for e in json.load(f).get("failed", [])}
+            except (OSError, ValueError, KeyError):
+                self.entries = {}
+
+    def add(self, kind: str, url: str, error: BaseException, **meta):
+        key = f"{kind} {url}"
+        prev = self.entries.get(key, {})
+        self.entries[key] = {
+            "kind": kind, "url": url,
+            "category": exception_category(error), "error": str(error)[:300],
+            "runs_failed": prev.get("runs_failed", 0) + 1,
+            "failed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **meta,
+        }
+
+    def has(self, kind: str, url: str) -> bool:
+        return f"{kind} {url}" in self.entries
+
+    def remove(self, kind: str, url: str) -> bool:
+        return self.entries.pop(f"{kind} {url}", None) is not None
+
+    def items(self, kind: Optional[str] = None) -> List[Dict]:
+        return [e for e in self.entries.values() if kind is None or e["kind"] == kind]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"failed": list(self.entries.values())}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
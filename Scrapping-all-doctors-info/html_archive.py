@@ -0,0 +1,124 @@
+# html_archive.py
+# Content-addressed archive of fetched HTML, so parser fixes can be applied by
+# re-parsing (reparse.py) instead of re-crawling.
+#
+# Layout (WARC-like: immutable bodies plus an append-only record log):
+#   <root>/objects/ab/ab12...ef.zst   page body, stored once per sha256 digest
+#   <root>/records.jsonl              one line per fetch:
+#       {"url", "kind", "sha256", "fetched_at", "size", "meta"}
+# Bodies are zstd-compressed when the zstandard package is installed and
+# gzip-compressed otherwise; get() reads either.
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+ARCHIVE_DIR = os.getenv("MARHAM_ARCHIVE_DIR")  # unset = archiving off
+ZSTD_LEVEL = 10
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _compress(data: bytes):
+    if zstandard is not None:
+        return ".zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ".gz", gzip.compress(data, compresslevel=6)
+
+
+def _decompress(path: str, data: bytes) -> bytes:
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class HtmlArchive:
+    def __init__(self, root: str):
+        self.root = root
+        self.records_path = os.path.join(root, "records.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _object_base(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _object_path(self, digest: str) -> Optional[str]:
+        base = self._object_base(digest)
+        for ext in (".zst", ".gz"):
+            if os.path.isfile(base + ext):
+                return base + ext
+        return None
+
+    def has(self, digest: str) -> bool:
+        return self._object_path(digest) is not None
+
+    def put(self, url: str, html: str, kind: str, **meta) -> str:
+        digest = sha256_text(html)
+        if not self.has(digest):
+            ext, blob = _compress(html.encode("utf-8"))
+            path = self._object_base(digest) + ext
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        record = {
+            "url": url, "kind": kind, "sha256": digest,
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "size": len(html), "meta": meta,
+        }
+        with self._lock, open(self.records_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return digest
+
+    def get(self, digest: str) -> str:
+        path = self._object_path(digest)
+        if path is None:
+            raise KeyError(digest)
+        with open(path, "rb") as f:
+            return _decompress(path, f.read()).decode("utf-8")
+
+    def records(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        if not os.path.isfile(self.records_path):
+            return
+        with open(self.records_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn write from an interrupted run
+                if kind is None or rec.get("kind") == kind:
+                    yield rec
+
+    def latest(self, kind: Optional[str] = None) -> Dict[str, Dict]:
+        # url -> most recent record (the log is append-only, so last one wins)
+        out: Dict[str, Dict] = {}
+        for rec in self.records(kind):
+            out[rec["url"]] = rec
+        return out
+
+
+_open: Dict[str, HtmlArchive] = {}
+
+
+def open_archive(root: Optional[str] = ARCHIVE_DIR) -> Optional[HtmlArchive]:
+    if not root:
+        return None
+    key = os.path.abspath(root)
+    if key not in _open:
+        _open[key] = HtmlArchive(root)
+    return _open[key]
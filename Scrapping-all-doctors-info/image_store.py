@@ -0,0 +1,257 @@
+# image_store.py
+# Download the doctors' photos referenced by the knowledge base, so the UI can
+# serve local copies instead of hotlinking staticconnect.marham.pk.
+#
+#   python image_store.py [--csv doctors_knowledge_base.csv | --db PATH] [--out doctor_images]
+#                         [--pack] [--concurrency 8] [--rate 10]
+# or set MARHAM_IMAGES_DIR and scrape_doctors.py downloads the images of the
+# rows it saved at the end of each run.
+#
+# Downloads share one pooled HTTP client (keep-alive, at most --concurrency
+# connections). They are paced by the crawler's AdaptiveLimiter, so the gap
+# between requests never drops below 1/--rate s, and retried like page loads.
+# Images are stored once per sha256 of their bytes; index.jsonl maps each image
+# URL to its digest. Layout, like html_archive.py:
+#   <root>/objects/ab/ab12...ef.webp   loose files (default), or
+#   <root>/images.pack                 all bodies appended into one file (--pack),
+#                                      the index then carries offset + length
+#   <root>/index.jsonl                 {"url", "source", "sha256", "size", "type", "offset", "fetched_at"}
+# URLs already in the index are skipped, so re-runs only fetch new images.
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import fetch_retry
+import kb_store
+from adaptive_limiter import JITTER, AdaptiveLimiter
+from fetch_retry import FetchError, status_category, with_retries
+
+IMAGES_DIR = os.getenv("MARHAM_IMAGES_DIR")  # unset = no image downloads after a crawl
+CONCURRENCY = 8
+RATE_PER_S = 10.0
+TARGET_WIDTH = 160      # srcset: smallest candidate at least this wide (w descriptors) ...
+TARGET_DENSITY = 2.0    # ... or at least this pixel density (x descriptors)
+TIMEOUT_S = 20.0
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
+EXTENSIONS = {"image/webp": ".webp", "image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif",
+              "image/avif": ".avif", "image/svg+xml": ".svg"}
+
+_DESCRIPTOR_RE = re.compile(r"^(\d+(?:\.\d+)?)([wx])$")
+
+
+def srcset_candidates(value: str) -> List[Tuple[str, str]]:
+    # (url, descriptor) per the srcset grammar: a URL runs to whitespace (commas
+    # inside it, e.g. "w_80,h_80", are kept; trailing ones end the candidate),
+    # then its descriptor runs to the next comma, with or without a space after it
+    out: List[Tuple[str, str]] = []
+    s, pos = value or "", 0
+    while True:
+        while pos < len(s) and (s[pos].isspace() or s[pos] == ","):
+            pos += 1
+        if pos >= len(s):
+            return out
+        end = pos
+        while end < len(s) and not s[end].isspace():
+            end += 1
+        url, pos = s[pos:end], end
+        if url.endswith(","):
+            out.append((url.rstrip(","), ""))
+            continue
+        comma = s.find(",", pos)
+        comma = len(s) if comma < 0 else comma
+        out.append((url, s[pos:comma].strip()))
+        pos = comma + 1
+
+
+def pick_srcset(value: str, width: int = TARGET_WIDTH, density: float = TARGET_DENSITY) -> Optional[str]:
+    # "a.webp 80w, b.webp 160w" / "a.webp 1x,b.webp 2x" / a plain URL -> one URL
+    candidates: List[Tuple[str, Optional[float], Optional[str]]] = []
+    for url, descriptor in srcset_candidates(value):
+        m = _DESCRIPTOR_RE.match(descriptor)
+        if m:
+            candidates.append((url, float(m.group(1)), m.group(2)))
+        elif not descriptor:
+            candidates.append((url, None, None))
+    if not candidates:
+        return None
+    for unit, target in (("w", width), ("x", density)):
+        sized = sorted((size, url) for url, size, u in candidates if u == unit)
+        if sized:
+            return next((url for size, url in sized if size >= target), sized[-1][1])
+    return candidates[0][0]
+
+
+class ImageStore:
+    def __init__(self, root: str, packed: bool = False):
+        self.root = root
+        self.packed = packed
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.pack_path = os.path.join(root, "images.pack")
+        self._lock = threading.Lock()
+        self.by_url: Dict[str, Dict] = {}
+        self.by_digest: Dict[str, Dict] = {}
+        os.makedirs(root, exist_ok=True)
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from an interrupted run
+                    self.by_url[rec["url"]] = rec
+                    self.by_digest.setdefault(rec["sha256"], rec)
+
+    def has_url(self, url: str) -> bool:
+        return url in self.by_url
+
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def put(self, url: str, data: bytes, content_type: str, source: Optional[str] = None) -> Dict:
+        digest = hashlib.sha256(data).hexdigest()
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        with self._lock:
+            stored = self.by_digest.get(digest)
+            if stored is not None:
+                offset, ext = stored.get("offset"), stored.get("ext", "")
+            elif self.packed:
+                ext = EXTENSIONS.get(content_type, "")
+                with open(self.pack_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+            else:
+                offset, ext = None, EXTENSIONS.get(content_type, "")
+                path = self._object_path(digest, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            rec = {"url": url, "source": source or url, "sha256": digest, "size": len(data),
+                   "type": content_type, "ext": ext, "offset": offset, "duplicate": stored is not None,
+                   "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self.by_url[url] = rec
+            self.by_digest.setdefault(digest, rec)
+        return rec
+
+    def get(self, url: str) -> bytes:
+        rec = self.by_url[url]
+        if rec.get("offset") is not None:
+            with open(self.pack_path, "rb") as f:
+                f.seek(rec["offset"])
+                return f.read(rec["size"])
+        with open(self._object_path(rec["sha256"], rec.get("ext", "")), "rb") as f:
+            return f.read()
+
+    def path_for(self, url: str) -> Optional[str]:
+        # local file for url (loose layout only)
+        rec = self.by_url.get(url)
+        if rec is None or rec.get("offset") is not None:
+            return None
+        return self._object_path(rec["sha256"], rec.get("ext", ""))
+
+
+# ---------- Downloading ----------
+def image_urls(rows: Iterable[Dict]) -> Dict[str, str]:
+    # image URL to fetch -> the image_url value it was picked from
+    out: Dict[str, str] = {}
+    for r in rows:
+        source = (r.get("image_url") or "").strip()
+        url = pick_srcset(source)
+        if url and url.startswith(("http://", "https://")):
+            out.setdefault(url, source)
+    return out
+
+
+async def _fetch(client, limiter: AdaptiveLimiter, url: str) -> Tuple[bytes, str]:
+    async def attempt():
+        async with limiter.slot() as ticket:
+            try:
+                resp = await client.get(url)
+            except Exception as e:
+                if fetch_retry.exception_category(e) == fetch_retry.TIMEOUT:
+                    ticket.timeout()
+                raise
+            category = status_category(resp.status_code)
+            if category in (fetch_retry.RATE_LIMITED, fetch_retry.SERVER):
+                ticket.error()
+            elif category:
+                ticket.ok()  # a 404 says nothing about load
+            if category:
+                raise FetchError(category, url, f"HTTP {resp.status_code}", resp.status_code)
+            return resp.content, resp.headers.get("content-type", "")
+    return await with_retries(attempt, url, log=lambda msg: None)
+
+
+async def download_images(rows: Iterable[Dict], store: ImageStore, concurrency: int = CONCURRENCY,
+                          rate: float = RATE_PER_S) -> Dict[str, int]:
+    import httpx  # optional dependency, only needed for downloads
+
+    wanted = image_urls(rows)
+    todo = {u: s for u, s in wanted.items() if not store.has_url(u)}
+    counts = {"urls": len(wanted), "present": len(wanted) - len(todo), "downloaded": 0,
+              "duplicates": 0, "failed": 0, "bytes": 0}
+    if not todo:
+        return counts
+    # the limiter jitters each gap by -JITTER..+JITTER; the shortest gap is still 1/rate
+    gap = 1.0 / (rate * (1 - JITTER))
+    limiter = AdaptiveLimiter(max_concurrency=concurrency, min_delay=gap, start_delay=gap,
+                              log=lambda msg: None)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=TIMEOUT_S, follow_redirects=True,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        async def one(url: str, source: str):
+            try:
+                data, content_type = await _fetch(client, limiter, url)
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"[image failed] {url}: {e}")
+                return
+            rec = store.put(url, data, content_type, source)
+            counts["duplicates" if rec["duplicate"] else "downloaded"] += 1
+            counts["bytes"] += 0 if rec["duplicate"] else len(data)
+
+        await asyncio.gather(*(one(u, s) for u, s in todo.items()))
+    return counts
+
+
+def load_kb_rows(csv_path: Optional[str], db_path: Optional[str]) -> List[Dict]:
+    if db_path:
+        return kb_store.read_rows(db_path)
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Download doctor images referenced by the knowledge base")
+    ap.add_argument("--csv", default="doctors_knowledge_base.csv")
+    ap.add_argument("--db", help="read rows from this SQLite store instead of the CSV")
+    ap.add_argument("--out", default=IMAGES_DIR or "doctor_images")
+    ap.add_argument("--pack", action="store_true", help="append bodies to one images.pack file")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--rate", type=float, default=RATE_PER_S, help="requests per second at most")
+    args = ap.parse_args()
+
+    store = ImageStore(args.out, packed=args.pack)
+    t0 = time.perf_counter()
+    counts = asyncio.run(download_images(load_kb_rows(args.csv, args.db), store, args.concurrency, args.rate))
+    wall = time.perf_counter() - t0
+    print(f"✅ {counts['downloaded']} images downloaded ({counts['bytes'] / 1024:.0f} KiB), "
+          f"{counts['duplicates']} duplicates, {counts['failed']} failed, "
+          f"{counts['present']} already present, in {wall:.1f}s. Dir: {args.out}")
+    return 0 if not counts["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# kb_delta.py
+# Change detection for incremental recrawls (scrape_doctors.py, INCREMENTAL).
+#
+# CrawlState remembers, per listing/profile URL, a content hash, the ETag /
+# Last-Modified validators, for listings the next-page link and, for profiles,
+# the parsed schedules. A recrawl can then skip listing pages whose cards did
+# not change and profiles fetched recently. diff_rows compares the stored rows
+# of a city with the recrawled ones; the resulting events (new/removed doctors
+# and practices, fee and schedule changes, ...) are appended to a JSONL change
+# feed.
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from entities import practice_key
+
+STATE_FILE = "crawl_state.json"
+CHANGE_FEED = "doctors_changes.jsonl"
+
+# fields compared between runs (typed copies follow their source strings)
+TRACKED_FIELDS = [
+    "fee", "availability_schedule", "hospital_address", "complete address", "hospital_city",
+    "name", "specialization", "qualification", "experience", "satisfaction_rate", "reviews",
+    "areas_of_interest", "image_url",
+]
+
+# attributes that change on every page load without the content changing
+VOLATILE_ATTR_RE = re.compile(r'\s(?:nonce|data-csrf|data-token|data-timestamp)="[^"]*"', re.I)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def content_hash(text: str) -> str:
+    text = VOLATILE_ATTR_RE.sub("", text or "")
+    text = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.pages: Dict[str, Dict] = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.pages = json.load(f).get("pages", {})
+            except (OSError, ValueError):
+                self.pages = {}
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self.pages.get(url)
+
+    def changed(self, url: str, digest: str) -> bool:
+        entry = self.pages.get(url)
+        return entry is None or entry.get("hash") != digest
+
+    def age_hours(self, url: str) -> Optional[float]:
+        entry = self.pages.get(url)
+        if not entry or not entry.get("checked_at"):
+            return None
+        checked = datetime.fromisoformat(entry["checked_at"])
+        return (_now() - checked).total_seconds() / 3600
+
+    def validators(self, url: str) -> Dict[str, str]:
+        # headers for a conditional request, if the server sent validators last time
+        entry = self.pages.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url: str, digest: Optional[str] = None, etag: Optional[str] = None,
+               last_modified: Optional[str] = None, **extra):
+        entry = self.pages.setdefault(url, {})
+        now = _now().isoformat(timespec="seconds")
+        if digest is not None and entry.get("hash") != digest:
+            entry["hash"] = digest
+            entry["changed_at"] = now
+        entry["checked_at"] = now
+        if etag or last_modified:
+            entry["etag"], entry["last_modified"] = etag, last_modified
+        entry.update(extra)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pages": self.pages}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+# ---------- Row diffs ----------
+def row_key(row: Dict) -> Tuple[str, str, str]:
+    # one practice of one doctor: doctor_id x hospital_id x consultation type
+    return practice_key(row)
+
+
+def same_listing(url: str, listing_url: str) -> bool:
+    # page 2, 3, ... of a listing share its path
+    return urlparse(url or "").path.rstrip("/") == urlparse(listing_url or "").path.rstrip("/")
+
+
+def page_id(url: str) -> str:
+    # host-independent, so runs against a mirror (MARHAM_BASE_URL) still line up
+    parts = urlparse(url or "")
+    return parts.path.rstrip("/") + ("?" + parts.query if parts.query else "")
+
+
+def _norm(v) -> str:
+    return "" if v is None else re.sub(r"\s+", " ", str(v)).strip()
+
+
+def _event(kind: str, row: Dict, **extra) -> Dict:
+    ev = {"type": kind, "profile_url": row.get("profile_url") or "", "name": row.get("name") or "",
+          "hospital_name": row.get("hospital_name") or "", "city": row.get("city") or ""}
+    ev.update(extra)
+    return ev
+
+
+def diff_rows(old: Iterable[Dict], new: Iterable[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
+    # -> (events, upserts, removed, unchanged)
+    # Only practices on listing pages crawled this run can be reported removed,
+    # so a page that failed to load does not look like every doctor left.
+    old_by_key = {row_key(r): r for r in old}
+    new_by_key = {row_key(r): r for r in new}
+    crawled = {page_id(r.get("raw_source_url")) for r in new_by_key.values()}
+    old_doctors = {k[0] for k in old_by_key}
+    new_doctors = {k[0] for k in new_by_key}
+
+    events, upserts, removed, unchanged = [], [], [], []
+    for key, row in new_by_key.items():
+        prev = old_by_key.get(key)
+        if prev is None:
+            upserts.append(row)
+            events.append(_event("practice_added" if key[0] in old_doctors else "doctor_added", row,
+                                 fee=row.get("fee") or "", schedule=row.get("availability_schedule") or ""))
+            continue
+        changes = {f: [_norm(prev.get(f)), _norm(row.get(f))] for f in TRACKED_FIELDS
+                   if _norm(prev.get(f)) != _norm(row.get(f))}
+        if changes:
+            upserts.append(row)
+            events.append(_event("changed", row, changes=changes))
+        else:
+            unchanged.append(row)
+    for key, row in old_by_key.items():
+        if key in new_by_key:
+            continue
+        if page_id(row.get("raw_source_url")) not in crawled:
+            continue
+        removed.append(row)
+        events.append(_event("practice_removed" if key[0] in new_doctors else "doctor_removed", row))
+    return events, upserts, removed, unchanged
+
+
+def summarize(events: Iterable[Dict]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for ev in events:
+        kinds = [ev["type"]] if ev["type"] != "changed" else [f"{f}_changed" for f in ev["changes"]]
+        for k in kinds:
+            out[k] = out.get(k, 0) + 1
+    return out
+
+
+def append_feed(events: List[Dict], listing_url: str, run_id: str, path: str = CHANGE_FEED) -> int:
+    if not events:
+        return 0
+    with open(path, "a", encoding="utf-8") as f:
+        for ev in events:
+            rec = {"run_id": run_id, "listing": listing_url}
+            rec.update(ev)
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return len(events)
@@ -0,0 +1,154 @@
+# kb_numeric.py
+# Typed numeric versions of the string metric columns, and a columnar loader.
+#
+# The crawler keeps the display strings ("1,000", "8 Yrs", "100%", "36") and
+# also emits the parsed values below, so filters such as
+# "fee < 2000 and satisfaction > 95" never re-parse strings row by row.
+import csv
+import os
+import re
+from typing import Dict, List, Optional
+
+
+def parse_int(s: Optional[str]) -> Optional[int]:
+    if not s:
+        return None
+    m = re.search(r'\d{1,3}(?:,\d{3})+|\d+', str(s))
+    return int(m.group(0).replace(",", "")) if m else None
+
+
+def parse_fee(s: Optional[str]) -> Optional[int]:
+    # "1,000", "Rs. 2500", "2,500 PKR"
+    return parse_int(s)
+
+
+def parse_experience(s: Optional[str]) -> Optional[int]:
+    # "8 Yrs", "1 Year"
+    if not s:
+        return None
+    m = re.search(r'(\d+)\s*(?:yrs?|years?)?', str(s), re.I)
+    return int(m.group(1)) if m else None
+
+
+def parse_percent(s: Optional[str]) -> Optional[float]:
+    # "100%", "97 %"
+    if not s:
+        return None
+    m = re.search(r'(\d+(?:\.\d+)?)\s*%?', str(s))
+    return float(m.group(1)) if m else None
+
+
+# typed column -> (source string column, parser)
+TYPED_COLUMNS: Dict[str, tuple] = {
+    "fee_pkr": ("fee", parse_fee),
+    "experience_years": ("experience", parse_experience),
+    "satisfaction_pct": ("satisfaction_rate", parse_percent),
+    "reviews_count": ("reviews", parse_int),
+}
+INT_COLUMNS = ["fee_pkr", "experience_years", "reviews_count"]
+FLOAT_COLUMNS = ["satisfaction_pct"]
+
+
+def typed_values(row: Dict) -> Dict[str, Optional[float]]:
+    out = {}
+    for col, (src, parser) in TYPED_COLUMNS.items():
+        if src in row:
+            out[col] = parser(row.get(src))
+    return out
+
+
+def add_typed_columns(row: Dict) -> Dict:
+    # fill typed columns that are missing or blank (e.g. rows from an older CSV)
+    for col, val in typed_values(row).items():
+        if row.get(col) in (None, ""):
+            row[col] = val
+    return row
+
+
+# ---------- Columnar loader ----------
+def _read_rows(path: str) -> List[Dict]:
+    if path.endswith(".db"):
+        import kb_store
+        return kb_store.read_rows(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+# one NumPy array per column: typed columns are float64 with NaN for missing
+# values, everything else is an object array of strings
+def load_arrays(path: str):
+    import numpy as np
+
+    rows = _read_rows(path)
+    cols: Dict[str, list] = {}
+    for r in rows:
+        add_typed_columns(r)
+    keys = list(rows[0].keys()) if rows else []
+    for k in keys:
+        cols[k] = [r.get(k) for r in rows]
+
+    arrays = {}
+    for k, vals in cols.items():
+        if k in TYPED_COLUMNS:
+            arrays[k] = np.array([np.nan if v in (None, "") else float(v) for v in vals],
+                                 dtype=np.float64)
+        else:
+            arrays[k] = np.array(["" if v is None else v for v in vals], dtype=object)
+    return arrays
+
+
+# same as load_arrays, as a pandas DataFrame with nullable integer columns
+def load_dataframe(path: str):
+    import pandas as pd
+
+    df = pd.DataFrame(load_arrays(path))
+    for c in INT_COLUMNS:
+        if c in df:
+            df[c] = df[c].astype("Int64")
+    return df
+
+
+def range_mask(arrays, column: str, lo: Optional[float] = None, hi: Optional[float] = None,
+               inclusive: bool = True):
+    import numpy as np
+
+    col = arrays[column]
+    mask = ~np.isnan(col)
+    if lo is not None:
+        mask &= (col >= lo) if inclusive else (col > lo)
+    if hi is not None:
+        mask &= (col <= hi) if inclusive else (col < hi)
+    return mask
+
+
+# row indices of the k best values of `column`; NaNs are never selected
+def top_k(arrays, column: str, k: int = 10, mask=None, descending: bool = True):
+    import numpy as np
+
+    col = arrays[column]
+    idx = np.flatnonzero(~np.isnan(col) if mask is None else (mask & ~np.isnan(col)))
+    if idx.size == 0:
+        return idx
+    vals = -col[idx] if descending else col[idx]
+    k = min(k, idx.size)
+    part = np.argpartition(vals, k - 1)[:k]
+    return idx[part[np.argsort(vals[part], kind="stable")]]
+
+
+def select(arrays, idx, columns: Optional[List[str]] = None) -> List[Dict]:
+    columns = columns or list(arrays.keys())
+    return [{c: arrays[c][i] for c in columns} for i in idx]
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "doctors_knowledge_base.csv"
+    if not os.path.isfile(path):
+        print(f"Not found: {path}")
+        sys.exit(1)
+    a = load_arrays(path)
+    m = range_mask(a, "fee_pkr", hi=2000, inclusive=False) & range_mask(a, "satisfaction_pct", lo=95, inclusive=False)
+    print(f"{len(a['name'])} rows; fee < 2000 and satisfaction > 95: {int(m.sum())}")
+    for r in select(a, top_k(a, "reviews_count", 5, mask=m), ["name", "city", "fee_pkr", "reviews_count"]):
+        print(r)
@@ -0,0 +1,383 @@
+# kb_store.py
+# Normalized SQLite storage for the doctors knowledge base.
+#
+# The CSV written by scrape_doctors.py has one row per doctor x practice, so
+# name, qualification, areas and image URLs repeat for every practice. Here the
+# same data is split into `doctors` and `practices` tables, with city and
+# specialization dictionary-encoded into lookup tables. The `kb_rows` view joins
+# everything back into the original CSV layout for export. Doctors are keyed on
+# entities.doctor_id and practices on doctor x hospital_id x consultation type,
+# so a doctor met on several listings is stored once (entities.py).
+import csv
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from entities import doctor_id, hospital_id, merge_rows
+from kb_numeric import TYPED_COLUMNS, add_typed_columns
+
+OUTPUT_DB = "doctors_knowledge_base.db"
+
+CSV_COLUMNS = [
+    "city", "name", "specialization", "qualification", "experience",
+    "satisfaction_rate", "reviews", "areas_of_interest", "consultation_type",
+    "hospital_name", "hospital_address", "hospital_city", "complete address",
+    "availability_schedule", "fee", "profile_url", "image_url", "raw_source_url",
+    # typed copies of fee / experience / satisfaction_rate / reviews (kb_numeric.py)
+    "fee_pkr", "experience_years", "satisfaction_pct", "reviews_count",
+    # UTC time the row was crawled, used for freshness checks
+    "scraped_at",
+    # stable entity keys (entities.py)
+    "doctor_id", "hospital_id",
+]
+
+# CSV column -> SQL column (only "complete address" differs)
+SQL_NAMES = {c: c.replace(" ", "_") for c in CSV_COLUMNS}
+
+DOCTOR_FIELDS = [
+    "name", "qualification", "experience", "satisfaction_rate", "reviews",
+    "areas_of_interest", "profile_url", "image_url",
+    "experience_years", "satisfaction_pct", "reviews_count",
+]
+PRACTICE_FIELDS = [
+    "consultation_type", "hospital_name", "hospital_address", "complete address",
+    "availability_schedule", "fee", "raw_source_url", "fee_pkr", "scraped_at", "hospital_id",
+]
+
+TYPED_FIELDS = set(TYPED_COLUMNS)
+
+# columns added after the first schema version: (table, column, SQL type)
+ADDED_SQL_COLUMNS = [
+    ("doctors", "experience_years", "INTEGER"),
+    ("doctors", "satisfaction_pct", "REAL"),
+    ("doctors", "reviews_count", "INTEGER"),
+    ("practices", "fee_pkr", "INTEGER"),
+    ("practices", "scraped_at", "TEXT"),
+    ("practices", "hospital_id", "TEXT"),
+]
+# PRAGMA user_version once doctors are keyed on entities.doctor_id
+ENTITY_KEYS_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS specializations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY,
+    doctor_key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    specialization_id INTEGER REFERENCES specializations(id),
+    qualification TEXT,
+    experience TEXT,
+    satisfaction_rate TEXT,
+    reviews TEXT,
+    areas_of_interest TEXT,
+    profile_url TEXT,
+    image_url TEXT,
+    experience_years INTEGER,
+    satisfaction_pct REAL,
+    reviews_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS practices (
+    id INTEGER PRIMARY KEY,
+    doctor_id INTEGER NOT NULL REFERENCES doctors(id),
+    city_id INTEGER REFERENCES cities(id),
+    hospital_city_id INTEGER REFERENCES cities(id),
+    consultation_type TEXT,
+    hospital_name TEXT,
+    hospital_address TEXT,
+    complete_address TEXT,
+    availability_schedule TEXT,
+    fee TEXT,
+    raw_source_url TEXT,
+    fee_pkr INTEGER,
+    scraped_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_doctors_profile_url ON doctors(profile_url);
+CREATE INDEX IF NOT EXISTS idx_doctors_specialization ON doctors(specialization_id);
+CREATE INDEX IF NOT EXISTS idx_practices_city ON practices(city_id);
+CREATE INDEX IF NOT EXISTS idx_practices_doctor ON practices(doctor_id);
+"""
+
+VIEW = """
+CREATE VIEW IF NOT EXISTS kb_rows AS
+SELECT c.name AS city, d.name AS name, s.name AS specialization,
+       d.qualification, d.experience, d.satisfaction_rate, d.reviews,
+       d.areas_of_interest, p.consultation_type, p.hospital_name,
+       p.hospital_address, hc.name AS hospital_city, p.complete_address,
+       p.availability_schedule, p.fee, d.profile_url, d.image_url,
+       p.raw_source_url, p.fee_pkr, d.experience_years, d.satisfaction_pct,
+       d.reviews_count, p.scraped_at, d.doctor_key AS doctor_id, p.hospital_id
+FROM practices p
+JOIN doctors d ON d.id = p.doctor_id
+LEFT JOIN cities c ON c.id = p.city_id
+LEFT JOIN cities hc ON hc.id = p.hospital_city_id
+LEFT JOIN specializations s ON s.id = d.specialization_id;
+"""
+
+# one connection per database file for the lifetime of the process,
+# so a crawl does not reopen the store for every city
+_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def connect(path: str = OUTPUT_DB) -> sqlite3.Connection:
+    key = os.path.abspath(path)
+    conn = _connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        conn.executescript(VIEW)
+        _connections[key] = conn
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    for table, col, sql_type in ADDED_SQL_COLUMNS:
+        have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if col not in have:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {sql_type}")
+            conn.execute("DROP VIEW IF EXISTS kb_rows")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < ENTITY_KEYS_VERSION:
+        with conn:
+            _rekey(conn)
+            conn.execute(f"PRAGMA user_version = {ENTITY_KEYS_VERSION}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_hospital ON practices(hospital_id)")
+
+
+def _rekey(conn: sqlite3.Connection):
+    # stores written before entities.py keyed doctors on the profile URL: move
+    # them to doctor_id, fold doctors that turn out to be one, fill in
+    # hospital_id and keep the newest copy of each practice
+    kept: Dict[str, int] = {}
+    for rec in conn.execute("SELECT id, name, profile_url, image_url FROM doctors ORDER BY id").fetchall():
+        key = doctor_id(dict(rec))
+        if key in kept:
+            conn.execute("UPDATE practices SET doctor_id = ? WHERE doctor_id = ?", (kept[key], rec["id"]))
+            conn.execute("DELETE FROM doctors WHERE id = ?", (rec["id"],))
+        else:
+            kept[key] = rec["id"]
+            conn.execute("UPDATE doctors SET doctor_key = ? WHERE id = ?", (key, rec["id"]))
+    for rec in conn.execute("""SELECT p.id, p.hospital_name, c.name AS hospital_city FROM practices p
+                               LEFT JOIN cities c ON c.id = p.hospital_city_id""").fetchall():
+        conn.execute("UPDATE practices SET hospital_id = ? WHERE id = ?", (hospital_id(dict(rec)), rec["id"]))
+    conn.execute("""DELETE FROM practices WHERE id NOT IN (
+                        SELECT MAX(id) FROM practices GROUP BY doctor_id, hospital_id, consultation_type)""")
+
+
+def close(path: str = OUTPUT_DB):
+    conn = _connections.pop(os.path.abspath(path), None)
+    if conn is not None:
+        conn.close()
+
+
+def doctor_key(row: Dict) -> str:
+    # Marham's doctor ID when the profile or photo URL has one (entities.py)
+    return doctor_id(row)
+
+
+def _lookup_id(conn: sqlite3.Connection, table: str, name: Optional[str],
+               cache: Dict[str, int]) -> Optional[int]:
+    name = (name or "").strip()
+    if not name:
+        return None
+    if name in cache:
+        return cache[name]
+    conn.execute(f"INSERT OR IGNORE INTO {table}(name) VALUES (?)", (name,))
+    rid = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+    cache[name] = rid
+    return rid
+
+
+def _value(row: Dict, field: str):
+    v = row.get(field)
+    if v is None or v == "":
+        # typed columns stay NULL rather than ''
+        return None if field in TYPED_FIELDS else ""
+    return v
+
+
+def _upsert_doctor(conn: sqlite3.Connection, row: Dict, spec_id: Optional[int]) -> int:
+    key = doctor_key(row)
+    values = [_value(row, f) for f in DOCTOR_FIELDS]
+    conn.execute(
+        f"""INSERT INTO doctors(doctor_key, specialization_id, {", ".join(DOCTOR_FIELDS)})
+            VALUES (?, ?, {", ".join("?" for _ in DOCTOR_FIELDS)})
+            ON CONFLICT(doctor_key) DO UPDATE SET
+            specialization_id = COALESCE(excluded.specialization_id, doctors.specialization_id),
+            {", ".join(f"{f} = CASE WHEN COALESCE(excluded.{f}, '') != '' THEN excluded.{f} ELSE doctors.{f} END" for f in DOCTOR_FIELDS)}""",
+        [key, spec_id] + values,
+    )
+    return conn.execute("SELECT id FROM doctors WHERE doctor_key = ?", (key,)).fetchone()[0]
+
+
+PRACTICE_MATCH = "doctor_id = ? AND hospital_id = ? AND consultation_type = ?"
+
+
+def _practice_key(rowid: int, row: Dict) -> list:
+    return [rowid, hospital_id(row), (row.get("consultation_type") or "").strip()]
+
+
+def write_rows(rows: Iterable[Dict], path: str = OUTPUT_DB, upsert: bool = False) -> int:
+    # upsert=True updates the stored practice of the same doctor, hospital and
+    # consultation type in place instead of appending a new one. Duplicates
+    # within `rows` are always merged first.
+    conn = connect(path)
+    rows = merge_rows(rows)
+    city_ids: Dict[str, int] = {}
+    spec_ids: Dict[str, int] = {}
+    doctor_ids: Dict[str, int] = {}
+    update_fields = [f for f in PRACTICE_FIELDS if f != "raw_source_url"]
+    n = 0
+    with conn:
+        for r in rows:
+            add_typed_columns(r)
+            key = doctor_key(r)
+            if key not in doctor_ids:
+                spec_id = _lookup_id(conn, "specializations", r.get("specialization"), spec_ids)
+                doctor_ids[key] = _upsert_doctor(conn, r, spec_id)
+            city_id = _lookup_id(conn, "cities", r.get("city"), city_ids)
+            hospital_city_id = _lookup_id(conn, "cities", r.get("hospital_city"), city_ids)
+            if upsert:
+                cur = conn.execute(
+                    f"""UPDATE practices SET city_id = ?, hospital_city_id = ?,
+                        {", ".join(f"{SQL_NAMES[f]} = ?" for f in update_fields)}
+                        WHERE {PRACTICE_MATCH}""",
+                    [city_id, hospital_city_id] + [_value(r, f) for f in update_fields]
+                    + _practice_key(doctor_ids[key], r),
+                )
+                if cur.rowcount:
+                    n += 1
+                    continue
+            conn.execute(
+                f"""INSERT INTO practices(doctor_id, city_id, hospital_city_id,
+                    {", ".join(SQL_NAMES[f] for f in PRACTICE_FIELDS)})
+                    VALUES (?, ?, ?, {", ".join("?" for _ in PRACTICE_FIELDS)})""",
+                [doctor_ids[key], city_id, hospital_city_id] + [_value(r, f) for f in PRACTICE_FIELDS],
+            )
+            n += 1
+    return n
+
+
+def _doctor_id(conn: sqlite3.Connection, row: Dict) -> Optional[int]:
+    rec = conn.execute("SELECT id FROM doctors WHERE doctor_key = ?", (doctor_key(row),)).fetchone()
+    return rec[0] if rec else None
+
+
+def delete_rows(rows: Iterable[Dict], path: str = OUTPUT_DB) -> int:
+    # practices that disappeared from the listing page they were scraped from
+    conn = connect(path)
+    n = 0
+    with conn:
+        for r in rows:
+            rowid = _doctor_id(conn, r)
+            if rowid is None:
+                continue
+            n += conn.execute(f"DELETE FROM practices WHERE {PRACTICE_MATCH} AND raw_source_url = ?",
+                              _practice_key(rowid, r) + [r.get("raw_source_url") or ""]).rowcount
+        # doctors left without any practice
+        conn.execute("DELETE FROM doctors WHERE id NOT IN (SELECT doctor_id FROM practices)")
+    return n
+
+
+def touch_rows(rows: Iterable[Dict], path: str = OUTPUT_DB) -> int:
+    # re-verified but unchanged practices: only scraped_at moves
+    conn = connect(path)
+    n = 0
+    with conn:
+        for r in rows:
+            rowid = _doctor_id(conn, r)
+            if rowid is not None:
+                n += conn.execute(f"UPDATE practices SET scraped_at = ? WHERE {PRACTICE_MATCH}",
+                                  [r.get("scraped_at")] + _practice_key(rowid, r)).rowcount
+    return n
+
+
+def read_rows(path: str = OUTPUT_DB, where: str = "", params: Iterable = ()) -> List[Dict]:
+    conn = connect(path)
+    sql = "SELECT * FROM kb_rows" + (f" WHERE {where}" if where else "")
+    out = []
+    for rec in conn.execute(sql, tuple(params)):
+        d = dict(rec)
+        d["complete address"] = d.pop("complete_address")
+        out.append(d)
+    return out
+
+
+def read_cities(path: str = OUTPUT_DB) -> set:
+    if not os.path.isfile(path):
+        return set()
+    conn = connect(path)
+    return {r[0] for r in conn.execute(
+        "SELECT DISTINCT c.name FROM practices p JOIN cities c ON c.id = p.city_id")}
+
+
+# ---------- CSV / Parquet interchange ----------
+def import_csv(csv_path: str, path: str = OUTPUT_DB) -> int:
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return write_rows(csv.DictReader(f), path)
+
+
+def export_csv(csv_path: str, path: str = OUTPUT_DB) -> int:
+    rows = read_rows(path)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: (r.get(k) if r.get(k) is not None else "") for k in CSV_COLUMNS})
+    return len(rows)
+
+
+def export_parquet(out_dir: str, path: str = OUTPUT_DB):
+    # pyarrow is only needed for this export
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    conn = connect(path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    doctors = [dict(r) for r in conn.execute(
+        "SELECT d.*, s.name AS specialization FROM doctors d "
+        "LEFT JOIN specializations s ON s.id = d.specialization_id")]
+    practices = [dict(r) for r in conn.execute(
+        "SELECT p.*, c.name AS city, hc.name AS hospital_city FROM practices p "
+        "LEFT JOIN cities c ON c.id = p.city_id "
+        "LEFT JOIN cities hc ON hc.id = p.hospital_city_id")]
+
+    def table(records: List[Dict], drop: List[str], dict_cols: List[str]):
+        cols = [c for c in (records[0].keys() if records else []) if c not in drop]
+        t = pa.table({c: [r[c] for r in records] for c in cols})
+        for c in dict_cols:
+            t = t.set_column(t.schema.get_field_index(c), c, t[c].dictionary_encode())
+        return t
+
+    pq.write_table(table(doctors, ["specialization_id"], ["specialization"]),
+                   os.path.join(out_dir, "doctors.parquet"))
+    pq.write_table(table(practices, ["city_id", "hospital_city_id"], ["city", "hospital_city"]),
+                   os.path.join(out_dir, "practices.parquet"))
+
+
+if __name__ == "__main__":
+    import sys
+
+    usage = "usage: python kb_store.py import|export|parquet <path> [db]"
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "export", "parquet"):
+        print(usage)
+        sys.exit(1)
+    cmd, target = sys.argv[1], sys.argv[2]
+    db = sys.argv[3] if len(sys.argv) > 3 else OUTPUT_DB
+    if cmd == "import":
+        print(f"Imported {import_csv(target, db)} rows into {db}")
+    elif cmd == "export":
+        print(f"Exported {export_csv(target, db)} rows to {target}")
+    else:
+        export_parquet(target, db)
+        print(f"Wrote doctors.parquet and practices.parquet to {target}")
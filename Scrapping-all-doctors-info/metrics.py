@@ -0,0 +1,212 @@
+# metrics.py
+# Timing spans, counters and latency histograms for both scrapers.
+#
+#   with METRICS.span("navigation", kind="listing", url=url):
+#       await page.goto(url)
+#   METRICS.inc("cards", len(cards))
+#   METRICS.write("run_metrics.json")   # or .prom / .txt for OpenMetrics text
+#
+# Every span lands in a histogram keyed by (span, kind) with fixed buckets, so
+# memory stays flat however many pages a run loads; the slowest URLs seen are
+# kept separately. Collection is off unless MARHAM_METRICS names an output
+# file (or a caller enables it): a disabled span() hands back one shared no-op
+# context manager and inc()/observe() return at the first check.
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+METRICS_FILE = os.getenv("MARHAM_METRICS")  # unset: collection off
+PREFIX = "marham"
+# histogram upper bounds in seconds (+Inf is implied)
+BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SLOWEST_URLS = 20
+
+Key = Tuple[str, Optional[str]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "kind", "url", "started")
+
+    def __init__(self, metrics: "Metrics", name: str, kind: Optional[str], url: Optional[str]):
+        self.metrics, self.name, self.kind, self.url = metrics, name, kind, url
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, self.kind, self.url,
+                             failed=exc_type is not None)
+        return False
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum", "max", "failed")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.failed = 0
+
+    def add(self, seconds: float, failed: bool):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.failed += failed
+
+    def quantile(self, q: float) -> Optional[float]:
+        # upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, path: Optional[str] = None):
+        self.enabled = enabled
+        self.path = path
+        self.started = time.time()
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, _Histogram] = {}
+        self.slowest: List[Tuple[float, str, str]] = []  # min-heap of (seconds, span, url)
+        self._lock = threading.Lock()  # the LLM call and input() run in threads
+
+    # ---------- recording ----------
+    def span(self, name: str, kind: Optional[str] = None, url: Optional[str] = None):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, kind, url)
+
+    def inc(self, name: str, n: float = 1, kind: Optional[str] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[(name, kind)] = self.counters.get((name, kind), 0) + n
+
+    def observe(self, name: str, seconds: float, kind: Optional[str] = None, url: Optional[str] = None,
+                failed: bool = False):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get((name, kind))
+            if hist is None:
+                hist = self.histograms[(name, kind)] = _Histogram()
+            hist.add(seconds, failed)
+            if url:
+                entry = (seconds, name, url)
+                if len(self.slowest) < SLOWEST_URLS:
+                    heapq.heappush(self.slowest, entry)
+                elif entry > self.slowest[0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+    # ---------- export ----------
+    @staticmethod
+    def _label(name: str, kind: Optional[str]) -> str:
+        return f"{name}[{kind}]" if kind else name
+
+    def summary(self) -> Dict:
+        with self._lock:
+            spans = {}
+            for (name, kind), h in sorted(self.histograms.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+                spans[self._label(name, kind)] = {
+                    "count": h.count, "failed": h.failed, "total_s": round(h.sum, 3),
+                    "mean_ms": round(1000 * h.sum / h.count, 2), "p50_le_s": h.quantile(0.5),
+                    "p95_le_s": h.quantile(0.95), "max_s": round(h.max, 3),
+                    "buckets": {("+Inf" if i == len(BUCKETS) else str(BUCKETS[i])): n
+                                for i, n in enumerate(h.counts) if n},
+                }
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "wall_s": round(time.time() - self.started, 3),
+                "counters": {self._label(n, k): v for (n, k), v in sorted(self.counters.items(),
+                                                                          key=lambda kv: (kv[0][0], kv[0][1] or ""))},
+                "spans": spans,
+                "slowest_urls": [{"span": s, "url": u, "seconds": round(t, 3)}
+                                 for t, s, u in sorted(self.slowest, reverse=True)],
+            }
+
+    def openmetrics(self) -> str:
+        def labels(kind: Optional[str], **extra) -> str:
+            pairs = ([("kind", kind)] if kind else []) + list(extra.items())
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (n, kind), v in sorted(self.counters.items(), key=lambda kv: kv[0][1] or ""):
+                    if n == name:
+                        lines.append(f"{PREFIX}_{name}_total{labels(kind)} {v}")
+            for name in sorted({n for n, _ in self.histograms}):
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                lines.append(f"# UNIT {metric} seconds")
+                for (n, kind), h in sorted(self.histograms.items(), key=lambda kv: kv[0][1] or ""):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for i, c in enumerate(h.counts):
+                        cumulative += c
+                        le = "+Inf" if i == len(BUCKETS) else repr(BUCKETS[i])
+                        lines.append(f"{metric}_bucket{labels(kind, le=le)} {cumulative}")
+                    lines.append(f"{metric}_count{labels(kind)} {h.count}")
+                    lines.append(f"{metric}_sum{labels(kind)} {h.sum:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Optional[str] = None) -> Optional[str]:
+        # JSON summary, or OpenMetrics text for a .prom / .txt path; nothing when disabled
+        path = path or self.path
+        if not self.enabled or not path:
+            return None
+        body = self.openmetrics() if path.endswith((".prom", ".txt")) else json.dumps(self.summary(), indent=2)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        return path
+
+    def enable(self, path: Optional[str] = None):
+        self.enabled = True
+        self.path = path or self.path
+
+    def report(self) -> str:
+        # one line per span for the end-of-run printout
+        out = []
+        for label, s in self.summary()["spans"].items():
+            out.append(f"  {label:28s} {s['count']:6d} x  mean {s['mean_ms']:9.1f} ms  "
+                       f"p95 <= {s['p95_le_s']} s  total {s['total_s']:.1f} s")
+        return "\n".join(out)
+
+
+# one registry per process, shared by every module
+METRICS = Metrics(enabled=bool(METRICS_FILE), path=METRICS_FILE)
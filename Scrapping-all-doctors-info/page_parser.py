@@ -0,0 +1,475 @@
+# page_parser.py
+# Browser-free parsing of Marham listing and profile pages.
+#
+# scrape_doctors.py reads cards through Playwright element handles while it
+# crawls; this module applies the same selectors and the same metric clean-up
+# to saved HTML (html_archive.py), so reparse.py can rebuild the knowledge base
+# from the archive. The metric/schedule helpers below are shared by both paths.
+#
+# Only the stdlib is used: a small DOM is built with html.parser and queried
+# with the subset of CSS the scraper uses (tag, .class, #id, [attr], [attr=v],
+# [attr*=v], [attr^=v], descendant and ">" combinators, selector lists).
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from kb_numeric import parse_fee, typed_values
+from trigram_index import TrigramIndex
+
+DEFAULT_BASE = "https://www.marham.pk"
+
+# same selectors as the Playwright crawler
+CARD_SEL = "div.row.shadow-card"
+PROFILE_LINK_SEL = "a.dr_profile_opened_from_listing, a.text-blue, a.dr_profile_open_frm_listing_btn_vprofile"
+IMAGE_SOURCE_SEL = "picture source[media*='min-width'], picture source"
+IMAGE_SEL = "img.round-img"
+METRIC_SEL = "div.row > div.col-4, div.col-4"
+SPEC_SEL = "p.mb-0.mt-10.text-sm, p.mb-0.text-sm"
+SPEC_FALLBACK_SEL = "div.col-9.col-md-10 p.text-sm"
+QUAL_SEL = "p.text-sm"
+CHIP_SEL = "span.chips-highlight, span.chips"
+PRODUCT_SEL = "div.product-card, div.card-hospital, div.selectAppointmentOrOc"
+NOTE_SEL = "p.text-sm.text-wrap, p.text-sm, p"
+SCHEDULE_BLOCK_SEL = "section.p-xy .shadow-card, section.p-xy div.shadow-card"
+NEXT_SEL = "a[rel='next'], a.next, li.next a"
+
+
+# ---------- Minimal DOM ----------
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+             "meta", "param", "source", "track", "wbr"}
+BLOCK_TAGS = {"address", "article", "aside", "blockquote", "dd", "div", "dl", "dt",
+              "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+              "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+              "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"}
+SKIP_TEXT_TAGS = {"script", "style", "noscript", "template"}
+# opening <key> implicitly closes these when they are the current element
+IMPLIED_END = {"li": {"li"}, "dt": {"dt", "dd"}, "dd": {"dt", "dd"},
+               "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"}}
+
+
+class Element:
+    __slots__ = ("tag", "attrs", "parent", "children", "classes")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Element"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List = []
+        self.classes = set(attrs.get("class", "").split())
+
+    def get(self, name: str) -> Optional[str]:
+        return self.attrs.get(name)
+
+    def iter(self):
+        # descendants in document order
+        stack = list(reversed([c for c in self.children if isinstance(c, Element)]))
+        while stack:
+            el = stack.pop()
+            yield el
+            stack.extend(reversed([c for c in el.children if isinstance(c, Element)]))
+
+    def select(self, selector: str) -> List["Element"]:
+        group = compile_selector(selector)
+        return [el for el in self.iter() if any(_matches(el, parts) for parts in group)]
+
+    def select_one(self, selector: str) -> Optional["Element"]:
+        group = compile_selector(selector)
+        for el in self.iter():
+            if any(_matches(el, parts) for parts in group):
+                return el
+        return None
+
+    def text(self) -> str:
+        # approximation of innerText: block elements and <br> break lines
+        out: List[str] = []
+        _collect_text(self, out)
+        lines = (re.sub(r"[ \t\r\f]+", " ", ln).strip(" \t\r\f") for ln in "".join(out).split("\n"))
+        return "\n".join(ln for ln in lines if ln)
+
+
+def _collect_text(el: Element, out: List[str]):
+    if el.tag in SKIP_TEXT_TAGS:
+        return
+    if el.tag == "br":
+        out.append("\n")
+        return
+    block = el.tag in BLOCK_TAGS
+    if block:
+        out.append("\n")
+    for c in el.children:
+        if isinstance(c, Element):
+            _collect_text(c, out)
+        else:
+            out.append(c.replace("\n", " "))
+    if block:
+        out.append("\n")
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", {}, None)
+        self.stack: List[Element] = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        current = self.stack[-1]
+        implied = IMPLIED_END.get(tag)
+        if implied and current.tag in implied:
+            self.stack.pop()
+            if tag == "tr" and self.stack[-1].tag == "tr":
+                self.stack.pop()
+        elif tag in BLOCK_TAGS and current.tag == "p":
+            self.stack.pop()
+        parent = self.stack[-1]
+        el = Element(tag, {k: (v or "") for k, v in attrs}, parent)
+        parent.children.append(el)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.stack[-1].tag == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> Element:
+    builder = _TreeBuilder()
+    builder.feed(html or "")
+    builder.close()
+    return builder.root
+
+
+# ---------- Selectors ----------
+_COMPOUND_RE = re.compile(r"([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[^\]]+\])*)$")
+_PART_RE = re.compile(r"[.#][\w-]+|\[[^\]]+\]")
+_ATTR_RE = re.compile(r"\[\s*([\w-]+)\s*(?:([*^$~]?=)\s*['\"]?(.*?)['\"]?)?\s*\]")
+# compounds (attribute brackets may hold spaces, commas and ">"), combinators and commas
+_TOKEN_RE = re.compile(r"(?:[^\s>,\[]+|\[[^\]]*\])+|>|,")
+_selector_cache: Dict[str, list] = {}
+
+
+def _compile_compound(text: str):
+    m = _COMPOUND_RE.match(text)
+    if not m:
+        raise ValueError(f"unsupported selector: {text!r}")
+    tag = m.group(1) if m.group(1) not in (None, "*") else None
+    classes, ident, attrs = set(), None, []
+    for part in _PART_RE.findall(m.group(2) or ""):
+        if part[0] == ".":
+            classes.add(part[1:])
+        elif part[0] == "#":
+            ident = part[1:]
+        else:
+            a = _ATTR_RE.match(part)
+            attrs.append((a.group(1), a.group(2), a.group(3)))
+    return tag, classes, ident, attrs
+
+
+def compile_selector(selector: str) -> list:
+    # "a b > c, d" -> [[(None, a), (" ", b), (">", c)], [(None, d)]]
+    if selector in _selector_cache:
+        return _selector_cache[selector]
+    group, parts, comb = [], [], None
+    for tok in _TOKEN_RE.findall(selector) + [","]:
+        if tok == ",":
+            if parts:
+                group.append(parts)
+            parts, comb = [], None
+        elif tok == ">":
+            comb = ">"
+        else:
+            parts.append((comb or (" " if parts else None), _compile_compound(tok)))
+            comb = None
+    _selector_cache[selector] = group
+    return group
+
+
+# compile the selector constants at import: a broken selector (or regex) fails
+# here instead of on the first listing page
+for _sel in (CARD_SEL, PROFILE_LINK_SEL, IMAGE_SOURCE_SEL, IMAGE_SEL, METRIC_SEL, SPEC_SEL,
+             SPEC_FALLBACK_SEL, QUAL_SEL, CHIP_SEL, PRODUCT_SEL, NOTE_SEL, SCHEDULE_BLOCK_SEL, NEXT_SEL):
+    compile_selector(_sel)
+
+
+def _match_compound(el: Element, compound) -> bool:
+    tag, classes, ident, attrs = compound
+    if tag and el.tag != tag.lower():
+        return False
+    if classes and not classes <= el.classes:
+        return False
+    if ident and el.attrs.get("id") != ident:
+        return False
+    for name, op, value in attrs:
+        actual = el.attrs.get(name)
+        if actual is None:
+            return False
+        if op == "=" and actual != value:
+            return False
+        if op == "*=" and value not in actual:
+            return False
+        if op == "^=" and not actual.startswith(value):
+            return False
+        if op == "$=" and not actual.endswith(value):
+            return False
+        if op == "~=" and value not in actual.split():
+            return False
+    return True
+
+
+def _matches(el: Element, parts: list, i: Optional[int] = None) -> bool:
+    i = len(parts) - 1 if i is None else i
+    comb, compound = parts[i]
+    if not _match_compound(el, compound):
+        return False
+    if i == 0:
+        return True
+    if comb == ">":
+        parent = el.parent
+        return parent is not None and parent.tag != "#document" and _matches(parent, parts, i - 1)
+    anc = el.parent
+    while anc is not None and anc.tag != "#document":
+        if _matches(anc, parts, i - 1):
+            return True
+        anc = anc.parent
+    return False
+
+
+def _text(el: Optional[Element]) -> str:
+    return el.text().strip() if el is not None else ""
+
+
+# ---------- Shared helpers (also used by the Playwright crawler) ----------
+def normalise_href(href: Optional[str], base: str = DEFAULT_BASE) -> Optional[str]:
+    if not href:
+        return None
+    href = href.strip()
+    if href.startswith("//"):
+        return "https:" + href
+    if href.startswith("http"):
+        return href
+    return urljoin(base, href)
+
+
+def is_reviews_candidate(s: str) -> bool:
+    if not s:
+        return False
+    s = s.strip()
+    if re.search(r'yr|year', s, re.I) or '%' in s:
+        return False
+    m = re.search(r'(\d{1,3}(?:,\d{3})*)', s)
+    if m and not re.search(r'[A-Za-z]', s):
+        return True
+    return False
+
+
+def classify_line_for_metric(line: str) -> Optional[Tuple[str, str]]:
+    if not line:
+        return None
+    s = line.strip()
+    if re.search(r'(\d+\s*(?:yrs?|years?|yr))', s, re.I):
+        return ("experience", re.search(r'(\d+\s*(?:yrs?|years?|yr))', s, re.I).group(1).strip())
+    if re.search(r'(\d{1,3}\s*%)', s):
+        return ("satisfaction_rate", re.search(r'(\d{1,3}\s*%)', s).group(1).strip())
+    if is_reviews_candidate(s):
+        m = re.search(r'(\d{1,3}(?:,\d{3})*)', s)
+        return ("reviews", m.group(1).strip()) if m else ("reviews", s)
+    return None
+
+
+def metric_values(block_texts: List[str]) -> Dict[str, Any]:
+    # inner text of each "div.col-4" metric block -> experience / satisfaction / reviews
+    mapping: Dict[str, Any] = {}
+    for txt in block_texts:
+        txt = (txt or "").strip()
+        if not txt:
+            continue
+        lines = [ln.strip() for ln in re.split(r'\r?\n', txt) if ln.strip()]
+        cls = classify_line_for_metric(lines[1] if len(lines) >= 2 else lines[0])
+        if cls:
+            mapping[cls[0]] = cls[1]
+
+    # --- FIX: regex cleanup for misaligned experience/reviews ---
+    if "reviews" in mapping:
+        rev_val = mapping["reviews"].strip()
+        if re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I):
+            mapping.pop("reviews", None)
+            mapping["experience"] = re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I).group(0)
+        elif re.search(r"\b\d{1,3}\s*%", rev_val):
+            mapping.pop("reviews", None)
+            mapping["satisfaction_rate"] = re.search(r"\b\d{1,3}\s*%", rev_val).group(0)
+        elif re.search(r"[A-Za-z]", rev_val) and not re.match(r"^\d+(?:,\d{3})*$", rev_val):
+            mapping.pop("reviews", None)
+    if "reviews" in mapping:
+        val = mapping["reviews"]
+        if not re.match(r"^\d{1,3}(?:,\d{3})*$", val.strip()):
+            mapping.pop("reviews", None)
+
+    # --- typed copies: experience_years / satisfaction_pct / reviews_count ---
+    mapping.update({k: v for k, v in typed_values(mapping).items() if v is not None})
+    return mapping
+
+
+def match_schedule_for_hospital(hospital_name: str, schedules: Optional[Dict[str, str]]) -> Optional[str]:
+    if not schedules or not hospital_name:
+        return None
+    lname = hospital_name.lower()
+    for t, s in schedules.items():
+        tt = t.lower()
+        if tt == lname or tt in lname or lname in tt:
+            return s
+    # spelling variants ("Shifa Intl" vs "Shifa International Hospital")
+    best = TrigramIndex(schedules).best(hospital_name, min_score=0.25)
+    return schedules.get(best) if best else None
+
+
+def consultation_type(hospital_name: str, hospital_type: Optional[str]) -> str:
+    if ("video" in hospital_name.lower()) or (hospital_type and hospital_type.strip() == "2"):
+        return "Video Consultation"
+    return "Hospital"
+
+
+def build_row(card: Dict, product: Dict, city_name: str, city_url: str, scraped_at: str,
+              schedule: Optional[str]) -> Dict:
+    # one knowledge-base row per doctor card x product card (practice)
+    hosp_name = (product.get("hospital_name") or "").strip() or "Unknown"
+    hosp_city = (product.get("hospital_city") or "").strip() or city_name
+    fee = (product.get("amount") or "").strip()
+    return {
+        "city": hosp_city, "name": card["name"], "specialization": card["specialization"],
+        "qualification": card["qualification"], "experience": card["experience"],
+        "satisfaction_rate": card["satisfaction_rate"], "reviews": card["reviews"],
+        "areas_of_interest": card["areas_of_interest"],
+        "consultation_type": consultation_type(hosp_name, product.get("hospital_type")),
+        "hospital_name": hosp_name, "hospital_address": (product.get("hospital_address") or "").strip(),
+        "hospital_city": hosp_city, "complete address": product.get("note") or "",
+        "availability_schedule": schedule or "", "fee": fee,
+        "profile_url": card["profile_url"] or "", "image_url": card["image_url"] or "",
+        "raw_source_url": city_url, "fee_pkr": parse_fee(fee),
+        "experience_years": card.get("experience_years"),
+        "satisfaction_pct": card.get("satisfaction_pct"),
+        "reviews_count": card.get("reviews_count"),
+        "scraped_at": scraped_at,
+    }
+
+
+# ---------- Listing pages ----------
+def parse_card(card: Element, base: str = DEFAULT_BASE) -> Dict:
+    anchor = card.select_one(PROFILE_LINK_SEL)
+    src = card.select_one(IMAGE_SOURCE_SEL)
+    img = src.get("srcset") if src is not None else None
+    if not img:
+        im = card.select_one(IMAGE_SEL)
+        img = im.get("src") if im is not None else None
+
+    labels = metric_values([m.text() for m in card.select(METRIC_SEL)])
+    spec_el = card.select_one(SPEC_SEL) or card.select_one(SPEC_FALLBACK_SEL)
+    specialization = _text(spec_el)
+    qual_els = card.select(QUAL_SEL)
+    qualification = ""
+    if len(qual_els) >= 2:
+        qualification = _text(qual_els[1])
+    elif len(qual_els) == 1 and not specialization:
+        qualification = _text(qual_els[0])
+
+    products = []
+    for pc in card.select(PRODUCT_SEL):
+        products.append({
+            "hospital_name": pc.get("data-hospitalname"),
+            "hospital_city": pc.get("data-hospitalcity"),
+            "hospital_address": pc.get("data-hospitaladdress"),
+            "amount": pc.get("data-amount"),
+            "hospital_type": pc.get("data-hospitaltype"),
+            "note": _text(pc.select_one(NOTE_SEL)),
+        })
+
+    return {
+        "name": _text(card.select_one("h3")),
+        "profile_url": normalise_href(anchor.get("href"), base) if anchor is not None else None,
+        "image_url": img,
+        "specialization": specialization,
+        "qualification": qualification,
+        "experience": labels.get("experience", ""),
+        "satisfaction_rate": labels.get("satisfaction_rate", ""),
+        "reviews": labels.get("reviews", ""),
+        "experience_years": labels.get("experience_years"),
+        "satisfaction_pct": labels.get("satisfaction_pct"),
+        "reviews_count": labels.get("reviews_count"),
+        "areas_of_interest": ", ".join(t for t in (_text(c) for c in card.select(CHIP_SEL)) if t),
+        "products": products,
+    }
+
+
+def parse_listing(html: str, base: str = DEFAULT_BASE) -> Tuple[List[Dict], Optional[str]]:
+    # -> (doctor cards, next page URL)
+    doc = parse_html(html)
+    cards = [parse_card(c, base) for c in doc.select(CARD_SEL)]
+    nxt = doc.select_one(NEXT_SEL)
+    return cards, (normalise_href(nxt.get("href"), base) if nxt is not None else None)
+
+
+_A_TAG_RE = re.compile(r"<a\b([^>]*)>", re.IGNORECASE)
+_LI_NEXT_RE = re.compile(r"<li\b[^>]*\bclass=[\"'][^\"']*\bnext\b[^\"']*[\"'][^>]*>\s*<a\b([^>]*)>", re.IGNORECASE)
+_HTML_ATTR_RE = re.compile(r"([\w-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+
+
+def parse_attrs(attr_text: str) -> Dict[str, str]:
+    # the quoted attributes of one start tag's text, names lowercased
+    return {k.lower(): a if a else b for k, a, b in _HTML_ATTR_RE.findall(attr_text)}
+
+
+def next_page_url(html: str, current: Optional[str] = None, base: str = DEFAULT_BASE) -> Optional[str]:
+    # NEXT_SEL without building the DOM: the first <a rel="next">, <a class="next">
+    # or <li class="next"><a>; None when missing or pointing back at current
+    href = None
+    for m in _A_TAG_RE.finditer(html):
+        attrs = parse_attrs(m.group(1))
+        if "next" in attrs.get("rel", "").lower().split() or "next" in attrs.get("class", "").split():
+            href = attrs.get("href")
+            break
+    if href is None:
+        m = _LI_NEXT_RE.search(html)
+        if m:
+            href = parse_attrs(m.group(1)).get("href")
+    url = normalise_href(href, current or base) if href else None
+    return url if url and url != current else None
+
+
+def parse_profile_schedules(html: str) -> Optional[Dict[str, str]]:
+    # hospital title -> "Mon: 11:00 AM - 04:00 PM; Tue: ..."
+    schedules: Dict[str, str] = {}
+    for b in parse_html(html).select(SCHEDULE_BLOCK_SEL):
+        title = _text(b.select_one("h3"))
+        if not title:
+            continue
+        weekly = []
+        for tr in b.select("table tr"):
+            cols = tr.select("td")
+            if len(cols) >= 2:
+                day, hours = _text(cols[0]), _text(cols[1])
+                if day and hours:
+                    weekly.append(f"{day}: {hours}")
+        if weekly:
+            schedules[title] = "; ".join(weekly)
+    return schedules or None
+
+
+def listing_rows(cards: List[Dict], city_name: str, city_url: str, scraped_at: str,
+                 profile_schedules: Dict[str, Optional[Dict[str, str]]]) -> List[Dict]:
+    rows: List[Dict] = []
+    for card in cards:
+        timings = profile_schedules.get(card["profile_url"]) if card["profile_url"] else None
+        for product in card["products"]:
+            hosp_name = (product.get("hospital_name") or "").strip() or "Unknown"
+            schedule = match_schedule_for_hospital(hosp_name, timings) if timings else None
+            rows.append(build_row(card, product, city_name, city_url, scraped_at, schedule))
+    return rows
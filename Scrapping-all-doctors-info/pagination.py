@@ -0,0 +1,46 @@
+# pagination.py
+# The listing pagination loop shared by the batch crawler
+# (scrape_doctors.scrape_city_with_pagination) and the realtime scraper
+# (MarhamScraper.stream_doctors).
+#
+# A caller supplies load(url, page_no) -> (items, next_url). Pages are walked
+# lazily: the next one is only loaded when the consumer asks for it, or, with
+# prefetch, in the background while the consumer works through the current
+# page. Walking stops at an empty page, a missing next link, a link back to a
+# page already seen, or after page number max_pages.
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Set, Tuple
+
+Loader = Callable[[str, int], Awaitable[Tuple[Any, Optional[str]]]]
+
+
+async def iter_pages(load: Loader, first_url: str, max_pages: Optional[int] = None, first_page: int = 1,
+                     prefetch: bool = False) -> AsyncIterator[Tuple[int, str, Any]]:
+    # yields (page_no, url, items); close the generator (aclose) to stop early,
+    # which also cancels a prefetch still in flight
+    url: Optional[str] = first_url
+    page_no = first_page
+    seen: Set[str] = set()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while url and url not in seen and (max_pages is None or page_no <= max_pages):
+            seen.add(url)
+            if pending is not None:
+                items, next_url = await pending
+                pending = None
+            else:
+                items, next_url = await load(url, page_no)
+            if not items:
+                return
+            if next_url in seen:
+                next_url = None
+            if prefetch and next_url and (max_pages is None or page_no < max_pages):
+                pending = asyncio.ensure_future(load(next_url, page_no + 1))
+            yield page_no, url, items
+            url, page_no = next_url, page_no + 1
+    finally:
+        if pending is not None:
+            if not pending.done():
+                pending.cancel()
+            elif not pending.cancelled():
+                pending.exception()  # a prefetch nobody will read
@@ -0,0 +1,119 @@
+# reparse.py
+# Rebuild the knowledge base from the raw HTML archive, without the network.
+#
+# scrape_doctors.py stores every listing and profile page it loads when
+# MARHAM_ARCHIVE_DIR is set (see html_archive.py). After a parser fix, run
+#   python reparse.py --archive DIR [--out doctors_knowledge_base.reparsed.csv | --db PATH]
+#                     [--workers N]
+# Listing pages are parsed in a process pool (one task per page, each worker
+# parses the profiles its cards link to), so the rebuild runs at parse speed
+# on all cores. The newest archived copy of each URL is used, and practices
+# listed on several pages are merged into one row (entities.py).
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import kb_store
+from entities import merge_rows
+from html_archive import ARCHIVE_DIR, HtmlArchive
+from kb_store import CSV_COLUMNS
+from page_parser import listing_rows, parse_listing, parse_profile_schedules
+
+DEFAULT_OUT = "doctors_knowledge_base.reparsed.csv"
+
+# per-worker state, set by _init_worker
+_archive: Optional[HtmlArchive] = None
+_profiles: Dict[str, str] = {}
+_schedules: Dict[str, Optional[Dict[str, str]]] = {}
+
+
+def _init_worker(root: str, profiles: Dict[str, str]):
+    global _archive, _profiles
+    _archive = HtmlArchive(root)
+    _profiles = profiles
+
+
+def _profile_schedules(url: str) -> Optional[Dict[str, str]]:
+    # profiles are linked from several listings; parse each once per worker
+    if url not in _schedules:
+        digest = _profiles.get(url)
+        _schedules[url] = parse_profile_schedules(_archive.get(digest)) if digest else None
+    return _schedules[url]
+
+
+def city_from_url(url: str) -> str:
+    # .../doctors/lahore?page=2 and .../doctors/lahore/dermatologist -> "Lahore"
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    slug = parts[parts.index("doctors") + 1] if "doctors" in parts[:-1] else (parts[-1] if parts else "")
+    return slug.replace("-", " ").title()
+
+
+def parse_record(record: Dict) -> Tuple[str, List[Dict]]:
+    url = record["url"]
+    cards, _ = parse_listing(_archive.get(record["sha256"]))
+    schedules = {c["profile_url"]: _profile_schedules(c["profile_url"])
+                 for c in cards if c["profile_url"]}
+    city = (record.get("meta") or {}).get("city") or city_from_url(url)
+    return url, listing_rows(cards, city, url, record["fetched_at"], schedules)
+
+
+def reparse(root: str, workers: Optional[int] = None) -> List[Dict]:
+    archive = HtmlArchive(root)
+    listings = list(archive.latest("listing").values())
+    profiles = {url: rec["sha256"] for url, rec in archive.latest("profile").items()}
+    rows: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(root, profiles)) as pool:
+        chunk = max(1, len(listings) // ((workers or os.cpu_count() or 1) * 4))
+        for url, page_rows in pool.map(parse_record, listings, chunksize=chunk):
+            if not page_rows:
+                print(f"No rows parsed from {url}")
+            rows.extend(page_rows)
+    return merge_rows(rows)
+
+
+def write_csv(rows: List[Dict], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: (r.get(k) if r.get(k) is not None else "") for k in CSV_COLUMNS})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild the knowledge base from archived HTML")
+    ap.add_argument("--archive", default=ARCHIVE_DIR, help="archive dir (default: $MARHAM_ARCHIVE_DIR)")
+    ap.add_argument("--out", default=DEFAULT_OUT, help="CSV to write (overwritten)")
+    ap.add_argument("--db", help="write a new SQLite store here instead of a CSV")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = ap.parse_args()
+
+    if not args.archive or not os.path.isdir(args.archive):
+        print("No archive found; set MARHAM_ARCHIVE_DIR or pass --archive.")
+        return 1
+    if args.db and os.path.exists(args.db):
+        print(f"{args.db} already exists; reparse builds a fresh store.")
+        return 1
+
+    t0 = time.perf_counter()
+    rows = reparse(args.archive, args.workers)
+    parse_s = time.perf_counter() - t0
+    if args.db:
+        kb_store.write_rows(rows, args.db)
+        out = args.db
+    else:
+        write_csv(rows, args.out)
+        out = args.out
+    pages = len(HtmlArchive(args.archive).latest("listing"))
+    print(f"✅ Reparsed {pages} listing pages into {len(rows)} rows in {parse_s:.2f}s "
+          f"({pages / parse_s if parse_s else 0:.1f} pages/s). File: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
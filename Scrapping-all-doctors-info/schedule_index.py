@@ -0,0 +1,230 @@
+# schedule_index.py
+# Structured weekly schedules and an "available at time T" index.
+#
+# A schedule is {day_index: [(start_minute, end_minute), ...]} with Monday = 0
+# and minutes counted from midnight. It is parsed from the flat
+# availability_schedule strings ("Mon: 11:00 AM - 04:00 PM; Tue: ...") or from
+# the realtime scraper's [{'day', 'time'}] timing lists.
+#
+# AvailabilityIndex keeps, per day and per 15-minute slot, a bitset (Python int)
+# of the practices open during that slot, so availability queries are a few
+# integer ORs instead of a rescan and re-parse of every schedule string.
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_ALIASES = {
+    "mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5, "sun": 6, "sunday": 6,
+}
+PERIODS = {
+    "morning": (6 * 60, 12 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 21 * 60),
+    "night": (21 * 60, 24 * 60),
+}
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+Schedule = Dict[int, List[Tuple[int, int]]]
+
+TIME_RE = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\.?', re.I)
+RANGE_RE = re.compile(r'(\d{1,2}(?::\d{2})?\s*[ap]\.?\s*m\.?)\s*[-–—to]+\s*(\d{1,2}(?::\d{2})?\s*[ap]\.?\s*m\.?)', re.I)
+
+
+def parse_time(s: str) -> Optional[int]:
+    m = TIME_RE.search(s or "")
+    if not m:
+        return None
+    hour, minute = int(m.group(1)) % 12, int(m.group(2) or 0)
+    if m.group(3).lower() == "p":
+        hour += 12
+    return hour * 60 + minute
+
+
+def parse_intervals(text: str) -> List[Tuple[int, int]]:
+    # "11:00 AM - 01:00 PM, 05:00 PM - 08:00 PM" -> [(660, 780), (1020, 1200)]
+    out = []
+    for a, b in RANGE_RE.findall(text or ""):
+        start, end = parse_time(a), parse_time(b)
+        if start is not None and end is not None and start != end:
+            out.append((start, end))
+    return out
+
+
+def day_index(name: str) -> Optional[int]:
+    return DAY_ALIASES.get((name or "").strip().lower().rstrip("."))
+
+
+def _add(schedule: Schedule, day: int, start: int, end: int):
+    if end > start:
+        schedule.setdefault(day, []).append((start, end))
+    else:
+        # overnight shift ("09:00 PM - 02:00 AM") continues on the next day
+        schedule.setdefault(day, []).append((start, 24 * 60))
+        if end > 0:
+            schedule.setdefault((day + 1) % 7, []).append((0, end))
+
+
+def _normalized(schedule: Schedule) -> Schedule:
+    out: Schedule = {}
+    for day, spans in schedule.items():
+        merged: List[Tuple[int, int]] = []
+        for s, e in sorted(spans):
+            if merged and s <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        out[day] = merged
+    return out
+
+
+def parse_schedule(text: str) -> Schedule:
+    schedule: Schedule = {}
+    for part in (text or "").split(";"):
+        day_name, _, times = part.partition(":")
+        day = day_index(day_name)
+        if day is None:
+            continue
+        for start, end in parse_intervals(times):
+            _add(schedule, day, start, end)
+    return _normalized(schedule)
+
+
+def from_timings(timings: Iterable[Dict]) -> Schedule:
+    schedule: Schedule = {}
+    for t in timings or []:
+        day = day_index(t.get("day", ""))
+        if day is None:
+            continue
+        for start, end in parse_intervals(t.get("time", "")):
+            _add(schedule, day, start, end)
+    return _normalized(schedule)
+
+
+def fmt_minutes(m: int) -> str:
+    h, mm = divmod(m % (24 * 60), 60)
+    return f"{(h % 12) or 12:02d}:{mm:02d} {'AM' if h < 12 else 'PM'}"
+
+
+def format_schedule(schedule: Schedule) -> str:
+    return "; ".join(
+        f"{DAYS[d]}: " + ", ".join(f"{fmt_minutes(s)} - {fmt_minutes(e)}" for s, e in schedule[d])
+        for d in sorted(schedule)
+    )
+
+
+def is_open(schedule: Schedule, day: int, minute: int) -> bool:
+    return any(s <= minute < e for s, e in schedule.get(day, ()))
+
+
+def split_window(day: int, start: int, end: int) -> List[Tuple[int, int, int]]:
+    # a window past midnight (end > 24 * 60) continues on the next day, like
+    # an overnight shift in _add
+    if end <= 24 * 60:
+        return [(day, start, end)]
+    return [(day, start, 24 * 60), ((day + 1) % 7, 0, end - 24 * 60)]
+
+
+def overlaps(schedule: Schedule, day: int, start: int, end: int) -> bool:
+    return any(s < hi and lo < e
+               for d, lo, hi in split_window(day, start, end) for s, e in schedule.get(d, ()))
+
+
+def parse_when(text: str) -> Optional[Tuple[int, int, int]]:
+    # "saturday evening" -> (5, 1020, 1260); "sat 6 pm" -> (5, 1080, 1081);
+    # "sat 10 pm to 1 am" -> (5, 1320, 1500): end runs past midnight into Sunday
+    t = (text or "").lower()
+    day = None
+    for word in re.findall(r"[a-z]+", t):
+        if word in DAY_ALIASES:
+            day = DAY_ALIASES[word]
+            break
+    if day is None:
+        return None
+    for name, (start, end) in PERIODS.items():
+        if name in t:
+            return day, start, end
+    rng = parse_intervals(t)
+    if rng:
+        start, end = rng[0]
+        return day, start, end if end > start else end + 24 * 60
+    at = parse_time(t)
+    if at is not None:
+        return day, at, at + 1
+    return day, 0, 24 * 60
+
+
+# ---------- Interval index ----------
+def iter_bits(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class AvailabilityIndex:
+    def __init__(self, schedules: Iterable[Schedule] = ()):
+        self.schedules: List[Schedule] = []
+        # full[day][slot]: practices open for the whole slot
+        # part[day][slot]: practices open for only part of it (checked exactly)
+        self._full = [[0] * SLOTS_PER_DAY for _ in range(7)]
+        self._part = [[0] * SLOTS_PER_DAY for _ in range(7)]
+        for s in schedules:
+            self.add(s)
+
+    def __len__(self) -> int:
+        return len(self.schedules)
+
+    def add(self, schedule: Schedule) -> int:
+        pid = len(self.schedules)
+        self.schedules.append(schedule)
+        bit = 1 << pid
+        for day, spans in schedule.items():
+            full, part = self._full[day], self._part[day]
+            for start, end in spans:
+                first, last = start // SLOT_MINUTES, (end - 1) // SLOT_MINUTES
+                for slot in range(first, last + 1):
+                    s0 = slot * SLOT_MINUTES
+                    if start <= s0 and end >= s0 + SLOT_MINUTES:
+                        full[slot] |= bit
+                    else:
+                        part[slot] |= bit
+        return pid
+
+    def open_at(self, day: int, minute: int) -> int:
+        slot = minute // SLOT_MINUTES
+        bits = self._full[day][slot]
+        for pid in iter_bits(self._part[day][slot] & ~bits):
+            if is_open(self.schedules[pid], day, minute):
+                bits |= 1 << pid
+        return bits
+
+    def open_during(self, day: int, start: int, end: int) -> int:
+        # practices open at any point in [start, end); a window past midnight
+        # also covers the start of the next day
+        bits = 0
+        for d, s, e in split_window(day, start, end):
+            bits |= self._open_on(d, s, e)
+        return bits
+
+    def _open_on(self, day: int, start: int, end: int) -> int:
+        first, last = start // SLOT_MINUTES, (end - 1) // SLOT_MINUTES
+        full, part = self._full[day], self._part[day]
+        sure = maybe = 0
+        for slot in range(first, last + 1):
+            s0 = slot * SLOT_MINUTES
+            if start <= s0 and end >= s0 + SLOT_MINUTES:
+                # slot lies inside the window: any opening in it counts
+                sure |= full[slot] | part[slot]
+            else:
+                sure |= full[slot]
+                maybe |= part[slot]
+        for pid in iter_bits(maybe & ~sure):
+            if overlaps(self.schedules[pid], day, start, end):
+                sure |= 1 << pid
+        return sure
+
+    def ids(self, bits: int) -> List[int]:
+        return list(iter_bits(bits))
@@ -1,45 +1,88 @@
 # scrape_doctors_playwright_final_full_fixed.py
+import argparse
 import asyncio
 import csv
+import json
 import os
-import random
-import time
 import re
-from typing import Dict, List, Optional, Tuple
-from urllib.parse import urljoin, urlparse
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright, BrowserContext, Page, ElementHandle
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import fetch_retry
+import kb_delta
+import kb_store
+import page_parser
+from adaptive_limiter import AdaptiveLimiter, is_challenge
+from browser_pool import BrowserPool
+from entities import assign_ids, merge_rows
+from fetch_retry import (CHALLENGE, RATE_LIMITED, RETRYABLE, SERVER, UNKNOWN, CircuitBreaker,
+                         DeadLetterQueue, FetchError, status_category, with_retries)
+from html_archive import HtmlArchive
+from image_store import ImageStore, download_images
+from kb_delta import CrawlState, content_hash, diff_rows, page_id, same_listing
+from kb_store import CSV_COLUMNS
+from metrics import METRICS
+from page_parser import build_row, match_schedule_for_hospital, metric_values
+from pagination import iter_pages
 
 # ---------------- CONFIG ----------------
+BASE_URL = os.getenv("MARHAM_BASE_URL", "https://www.marham.pk")  # override for the local mock server
 OUTPUT_CSV = "doctors_knowledge_base.csv"
 HEADLESS = False          # False for first run (handle Cloudflare)
 CITY_LIMIT: Optional[int] = None
-DELAY_MIN, DELAY_MAX = 0.8, 2.0
+DELAY_MIN, DELAY_MAX = 0.3, 30.0  # bounds of the adaptive gap between page loads (adaptive_limiter.py)
+MAX_CONCURRENCY = 4       # page loads in flight at most; the limiter starts at 1 and probes upwards
+TARGET_LATENCY_S = 6.0    # slower page loads count as a sign of overload
 MAX_PAGES_PER_CITY = 8
+STORAGE_BACKEND = "csv"   # "csv" or "sqlite" (normalized store, see kb_store.py)
+OUTPUT_DB = kb_store.OUTPUT_DB
+ARCHIVE_DIR = os.getenv("MARHAM_ARCHIVE_DIR")  # keep raw listing/profile HTML for reparse.py
+IMAGES_DIR = os.getenv("MARHAM_IMAGES_DIR")    # download doctor photos after the crawl (image_store.py)
+INCREMENTAL = os.getenv("MARHAM_INCREMENTAL") == "1"  # recrawl scraped cities, store only changes
+PROFILE_REFRESH_HOURS = 24.0  # incremental: profiles checked more recently are not re-fetched
+STATE_FILE = kb_delta.STATE_FILE
+CHANGE_FEED = kb_delta.CHANGE_FEED
+MAX_RETRIES = 3                # transient page-load failures are retried with backoff (fetch_retry.py)
+FAILED_FILE = fetch_retry.FAILED_FILE  # URLs that still failed; drained by --retry-failed
+POOL_PAGES = MAX_CONCURRENCY + 1  # idle browser pages kept for reuse (see browser_pool.py)
+CONTEXT_MAX_NAVIGATIONS = 200  # recycle the browser context after this many page loads
+BROWSER_MAX_RSS_MB = 1500      # ... or when the browser processes use more memory than this
 # ----------------------------------------
 
-CSV_COLUMNS = [
-    "city", "name", "specialization", "qualification", "experience",
-    "satisfaction_rate", "reviews", "areas_of_interest", "consultation_type",
-    "hospital_name", "hospital_address", "hospital_city", "complete address",
-    "availability_schedule", "fee", "profile_url", "image_url", "raw_source_url"
-]
+ARCHIVE: Optional[HtmlArchive] = None
+STATE: Optional[CrawlState] = None
+# incremental runs: rows already stored, by listing page (kb_delta.page_id)
+PREVIOUS_ROWS: Dict[str, List[Dict]] = {}
+POOL: Optional[BrowserPool] = None
+LIMITER: Optional[AdaptiveLimiter] = None
+BREAKER = CircuitBreaker()
+FAILED: Optional[DeadLetterQueue] = None
 
 
-def rnd_sleep():
-    time.sleep(random.uniform(DELAY_MIN, DELAY_MAX))
+# ---------- CSV helpers ----------
+def csv_header(filename: str = OUTPUT_CSV) -> Optional[List[str]]:
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
 
 
-# ---------- CSV helpers ----------
 def append_rows(rows: List[Dict], filename: str = OUTPUT_CSV):
     if not rows:
         return
-    file_exists = os.path.isfile(filename)
-    with open(filename, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
-        if not file_exists:
+    # keep appending in the layout of an existing file (older files lack the typed columns)
+    header = csv_header(filename)
+    columns = header or CSV_COLUMNS
+    with METRICS.span("csv_write", kind="append"), open(filename, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        if not header:
             writer.writeheader()
         for r in rows:
-            out = {k: (r.get(k) if r.get(k) is not None else "") for k in CSV_COLUMNS}
+            out = {k: (r.get(k) if r.get(k) is not None else "") for k in columns}
             writer.writerow(out)
 
 
@@ -59,30 +102,170 @@ def read_scraped_cities(filename: str = OUTPUT_CSV) -> set:
     return s
 
 
+def read_csv_rows(filename: str = OUTPUT_CSV) -> List[Dict]:
+    if not os.path.isfile(filename):
+        return []
+    with open(filename, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def rewrite_csv(rows: List[Dict], filename: str = OUTPUT_CSV):
+    # whole-file rewrite with duplicate practices merged (entities.py); the new
+    # file has the current column layout
+    rows = merge_rows(rows)
+    tmp = filename + ".tmp"
+    with METRICS.span("csv_write", kind="rewrite"), open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: (r.get(k) if r.get(k) is not None else "") for k in CSV_COLUMNS})
+    os.replace(tmp, filename)
+
+
+def stored_keys() -> set:
+    # row_keys of the CSV knowledge base, read once per run (empty for SQLite)
+    if STORAGE_BACKEND == "sqlite":
+        return set()
+    return {kb_delta.row_key(r) for r in assign_ids(read_csv_rows(OUTPUT_CSV))}
+
+
+def save_rows(rows: List[Dict], keys: set, updates: List[Dict]):
+    # new practices are appended to the CSV and added to keys; a doctor already
+    # stored from another listing or city goes to updates, merged into the
+    # stored practice by one flush_updates() after the last city. SQLite upserts
+    # directly
+    rows = merge_rows(rows)
+    METRICS.inc("rows_saved", len(rows))
+    if STORAGE_BACKEND == "sqlite":
+        with METRICS.span("db_write"):
+            kb_store.write_rows(rows, OUTPUT_DB, upsert=True)
+        return
+    new = [r for r in rows if kb_delta.row_key(r) not in keys]
+    updates.extend(r for r in rows if kb_delta.row_key(r) in keys)
+    append_rows(new, OUTPUT_CSV)
+    keys.update(kb_delta.row_key(r) for r in new)
+
+
+def flush_updates(updates: List[Dict]):
+    # a run that stops before this keeps the stored versions of those practices
+    if updates and STORAGE_BACKEND != "sqlite":
+        rewrite_csv(read_csv_rows(OUTPUT_CSV) + updates, OUTPUT_CSV)
+        updates.clear()
+
+
+def scraped_cities() -> set:
+    if STORAGE_BACKEND == "sqlite":
+        return kb_store.read_cities(OUTPUT_DB)
+    return read_scraped_cities(OUTPUT_CSV)
+
+
+def load_rows() -> List[Dict]:
+    if STORAGE_BACKEND == "sqlite":
+        return kb_store.read_rows(OUTPUT_DB) if os.path.isfile(OUTPUT_DB) else []
+    return read_csv_rows(OUTPUT_CSV)
+
+
 # ---------------- Stealth ----------------
+STEALTH_JS = """(() => {
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US','en'] });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
+    window.chrome = window.chrome || { runtime: {} };
+})()"""
+
+
 async def apply_stealth(page: Page):
-    await page.add_init_script(
-        """() => {
-            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-            Object.defineProperty(navigator, 'languages', { get: () => ['en-US','en'] });
-            Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
-            window.chrome = window.chrome || { runtime: {} };
-        }"""
-    )
+    await page.add_init_script(STEALTH_JS)
+
+
+# ---------------- Pages ----------------
+def new_pool(browser) -> BrowserPool:
+    # the pool's contexts get the stealth script, so pooled pages need no per-page setup
+    return BrowserPool(browser, size=POOL_PAGES, max_navigations=CONTEXT_MAX_NAVIGATIONS,
+                       max_rss_mb=BROWSER_MAX_RSS_MB,
+                       context_options={"viewport": {"width": 1200, "height": 900}},
+                       init_script=STEALTH_JS)
+
+
+def new_limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(max_concurrency=MAX_CONCURRENCY, min_delay=DELAY_MIN, max_delay=DELAY_MAX,
+                           target_latency=TARGET_LATENCY_S)
+
+
+def checked_response(url: str, response):
+    # raise FetchError for a challenge page or an HTTP error status
+    status = response.status if response else None
+    if is_challenge(status, response.headers if response else None):
+        raise FetchError(CHALLENGE, url, f"challenge page (HTTP {status})", status)
+    category = status_category(status)
+    if category:
+        raise FetchError(category, url, f"HTTP {status}", status)
+    return response
+
+
+async def goto(page: Page, url: str, kind: str = "page", **kwargs):
+    # page.goto, paced by LIMITER, retried with backoff behind the host's
+    # circuit breaker; raises FetchError once retries are used up. `kind`
+    # labels the navigation in the metrics (listing, profile, ...)
+    async def attempt():
+        if LIMITER is None:
+            with METRICS.span("navigation", kind=kind, url=url):
+                return checked_response(url, await page.goto(url, **kwargs))
+        async with LIMITER.slot() as ticket:
+            try:
+                with METRICS.span("navigation", kind=kind, url=url):
+                    response = await page.goto(url, **kwargs)
+            except PlaywrightTimeoutError:
+                ticket.timeout()
+                raise
+            try:
+                return checked_response(url, response)
+            except FetchError as e:
+                if e.category == CHALLENGE:
+                    ticket.challenge()
+                elif e.category in (RATE_LIMITED, SERVER):
+                    ticket.error()
+                else:
+                    ticket.ok()  # a 404 says nothing about load
+                raise
+
+    response = await with_retries(attempt, url, BREAKER, MAX_RETRIES)
+    METRICS.inc("pages", kind=kind)
+    return response
+
+
+def record_failure(kind: str, url: str, error: BaseException, **meta):
+    print(f"[{kind} failed] {url}: {error}")
+    if FAILED is not None:
+        FAILED.add(kind, url, error, **meta)
+
+
+def record_success(kind: str, url: str):
+    if FAILED is not None:
+        FAILED.remove(kind, url)
+
+
+@asynccontextmanager
+async def open_page(context: BrowserContext):
+    # a page for one navigation: from POOL when main() set one up, else a fresh page of context
+    if POOL is not None:
+        async with POOL.page() as page:
+            yield page
+        return
+    page = await context.new_page()
+    await apply_stealth(page)
+    try:
+        yield page
+    finally:
+        try:
+            await page.close()
+        except Exception:
+            pass
 
 
 # ---------------- Utilities ----------------
-def normalise_href(href: Optional[str], base: str = "https://www.marham.pk") -> Optional[str]:
-    if not href:
-        return None
-    href = href.strip()
-    if href.startswith("//"):
-        return "https:" + href
-    if href.startswith("/"):
-        return urljoin(base, href)
-    if href.startswith("http"):
-        return href
-    return urljoin(base, href)
+def normalise_href(href: Optional[str], base: Optional[str] = None) -> Optional[str]:
+    return page_parser.normalise_href(href, base or BASE_URL)
 
 
 async def inner_text_safe(el: Optional[ElementHandle]) -> Optional[str]:
@@ -95,46 +278,62 @@ async def inner_text_safe(el: Optional[ElementHandle]) -> Optional[str]:
         return None
 
 
+async def archive_page(page: Page, url: str, kind: str, **meta):
+    if ARCHIVE is None:
+        return
+    try:
+        ARCHIVE.put(url, await page.content(), kind, **meta)
+    except Exception as e:
+        print(f"[archive error] {url}: {e}")
+
+
 # ---------------- Discover cities ----------------
 async def discover_city_links(context: BrowserContext) -> List[Tuple[str, str]]:
-    page = await context.new_page()
-    await apply_stealth(page)
-    await page.goto("https://www.marham.pk/doctors", wait_until="domcontentloaded", timeout=60000)
-    await page.wait_for_timeout(2500)
-
-    anchors = await page.query_selector_all("a[href*='/doctors/']")
-    candidates = []
-    for a in anchors:
-        try:
-            txt = (await a.inner_text() or "").strip()
-            href = await a.get_attribute("href")
-            if not href or not txt:
-                continue
-            href = normalise_href(href)
-            path = urlparse(href).path.lstrip("/").rstrip("/")
-            if path.startswith("doctors/") and path.count("/") == 1:
-                if re.search(r'\d', txt):
+    async with open_page(context) as page:
+        await goto(page, f"{BASE_URL}/doctors", kind="cities", wait_until="domcontentloaded", timeout=60000)
+        with METRICS.span("wait", kind="cities"):
+            await page.wait_for_timeout(2500)
+
+        anchors = await page.query_selector_all("a[href*='/doctors/']")
+        candidates = []
+        for a in anchors:
+            try:
+                txt = (await a.inner_text() or "").strip()
+                href = await a.get_attribute("href")
+                if not href or not txt:
                     continue
-                candidates.append((txt, href))
-        except Exception:
-            continue
+                href = normalise_href(href)
+                path = urlparse(href).path.lstrip("/").rstrip("/")
+                if path.startswith("doctors/") and path.count("/") == 1:
+                    if re.search(r'\d', txt):
+                        continue
+                    candidates.append((txt, href))
+            except Exception:
+                continue
 
-    await page.close()
     unique = list({(c, u) for c, u in candidates})
     unique.sort(key=lambda x: x[0].lower())
     return unique
 
 
 # ---------------- Profile availability ----------------
-async def extract_availability_from_profile(context: BrowserContext, profile_url: str) -> Optional[Dict[str, str]]:
-    page = None
-    try:
-        page = await context.new_page()
-        await apply_stealth(page)
-        await page.goto(profile_url, wait_until="domcontentloaded", timeout=30000)
-        await page.wait_for_timeout(1200)
+def profile_is_fresh(profile_url: str) -> bool:
+    if STATE is None:
+        return False
+    entry = STATE.get(profile_url)
+    age = STATE.age_hours(profile_url)
+    return bool(entry) and "schedules" in entry and age is not None and age < PROFILE_REFRESH_HOURS
+
 
-        blocks = await page.query_selector_all("section.p-xy .shadow-card, section.p-xy div.shadow-card")
+async def load_profile_schedules(context: BrowserContext, profile_url: str) -> Dict[str, str]:
+    # hospital title -> "Day: hours; ..."; raises FetchError when the profile cannot be loaded
+    async with open_page(context) as page:
+        await goto(page, profile_url, kind="profile", wait_until="domcontentloaded", timeout=30000)
+        with METRICS.span("wait", kind="profile"):
+            await page.wait_for_timeout(1200)
+        await archive_page(page, profile_url, "profile")
+
+        blocks = await page.query_selector_all(page_parser.SCHEDULE_BLOCK_SEL)
         schedules: Dict[str, str] = {}
         for b in blocks:
             title_el = await b.query_selector("h3")
@@ -152,113 +351,46 @@ async def extract_availability_from_profile(context: BrowserContext, profile_url
                         weekly.append(f"{day}: {hours}")
             if weekly:
                 schedules[title] = "; ".join(weekly)
-        await page.close()
-        return schedules if schedules else None
-    except Exception:
-        try:
-            if page:
-                await page.close()
-        except Exception:
-            pass
-        return None
+    if STATE is not None:
+        STATE.record(profile_url, content_hash(json.dumps(schedules, sort_keys=True)),
+                     schedules=schedules or None)
+    return schedules
 
 
-def match_schedule_for_hospital(hospital_name: str, schedules: Optional[Dict[str, str]]) -> Optional[str]:
-    if not schedules or not hospital_name:
-        return None
-    lname = hospital_name.lower()
-    for t, s in schedules.items():
-        tt = t.lower()
-        if tt == lname or tt in lname or lname in tt:
-            return s
-    h_tokens = set(re.findall(r"[a-z0-9]+", hospital_name.lower()))
-    best, best_score = None, 0
-    for t in schedules:
-        t_tokens = set(re.findall(r"[a-z0-9]+", t.lower()))
-        score = len(h_tokens & t_tokens)
-        if score > best_score:
-            best_score = score
-            best = t
-    return schedules.get(best) if best else None
-
-
-# ----------- Metric parsing helpers -----------
-def is_reviews_candidate(s: str) -> bool:
-    if not s:
-        return False
-    s = s.strip()
-    if re.search(r'yr|year', s, re.I) or '%' in s:
-        return False
-    m = re.search(r'(\d{1,3}(?:,\d{3})*)', s)
-    if m and not re.search(r'[A-Za-z]', s):
-        return True
-    return False
-
-
-def classify_line_for_metric(line: str) -> Optional[Tuple[str, str]]:
-    if not line:
+async def extract_availability_from_profile(context: BrowserContext, profile_url: str) -> Optional[Dict[str, str]]:
+    # a failed profile only costs its rows their schedule; it is queued for --retry-failed
+    if profile_is_fresh(profile_url):
+        METRICS.inc("cache_hits", kind="profile")
+        return STATE.get(profile_url)["schedules"]
+    try:
+        with METRICS.span("profile", url=profile_url):
+            schedules = await load_profile_schedules(context, profile_url)
+    except Exception as e:
+        record_failure("profile", profile_url, e)
         return None
-    s = line.strip()
-    if re.search(r'(\d+\s*(?:yrs?|years?|yr))', s, re.I):
-        return ("experience", re.search(r'(\d+\s*(?:yrs?|years?|yr))', s, re.I).group(1).strip())
-    if re.search(r'(\d{1,3}\s*%)', s):
-        return ("satisfaction_rate", re.search(r'(\d{1,3}\s*%)', s).group(1).strip())
-    if is_reviews_candidate(s):
-        m = re.search(r'(\d{1,3}(?:,\d{3})*)', s)
-        return ("reviews", m.group(1).strip()) if m else ("reviews", s)
-    return None
+    record_success("profile", profile_url)
+    return schedules if schedules else None
 
 
 # -------------- Label parsing --------------
-async def extract_label_values(card: ElementHandle) -> Dict[str, str]:
-    mapping: Dict[str, str] = {}
-
-    # --- extract experience/satisfaction/reviews ---
-    metric_blocks = await card.query_selector_all("div.row > div.col-4, div.col-4")
-    for m in metric_blocks:
-        txt = (await inner_text_safe(m) or "").strip()
-        if not txt:
-            continue
-        lines = [ln.strip() for ln in re.split(r'\r?\n', txt) if ln.strip()]
-        if len(lines) >= 2:
-            value = lines[1]
-            cls = classify_line_for_metric(value)
-            if cls:
-                mapping[cls[0]] = cls[1]
-        else:
-            cl = classify_line_for_metric(lines[0])
-            if cl:
-                mapping[cl[0]] = cl[1]
-
-    # --- FIX: regex cleanup for misaligned experience/reviews ---
-    if "reviews" in mapping:
-        rev_val = mapping["reviews"].strip()
-        if re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I):
-            mapping.pop("reviews", None)
-            mapping["experience"] = re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I).group(0)
-        elif re.search(r"\b\d{1,3}\s*%", rev_val):
-            mapping.pop("reviews", None)
-            mapping["satisfaction_rate"] = re.search(r"\b\d{1,3}\s*%", rev_val).group(0)
-        elif re.search(r"[A-Za-z]", rev_val) and not re.match(r"^\d+(?:,\d{3})*$", rev_val):
-            mapping.pop("reviews", None)
-    if "reviews" in mapping:
-        val = mapping["reviews"]
-        if not re.match(r"^\d{1,3}(?:,\d{3})*$", val.strip()):
-            mapping.pop("reviews", None)
+async def extract_label_values(card: ElementHandle) -> Dict[str, Any]:
+    # --- extract experience/satisfaction/reviews (clean-up shared with page_parser) ---
+    metric_blocks = await card.query_selector_all(page_parser.METRIC_SEL)
+    mapping = metric_values([await inner_text_safe(m) or "" for m in metric_blocks])
 
     # --- extract specialization and qualification robustly ---
     specialization = ""
     qualification = ""
 
     # specialization (first p tag after name)
-    spec_el = await card.query_selector("p.mb-0.mt-10.text-sm, p.mb-0.text-sm")
+    spec_el = await card.query_selector(page_parser.SPEC_SEL)
     if not spec_el:
-        spec_el = await card.query_selector("div.col-9.col-md-10 p.text-sm")
+        spec_el = await card.query_selector(page_parser.SPEC_FALLBACK_SEL)
     if spec_el:
         specialization = (await inner_text_safe(spec_el) or "").strip()
 
     # qualification (next text-sm after specialization)
-    qual_els = await card.query_selector_all("p.text-sm")
+    qual_els = await card.query_selector_all(page_parser.QUAL_SEL)
     if len(qual_els) >= 2:
         # typically the 2nd text-sm element is qualification
         qualification = (await inner_text_safe(qual_els[1]) or "").strip()
@@ -273,209 +405,380 @@ async def extract_label_values(card: ElementHandle) -> Dict[str, str]:
 
     return mapping
 
-    mapping: Dict[str, str] = {}
-    metric_blocks = await card.query_selector_all("div.row > div.col-4, div.col-4")
-    for m in metric_blocks:
-        txt = (await inner_text_safe(m) or "").strip()
-        if not txt:
-            continue
-        lines = [ln.strip() for ln in re.split(r'\r?\n', txt) if ln.strip()]
-        if len(lines) >= 2:
-            label = lines[0].lower()
-            value = lines[1]
-            cls = classify_line_for_metric(value)
-            if cls:
-                mapping[cls[0]] = cls[1]
-        else:
-            cl = classify_line_for_metric(lines[0])
-            if cl:
-                mapping[cl[0]] = cl[1]
-
-    # --- FIX: regex-driven cleanup (correct alignment) ---
-    if "reviews" in mapping:
-        rev_val = mapping["reviews"].strip()
-        if re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I):
-            mapping.pop("reviews", None)
-            mapping["experience"] = re.search(r"\b\d+\s*(?:yrs?|years?)\b", rev_val, re.I).group(0)
-        elif re.search(r"\b\d{1,3}\s*%", rev_val):
-            mapping.pop("reviews", None)
-            mapping["satisfaction_rate"] = re.search(r"\b\d{1,3}\s*%", rev_val).group(0)
-        elif re.search(r"[A-Za-z]", rev_val) and not re.match(r"^\d+(?:,\d{3})*$", rev_val):
-            mapping.pop("reviews", None)
-    if "reviews" in mapping:
-        val = mapping["reviews"]
-        if not re.match(r"^\d{1,3}(?:,\d{3})*$", val.strip()):
-            mapping.pop("reviews", None)
-    # ------------------------------------------------------
 
-    return mapping
+# ------------- Extract doctors -------------
+def reusable_rows(city_url: str) -> Optional[List[Dict]]:
+    # stored rows of an unchanged listing page, unless one of its profiles is due a refresh
+    rows = PREVIOUS_ROWS.get(page_id(city_url))
+    if not rows:
+        return None
+    if any(r.get("profile_url") and not profile_is_fresh(r["profile_url"]) for r in rows):
+        return None
+    return rows
 
 
-# ------------- Extract doctors -------------
-async def extract_doctors_from_city_page(context: BrowserContext, city_name: str, city_url: str) -> List[Dict]:
-    page = await context.new_page()
-    await apply_stealth(page)
-    try:
-        await page.goto(city_url, wait_until="domcontentloaded", timeout=30000)
-    except Exception:
-        await page.close()
-        return []
+def response_validators(response) -> Dict[str, Optional[str]]:
+    if response is None:
+        return {}
+    return {"etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified")}
+
 
+async def listing_not_modified(context: BrowserContext, city_url: str) -> bool:
+    # conditional GET through the browser context (shares its cookies); only
+    # tried when the server sent an ETag / Last-Modified on the previous run
+    headers = STATE.validators(city_url)
+    if not headers or reusable_rows(city_url) is None:
+        return False
+    if POOL is not None:
+        context = await POOL.context()
     try:
-        await page.wait_for_selector("div.row.shadow-card", timeout=8000)
+        resp = await context.request.get(city_url, headers=headers, timeout=20000)
+        return resp.status == 304
     except Exception:
-        pass
+        return False
+
+
+async def read_next_url(page: Page, current: str) -> Optional[str]:
+    # NEXT_SEL of a loaded listing page; None when missing or pointing back at current
+    next_el = await page.query_selector(page_parser.NEXT_SEL)
+    href = await next_el.get_attribute("href") if next_el else None
+    next_href = normalise_href(href) if href else None
+    return next_href if next_href and next_href != current else None
 
-    cards = await page.query_selector_all("div.row.shadow-card")
-    results: List[Dict] = []
-    profile_cache: Dict[str, Optional[Dict[str, str]]] = {}
 
-    for card in cards:
+async def stored_next_url(context: BrowserContext, city_url: str) -> Optional[str]:
+    # next-page link recorded with a listing page that was not reloaded; state
+    # files written before it was recorded cost one load per page, once
+    entry = STATE.get(city_url) or {}
+    if "next_url" in entry:
+        return entry["next_url"]
+    next_url = await find_next_page(context, city_url)
+    STATE.record(city_url, next_url=next_url)
+    return next_url
+
+
+async def extract_doctors_from_city_page(context: BrowserContext, city_name: str, city_url: str) -> List[Dict]:
+    rows, _ = await extract_listing_page(context, city_name, city_url)
+    return rows
+
+
+async def extract_listing_page(context: BrowserContext, city_name: str,
+                               city_url: str) -> Tuple[List[Dict], Optional[str]]:
+    # -> (rows, next page URL), from a single load of the listing page (none on a 304)
+    if STATE is not None and await listing_not_modified(context, city_url):
+        METRICS.inc("cache_hits", kind="listing_304")
+        STATE.record(city_url)
+        return reusable_rows(city_url), await stored_next_url(context, city_url)
+
+    async with open_page(context) as page:
+        response = await goto(page, city_url, kind="listing", wait_until="domcontentloaded", timeout=30000)
+
         try:
-            name = await inner_text_safe(await card.query_selector("h3")) or ""
-            profile_anchor = await card.query_selector("a.dr_profile_opened_from_listing, a.text-blue, a.dr_profile_open_frm_listing_btn_vprofile")
-            profile_href = await (profile_anchor.get_attribute("href") if profile_anchor else None)
-            profile_href = normalise_href(profile_href) if profile_href else None
-
-            img_src = None
-            src_el = await card.query_selector("picture source[media*='min-width'], picture source")
-            if src_el:
-                img_src = await src_el.get_attribute("srcset")
-            if not img_src:
-                im = await card.query_selector("img.round-img")
-                if im:
-                    img_src = await im.get_attribute("src")
-
-            label_map = await extract_label_values(card)
-            specialization = label_map.get("specialization", "")
-            qualification = label_map.get("qualification", "")
-            experience = label_map.get("experience", "")
-            reviews = label_map.get("reviews", "")
-            satisfaction = label_map.get("satisfaction_rate", "")
-
-            chips = await card.query_selector_all("span.chips-highlight, span.chips")
-            areas = [await inner_text_safe(c) for c in chips]
-            areas_of_interest = ", ".join([a for a in areas if a])
-
-            product_cards = await card.query_selector_all("div.product-card, div.card-hospital, div.selectAppointmentOrOc")
-            profile_timings = None
-            if profile_href:
-                if profile_href not in profile_cache:
-                    profile_cache[profile_href] = await extract_availability_from_profile(context, profile_href)
-                profile_timings = profile_cache.get(profile_href)
-
-            for pc in product_cards:
-                d_hospitalname = await pc.get_attribute("data-hospitalname")
-                d_hospitalcity = await pc.get_attribute("data-hospitalcity")
-                d_hospitaladdress = await pc.get_attribute("data-hospitaladdress")
-                d_amount = await pc.get_attribute("data-amount")
-                d_type = await pc.get_attribute("data-hospitaltype")
-
-                hosp_name = (d_hospitalname or "").strip() or "Unknown"
-                hosp_addr = (d_hospitaladdress or "").strip()
-                hosp_city = (d_hospitalcity or "").strip() or city_name
-                fee = (d_amount or "").strip()
-                consult_type = "Hospital"
-                if ("video" in hosp_name.lower()) or (d_type and d_type.strip() == "2"):
-                    consult_type = "Video Consultation"
-
-                avail_el = await pc.query_selector("p.text-sm.text-wrap, p.text-sm, p")
-                avail_note = (await inner_text_safe(avail_el) or "").strip()
-                schedule = match_schedule_for_hospital(hosp_name, profile_timings) if profile_timings else None
-
-                row = {
-                    "city": hosp_city, "name": name, "specialization": specialization,
-                    "qualification": qualification, "experience": experience,
-                    "satisfaction_rate": satisfaction, "reviews": reviews,
-                    "areas_of_interest": areas_of_interest, "consultation_type": consult_type,
-                    "hospital_name": hosp_name, "hospital_address": hosp_addr,
-                    "hospital_city": hosp_city, "complete address": avail_note,
-                    "availability_schedule": schedule or "", "fee": fee,
-                    "profile_url": profile_href or "", "image_url": img_src or "",
-                    "raw_source_url": city_url
+            with METRICS.span("wait", kind="listing"):
+                await page.wait_for_selector(page_parser.CARD_SEL, timeout=8000)
+        except Exception:
+            pass
+        await archive_page(page, city_url, "listing", city=city_name)
+        next_url = await read_next_url(page, city_url)
+
+        digest = None
+        if STATE is not None:
+            cards_html = await page.eval_on_selector_all(page_parser.CARD_SEL, "els => els.map(e => e.outerHTML).join('\\n')")
+            digest = content_hash(cards_html)
+            previous = reusable_rows(city_url)
+            if previous is not None and not STATE.changed(city_url, digest):
+                METRICS.inc("cache_hits", kind="listing_unchanged")
+                STATE.record(city_url, digest, next_url=next_url, **response_validators(response))
+                return previous, next_url
+
+        cards = await page.query_selector_all(page_parser.CARD_SEL)
+        METRICS.inc("cards", len(cards))
+        scraped_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        parsed: List[Tuple[Dict, List[Dict]]] = []
+
+        for card in cards:
+            try:
+                name = await inner_text_safe(await card.query_selector("h3")) or ""
+                profile_anchor = await card.query_selector(page_parser.PROFILE_LINK_SEL)
+                profile_href = await (profile_anchor.get_attribute("href") if profile_anchor else None)
+                profile_href = normalise_href(profile_href) if profile_href else None
+
+                img_src = None
+                src_el = await card.query_selector(page_parser.IMAGE_SOURCE_SEL)
+                if src_el:
+                    img_src = await src_el.get_attribute("srcset")
+                if not img_src:
+                    im = await card.query_selector(page_parser.IMAGE_SEL)
+                    if im:
+                        img_src = await im.get_attribute("src")
+
+                with METRICS.span("label_values"):  # CDP round trips per card
+                    label_map = await extract_label_values(card)
+                chips = await card.query_selector_all(page_parser.CHIP_SEL)
+                areas = [await inner_text_safe(c) for c in chips]
+                doctor = {
+                    "name": name, "profile_url": profile_href, "image_url": img_src,
+                    "specialization": label_map.get("specialization", ""),
+                    "qualification": label_map.get("qualification", ""),
+                    "experience": label_map.get("experience", ""),
+                    "satisfaction_rate": label_map.get("satisfaction_rate", ""),
+                    "reviews": label_map.get("reviews", ""),
+                    "experience_years": label_map.get("experience_years"),
+                    "satisfaction_pct": label_map.get("satisfaction_pct"),
+                    "reviews_count": label_map.get("reviews_count"),
+                    "areas_of_interest": ", ".join([a for a in areas if a]),
                 }
-                results.append(row)
-        except Exception as e:
-            print(f"[card parse error] {e}")
-            continue
 
-    await page.close()
-    return results
+                products = []
+                for pc in await card.query_selector_all(page_parser.PRODUCT_SEL):
+                    products.append({
+                        "hospital_name": await pc.get_attribute("data-hospitalname"),
+                        "hospital_city": await pc.get_attribute("data-hospitalcity"),
+                        "hospital_address": await pc.get_attribute("data-hospitaladdress"),
+                        "amount": await pc.get_attribute("data-amount"),
+                        "hospital_type": await pc.get_attribute("data-hospitaltype"),
+                        "note": (await inner_text_safe(await pc.query_selector(page_parser.NOTE_SEL)) or "").strip(),
+                    })
+                parsed.append((doctor, products))
+            except Exception as e:
+                METRICS.inc("card_errors")
+                print(f"[card parse error] {e}")
+                continue
+
+    # profiles load concurrently (as far as LIMITER allows) once the listing page is released
+    profile_urls = list(dict.fromkeys(d["profile_url"] for d, _ in parsed if d["profile_url"]))
+    timings = await asyncio.gather(*(extract_availability_from_profile(context, u) for u in profile_urls))
+    profile_cache = dict(zip(profile_urls, timings))
+
+    results: List[Dict] = []
+    for doctor, products in parsed:
+        profile_timings = profile_cache.get(doctor["profile_url"])
+        for product in products:
+            hosp_name = (product["hospital_name"] or "").strip() or "Unknown"
+            schedule = match_schedule_for_hospital(hosp_name, profile_timings) if profile_timings else None
+            results.append(build_row(doctor, product, city_name, city_url, scraped_at, schedule))
+
+    if digest is not None and results:
+        STATE.record(city_url, digest, next_url=next_url, **response_validators(response))
+    METRICS.inc("rows", len(results))
+    return results, next_url
 
 
 # ---------- Pagination ----------
-async def scrape_city_with_pagination(context: BrowserContext, city_name: str, city_url: str) -> List[Dict]:
+async def find_next_page(context: BrowserContext, current: str) -> Optional[str]:
+    try:
+        async with open_page(context) as temp:
+            await goto(temp, current, kind="next_page", wait_until="domcontentloaded", timeout=20000)
+            return await read_next_url(temp, current)
+    except Exception:
+        return None
+
+
+async def scrape_city_with_pagination(context: BrowserContext, city_name: str, city_url: str,
+                                      first_page: int = 1) -> List[Dict]:
+    async def load(url: str, page_no: int) -> Tuple[List[Dict], Optional[str]]:
+        try:
+            rows, next_url = await extract_listing_page(context, city_name, url)
+        except Exception as e:
+            # keep the pages already scraped; this one (and the rest of the city) is retried later
+            record_failure("listing", url, e, city=city_name, page=page_no)
+            return [], None
+        record_success("listing", url)
+        return rows, (next_url if rows else None)
+
     all_rows: List[Dict] = []
-    current = city_url
-    for _ in range(MAX_PAGES_PER_CITY):
-        rows = await extract_doctors_from_city_page(context, city_name, current)
-        if not rows:
-            break
+    async for _, _, rows in iter_pages(load, city_url, MAX_PAGES_PER_CITY, first_page):
         all_rows.extend(rows)
-        temp = await context.new_page()
-        await apply_stealth(temp)
-        try:
-            await temp.goto(current, wait_until="domcontentloaded", timeout=20000)
-            next_el = await temp.query_selector("a[rel='next'], a.next, li.next a")
-            if not next_el:
-                await temp.close()
-                break
-            href = await next_el.get_attribute("href")
-            if not href:
-                await temp.close()
-                break
-            next_href = normalise_href(href)
-            if not next_href or next_href == current:
-                await temp.close()
-                break
-            current = next_href
-            await temp.close()
-            rnd_sleep()
-        except Exception:
-            await temp.close()
-            break
     return all_rows
 
 
+# ---------- Incremental recrawl ----------
+def apply_city_changes(city_url: str, existing: List[Dict], rows: List[Dict],
+                       run_id: str) -> Tuple[List[Dict], int]:
+    # diff the recrawled rows of one city against the stored ones, store only
+    # what changed and append the events to the change feed; returns the new
+    # contents of the knowledge base (used by the CSV backend) and the number of events
+    # stored practices of this listing, plus those first stored under another
+    # listing that this one also shows (same row_key)
+    assign_ids(existing + rows)
+    recrawled = {kb_delta.row_key(r) for r in rows}
+    old = [r for r in existing if same_listing(r.get("raw_source_url"), city_url)
+           or kb_delta.row_key(r) in recrawled]
+    events, upserts, removed, unchanged = diff_rows(old, rows)
+
+    if STORAGE_BACKEND == "sqlite":
+        kb_store.write_rows(upserts, OUTPUT_DB, upsert=True)
+        kb_store.delete_rows(removed, OUTPUT_DB)
+        kb_store.touch_rows(unchanged, OUTPUT_DB)
+        merged = existing
+    else:
+        dropped = {id(r) for r in old}
+        current = {kb_delta.row_key(r) for r in rows}
+        removed_ids = {id(r) for r in removed}
+        # stored rows of this city that were not recrawled (e.g. pages not reached) stay
+        kept = [r for r in old if id(r) not in removed_ids and kb_delta.row_key(r) not in current]
+        merged = merge_rows([r for r in existing if id(r) not in dropped] + kept + rows)
+        if events or any(id(r) not in dropped for r in rows):
+            rewrite_csv(merged, OUTPUT_CSV)
+
+    kb_delta.append_feed(events, city_url, run_id, CHANGE_FEED)
+    summary = kb_delta.summarize(events)
+    print(f"Changes: {summary or 'none'} ({len(unchanged)} unchanged)")
+    return merged, len(events)
+
+
+# ---------- Failed URLs ----------
+def store_recovered(rows: List[Dict]):
+    # replace stored rows of the same practices (kb_delta.row_key) with recovered ones
+    if not rows:
+        return
+    if STORAGE_BACKEND == "sqlite":
+        kb_store.write_rows(rows, OUTPUT_DB, upsert=True)
+        return
+    keys = {kb_delta.row_key(r) for r in rows}
+    kept = [r for r in read_csv_rows(OUTPUT_CSV) if kb_delta.row_key(r) not in keys]
+    rewrite_csv(kept + rows, OUTPUT_CSV)
+
+
+async def retry_failed() -> int:
+    # --retry-failed: re-fetch only the URLs in FAILED_FILE. Listing pages resume
+    # their city's pagination from the failed page; recovered profiles fill in
+    # the schedules of rows stored without one.
+    global ARCHIVE, POOL, LIMITER, FAILED
+    ARCHIVE = HtmlArchive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+    FAILED = DeadLetterQueue(FAILED_FILE)
+    todo = [e for e in FAILED.items() if e["category"] in RETRYABLE or e["category"] == UNKNOWN]
+    skipped = len(FAILED) - len(todo)
+    print(f"{len(todo)} failed URLs to retry ({skipped} permanent failures left as they are).")
+    if not todo:
+        return 0
+
+    recovered = 0
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=HEADLESS)
+        POOL = new_pool(browser)
+        LIMITER = new_limiter()
+        context = await POOL.context()
+        for entry in todo:
+            url = entry["url"]
+            if entry["kind"] == "listing":
+                rows = await scrape_city_with_pagination(context, entry.get("city") or "", url,
+                                                         entry.get("page") or 1)
+                store_recovered(rows)
+                if rows:
+                    print(f"Recovered {len(rows)} rows from {url}")
+            elif entry["kind"] == "profile":
+                schedules = await extract_availability_from_profile(context, url)
+                if schedules:
+                    rows = [r for r in load_rows() if r.get("profile_url") == url]
+                    for r in rows:
+                        r["availability_schedule"] = match_schedule_for_hospital(
+                            (r.get("hospital_name") or "").strip() or "Unknown", schedules) or ""
+                    store_recovered(rows)
+                    print(f"Recovered schedules for {len(rows)} rows from {url}")
+            if not FAILED.has(entry["kind"], url):
+                recovered += 1
+            FAILED.save()
+        await POOL.close()
+        await browser.close()
+    print(f"\n✅ Recovered {recovered}/{len(todo)} URLs; {len(FAILED)} still failing. File: {FAILED_FILE}")
+    report_metrics()
+    return recovered
+
+
 # ---------- Main ----------
+def pool_summary() -> str:
+    st = POOL.stats() if POOL is not None else {}
+    return (f"{st.get('navigations', 0)} navigations, {st.get('pages_created', 0)} pages opened "
+            f"({st.get('pages_reused', 0)} reuses), {st.get('contexts_recycled', 0)} contexts recycled, "
+            f"rss {st.get('rss_mb')} MB (peak {st.get('peak_rss_mb')} MB)")
+
+
+def report_metrics():
+    path = METRICS.write()
+    if path:
+        print(f"Stage timings:\n{METRICS.report()}\nMetrics written to {path}")
+
+
 async def main():
+    global ARCHIVE, STATE, PREVIOUS_ROWS, POOL, LIMITER, FAILED
+    ARCHIVE = HtmlArchive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+    FAILED = DeadLetterQueue(FAILED_FILE)
+    existing: List[Dict] = []
+    run_id = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    if INCREMENTAL:
+        STATE = CrawlState(STATE_FILE)
+        existing = load_rows()
+        PREVIOUS_ROWS = {}
+        for r in existing:
+            PREVIOUS_ROWS.setdefault(page_id(r.get("raw_source_url")), []).append(r)
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=HEADLESS)
-        context = await browser.new_context(viewport={"width": 1200, "height": 900})
+        POOL = new_pool(browser)
+        LIMITER = new_limiter()
+        try:
+            context = await POOL.context()
 
-        cities = await discover_city_links(context)
-        if not cities:
-            print("No cities discovered — run with HEADLESS=False to bypass Cloudflare.")
-            await browser.close()
-            return
+            cities = await discover_city_links(context)
+            if not cities:
+                print("No cities discovered — run with HEADLESS=False to bypass Cloudflare.")
+                return
 
-        if CITY_LIMIT:
-            cities = cities[:CITY_LIMIT]
+            if CITY_LIMIT:
+                cities = cities[:CITY_LIMIT]
 
-        scraped = read_scraped_cities()
-        print(f"Discovered {len(cities)} cities; already scraped {len(scraped)}.")
+            scraped = scraped_cities()
+            print(f"Discovered {len(cities)} cities; already scraped {len(scraped)}.")
 
-        total_saved = 0
-        for cname, curl in cities:
-            if cname in scraped:
-                print(f"Skipping already scraped: {cname}")
-                continue
-            print(f"\n=== Processing {cname} ===")
-            try:
-                rows = await scrape_city_with_pagination(context, cname, curl)
-                if rows:
-                    append_rows(rows)
-                    total_saved += len(rows)
-                    print(f"Saved {len(rows)} rows for {cname}")
-                else:
-                    print(f"No rows for {cname}")
-            except Exception as e:
-                print(f"Failed {cname}: {e}")
-            rnd_sleep()
-
-        await browser.close()
-        print(f"\n✅ Done. Total saved this run: {total_saved}. File: {OUTPUT_CSV}")
+            total_saved = 0
+            keys = stored_keys() if not INCREMENTAL else set()
+            updates: List[Dict] = []
+            for cname, curl in cities:
+                if cname in scraped and not INCREMENTAL:
+                    print(f"Skipping already scraped: {cname}")
+                    continue
+                print(f"\n=== Processing {cname} ===")
+                try:
+                    rows = await scrape_city_with_pagination(context, cname, curl)
+                    if INCREMENTAL and rows:
+                        existing, n_changes = apply_city_changes(curl, existing, rows, run_id)
+                        STATE.save()
+                        total_saved += n_changes
+                    elif rows:
+                        save_rows(rows, keys, updates)
+                        total_saved += len(rows)
+                        print(f"Saved {len(rows)} rows for {cname}")
+                    else:
+                        print(f"No rows for {cname}")
+                except Exception as e:
+                    record_failure("listing", curl, e, city=cname, page=1)
+                FAILED.save()
+                print(f"Browser pool: {pool_summary()}")
+                print(f"Pacing: {LIMITER.status()}")
+            flush_updates(updates)
+
+            out_file = OUTPUT_DB if STORAGE_BACKEND == "sqlite" else OUTPUT_CSV
+            print(f"\n✅ Done. Total saved this run: {total_saved}. File: {out_file}")
+            if len(FAILED):
+                print(f"{len(FAILED)} URLs failed after retries; run with --retry-failed to fetch just those.")
+        finally:
+            # both exits, and a crash, release the browser and report what ran
+            await POOL.close()
+            await browser.close()
+            report_metrics()
+    if IMAGES_DIR:
+        counts = await download_images(load_rows(), ImageStore(IMAGES_DIR))
+        print(f"Images: {counts['downloaded']} downloaded, {counts['duplicates']} duplicates, "
+              f"{counts['present']} already present, {counts['failed']} failed. Dir: {IMAGES_DIR}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    ap = argparse.ArgumentParser(description="Scrape doctors from marham.pk")
+    ap.add_argument("--retry-failed", action="store_true",
+                    help=f"only re-fetch the URLs listed in {FAILED_FILE}")
+    ap.add_argument("--metrics", metavar="PATH",
+                    help="write stage timings and counters: JSON, or OpenMetrics text for .prom/.txt")
+    args = ap.parse_args()
+    if args.metrics:
+        METRICS.enable(args.metrics)
+    asyncio.run(retry_failed() if args.retry_failed else main())
@@ -0,0 +1,148 @@
+# sitemap.py
+# Discover every listing and profile URL from marham.pk's XML sitemaps.
+#
+# Crawling from /doctors follows city listings page by page (capped at
+# MAX_PAGES_PER_CITY), with a browser render per page. The sitemaps list the
+# same URLs for the cost of a few plain HTTP requests. robots.txt names the
+# sitemap files (falling back to /sitemap.xml). Sitemap indexes are followed
+# recursively, and each file is parsed with iterparse straight off the
+# response stream (gzip included), so even large sitemaps are never held in
+# memory.
+#
+#   python sitemap.py [--base URL] [--out sitemap_urls.json]
+#   python crawl_cluster.py coordinator --sitemap      feed the URLs to the work queue
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import urllib.request
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlparse
+
+import fetch_retry
+
+BASE_URL = os.getenv("MARHAM_BASE_URL", "https://www.marham.pk")
+OUT_FILE = "sitemap_urls.json"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
+TIMEOUT_S = 30
+MAX_DEPTH = 3  # sitemap index -> sitemap -> ...
+
+
+def _open(url: str):
+    # response stream, transparently un-gzipped; retried like page loads
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"})
+    for attempt in range(fetch_retry.MAX_RETRIES + 1):
+        try:
+            resp = urllib.request.urlopen(req, timeout=TIMEOUT_S)
+            break
+        except HTTPError as e:
+            category = fetch_retry.status_category(e.code)
+            if category not in fetch_retry.RETRYABLE or attempt == fetch_retry.MAX_RETRIES:
+                raise fetch_retry.FetchError(category, url, f"HTTP {e.code}", e.code) from e
+        except (URLError, OSError) as e:
+            if attempt == fetch_retry.MAX_RETRIES:
+                raise fetch_retry.FetchError(fetch_retry.exception_category(e), url, str(e)) from e
+        time.sleep(fetch_retry.backoff_delay(attempt))
+    if resp.headers.get("Content-Encoding") == "gzip" or url.endswith(".gz"):
+        return gzip.GzipFile(fileobj=resp)
+    return resp
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def sitemaps_from_robots(base: str = BASE_URL) -> List[str]:
+    try:
+        with _open(urljoin(base, "/robots.txt")) as f:
+            lines = f.read().decode("utf-8", errors="replace").splitlines()
+    except fetch_retry.FetchError:
+        lines = []
+    found = [l.split(":", 1)[1].strip() for l in lines if l.lower().startswith("sitemap:")]
+    return found or [urljoin(base, "/sitemap.xml")]
+
+
+def iter_sitemap(url: str, seen: Optional[Set[str]] = None, depth: int = 0) -> Iterator[Tuple[str, Optional[str]]]:
+    # (loc, lastmod) for every <url> in url and the sitemaps it indexes
+    seen = set() if seen is None else seen
+    if url in seen or depth > MAX_DEPTH:
+        return
+    seen.add(url)
+    children: List[str] = []
+    with _open(url) as stream:
+        root = None
+        loc = lastmod = None
+        for event, el in ET.iterparse(stream, events=("start", "end")):
+            if root is None:
+                root = el
+            if event == "start":
+                continue
+            tag = _local(el.tag)
+            if tag == "loc":
+                loc = (el.text or "").strip()
+            elif tag == "lastmod":
+                lastmod = (el.text or "").strip() or None
+            elif tag in ("url", "sitemap"):
+                if tag == "sitemap" and loc:
+                    children.append(loc)
+                elif loc:
+                    yield loc, lastmod
+                loc = lastmod = None
+                root.clear()  # drop finished entries so memory stays flat
+    for child in children:
+        try:
+            yield from iter_sitemap(child, seen, depth + 1)
+        except (fetch_retry.FetchError, ET.ParseError) as e:
+            print(f"[sitemap] skipping {child}: {e}")
+
+
+def classify(url: str) -> Optional[str]:
+    # /doctors/<city>[/<speciality>] lists doctors; profiles are
+    # /doctors/<city>/<speciality>/<doctor> or /online-consultation/<speciality>/<city>/<doctor>
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    if len(parts) >= 4 and parts[0] in ("doctors", "online-consultation"):
+        return "profile"
+    if 2 <= len(parts) <= 3 and parts[0] == "doctors":
+        return "listing"
+    return None
+
+
+def discover(base: str = BASE_URL, rebase: bool = True) -> Dict[str, List[Dict]]:
+    # {"listing": [{"url", "lastmod"}], "profile": [...]}; with rebase, sitemap
+    # URLs on another host (e.g. www.marham.pk when crawling a mirror) are moved onto base
+    out: Dict[str, List[Dict]] = {"listing": [], "profile": []}
+    seen_urls: Set[str] = set()
+    seen_maps: Set[str] = set()
+    root = urlparse(base)
+    for sm in sitemaps_from_robots(base):
+        for loc, lastmod in iter_sitemap(sm, seen_maps):
+            if rebase:
+                loc = urlparse(loc)._replace(scheme=root.scheme, netloc=root.netloc).geturl()
+            kind = classify(loc)
+            if kind and loc not in seen_urls:
+                seen_urls.add(loc)
+                out[kind].append({"url": loc, "lastmod": lastmod})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="List marham.pk listing and profile URLs from its sitemaps")
+    ap.add_argument("--base", default=BASE_URL)
+    ap.add_argument("--out", default=OUT_FILE)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    found = discover(args.base)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(found, f, ensure_ascii=False, indent=1)
+    print(f"✅ {len(found['listing'])} listing and {len(found['profile'])} profile URLs "
+          f"in {time.perf_counter() - t0:.1f}s. File: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
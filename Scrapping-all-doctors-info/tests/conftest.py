@@ -0,0 +1,8 @@
+# The crawler's modules sit next to each other in Scrapping-all-doctors-info
+# and import each other by plain name, as when the scripts are run from there.
+import os
+import sys
+
+BATCH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BATCH_DIR not in sys.path:
+    sys.path.insert(0, BATCH_DIR)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from fetch_retry import CLIENT, NOT_FOUND, CircuitBreaker, FetchError, with_retries
+
+URL = "https://www.marham.pk/doctors/lahore"
+HOST = "www.marham.pk"
+
+
+def _half_open() -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01, log=lambda msg: None)
+    breaker.failure(HOST)
+    return breaker
+
+
+async def _probe(breaker: CircuitBreaker, exc: BaseException):
+    await asyncio.sleep(0.02)
+    assert breaker.state(HOST) == "half-open"
+
+    async def fetch():
+        raise exc
+    with pytest.raises(type(exc) if isinstance(exc, asyncio.CancelledError) else FetchError):
+        await with_retries(fetch, URL, breaker, retries=0, log=lambda msg: None)
+
+
+@pytest.mark.parametrize("category", [NOT_FOUND, CLIENT])
+def test_answered_probe_closes_breaker(category):
+    breaker = _half_open()
+    asyncio.run(_probe(breaker, FetchError(category, URL, "4xx", 404)))
+    assert breaker.state(HOST) == "closed"
+
+
+@pytest.mark.parametrize("exc", [ValueError("parser bug"), asyncio.CancelledError()])
+def test_unanswered_probe_releases_without_closing(exc):
+    breaker = _half_open()
+
+    async def run():
+        await _probe(breaker, exc)
+        # the next request may probe straight away
+        await asyncio.wait_for(breaker.wait(HOST), 1)
+    asyncio.run(run())
+    assert breaker.state(HOST) == "half-open"
+    assert breaker.hosts[HOST]["failures"] == 1
@@ -0,0 +1,21 @@
+import pytest
+
+from image_store import pick_srcset, srcset_candidates
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("https://a/x.webp 1x,https://a/z.webp 2x", "https://a/z.webp"),
+    ("https://a/x.webp 1x, https://a/z.webp 2x", "https://a/z.webp"),
+    ("a.webp 80w, b.webp 160w, c.webp 320w", "b.webp"),
+    ("a.webp 80w,b.webp 120w", "b.webp"),
+    ("https://a/x.webp", "https://a/x.webp"),
+    ("", None),
+])
+def test_pick_srcset(value, expected):
+    assert pick_srcset(value) == expected
+
+
+def test_srcset_candidates_keep_commas_inside_urls():
+    value = "https://res/w_80,h_80/x.webp 1x,https://res/w_160,h_160/x.webp 2x"
+    assert srcset_candidates(value) == [("https://res/w_80,h_80/x.webp", "1x"),
+                                        ("https://res/w_160,h_160/x.webp", "2x")]
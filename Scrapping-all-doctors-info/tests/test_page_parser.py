@@ -0,0 +1,196 @@
+# page_parser pins: listing cards and profile schedules parsed from saved
+# markup (the layout benchmarks/make_fixtures.py renders), the selector
+# engine on its own, and, where Chromium is installed, the same selectors and
+# card labels read through Playwright as scrape_doctors does.
+import asyncio
+
+import pytest
+
+import page_parser
+from page_parser import compile_selector, next_page_url, parse_attrs, parse_html, parse_listing, parse_profile_schedules
+
+LISTING_HTML = """<html><head><title>Dermatologists in Lahore | Marham</title></head>
+<body><h1>Dermatologists in Lahore</h1>
+<div class="list-data">
+<div class="row shadow-card">
+<div class="col-3 col-md-2"><picture><source media="(min-width: 768px)" srcset="https://staticconnect.marham.pk/assets/doctors/13822/dr-ayesha-khan_80X80.webp"><img class="round-img" src="https://staticconnect.marham.pk/assets/doctors/13822/dr-ayesha-khan_40X40.webp"></picture></div>
+<div class="col-9 col-md-10">
+<a href="/doctors/lahore/dermatologist/dr-ayesha-khan" class="text-blue dr_profile_opened_from_listing"><h3>Dr. Ayesha Khan</h3></a>
+<p class="mb-0 mt-10 text-sm">Dermatologist</p>
+<p class="text-sm">MBBS, FCPS (Dermatology)</p>
+<span class="text-sm">PMDC Verified</span>
+<div class="row">
+<div class="col-4"><p class="mb-0 text-sm">Reviews</p>
+<p class="text-bold text-sm text-golden"><i class="fa fa-thumbs-up"></i> 1,204</p></div>
+<div class="col-4"><p class="mb-0 text-sm">Experience</p>
+<p class="text-bold text-sm">12 Yrs</p></div>
+<div class="col-4"><p class="mb-0 text-sm">Satisfaction</p>
+<p class="text-bold text-sm">98%</p></div>
+</div>
+<div class="chips"><span class="chips-highlight">Acne</span><span class="chips-highlight">Hair Fall</span><span class="chips">Laser Treatment</span></div>
+<div class="product-card" data-hospitalname="Hameed Latif Hospital" data-hospitalcity="Lahore" data-hospitaladdress="Garden Town" data-amount="2,500" data-hospitaltype="1"><p class="text-sm text-wrap">14 Abu Bakar Block, Garden Town</p></div>
+<div class="product-card" data-hospitalname="Video Consultation" data-hospitalcity="" data-hospitaladdress="" data-amount="2,000" data-hospitaltype="2"><p class="text-sm text-wrap">Online</p></div>
+</div>
+</div>
+<div class="row shadow-card">
+<div class="col-9 col-md-10">
+<a href="https://www.marham.pk/online-consultation/dermatologist/lahore/dr-bilal-ahmed-22743" class="text-blue"><h3>Dr. Bilal Ahmed</h3></a>
+<img class="round-img" src="/images/placeholder.png">
+<p class="text-sm">Dermatologist, Cosmetologist</p>
+<div class="card-hospital" data-hospitalname="Doctors Hospital" data-hospitalcity="Lahore" data-hospitaladdress="Johar Town" data-amount="3000" data-hospitaltype="1"><p>Available today</p></div>
+</div>
+</div>
+</div>
+<ul class="pagination"><li class="next"><a rel="next" href="/doctors/lahore/dermatologist?page=2">Next</a></li></ul>
+</body></html>"""
+
+PROFILE_HTML = """<html><head><title>Dr. Ayesha Khan | Marham</title></head>
+<body>
+<h1 class="mb-0">Dr. Ayesha Khan</h1>
+<section class="p-xy">
+<div class="shadow-card">
+<h3 class="text-bold text-underline">Hameed Latif Hospital</h3>
+<p>Area: Garden Town, Lahore</p>
+<p>Rs. 2500</p>
+<table>
+<tr class="text-sm"><td class="text-bold text-blue">Mon</td><td>11:00 AM - 04:00 PM</td></tr>
+<tr class="text-sm"><td class="text-bold text-blue">Wed</td><td>05:00 PM - 09:00 PM</td></tr>
+</table>
+</div><div class="shadow-card">
+<h3 class="text-bold text-underline">Video Consultation</h3>
+<p>Rs. 2000</p>
+<table>
+<tr class="text-sm"><td class="text-bold text-blue">Sat</td><td>10:00 AM - 12:00 PM</td></tr>
+</table>
+</div>
+</section>
+</body></html>"""
+
+SELECTORS = [name for name in dir(page_parser) if name.endswith("_SEL")]
+
+
+def test_parse_listing_cards():
+    cards, next_url = parse_listing(LISTING_HTML)
+    assert next_url == "https://www.marham.pk/doctors/lahore/dermatologist?page=2"
+    assert len(cards) == 2
+    first, second = cards
+    assert first == {
+        "name": "Dr. Ayesha Khan",
+        "profile_url": "https://www.marham.pk/doctors/lahore/dermatologist/dr-ayesha-khan",
+        "image_url": "https://staticconnect.marham.pk/assets/doctors/13822/dr-ayesha-khan_80X80.webp",
+        "specialization": "Dermatologist",
+        "qualification": "MBBS, FCPS (Dermatology)",
+        "experience": "12 Yrs",
+        "satisfaction_rate": "98%",
+        "reviews": "1,204",
+        "experience_years": 12,
+        "satisfaction_pct": 98.0,
+        "reviews_count": 1204,
+        "areas_of_interest": "Acne, Hair Fall, Laser Treatment",
+        "products": [
+            {"hospital_name": "Hameed Latif Hospital", "hospital_city": "Lahore",
+             "hospital_address": "Garden Town", "amount": "2,500", "hospital_type": "1",
+             "note": "14 Abu Bakar Block, Garden Town"},
+            {"hospital_name": "Video Consultation", "hospital_city": "", "hospital_address": "",
+             "amount": "2,000", "hospital_type": "2", "note": "Online"},
+        ],
+    }
+    # no <picture>, one text-sm paragraph, no metrics
+    assert second["profile_url"] == "https://www.marham.pk/online-consultation/dermatologist/lahore/dr-bilal-ahmed-22743"
+    assert second["image_url"] == "/images/placeholder.png"
+    assert second["specialization"] == "Dermatologist, Cosmetologist"
+    assert second["qualification"] == ""
+    assert second["reviews_count"] is None
+    assert [p["hospital_name"] for p in second["products"]] == ["Doctors Hospital"]
+    assert second["products"][0]["note"] == "Available today"
+
+
+def test_parse_profile_schedules():
+    assert parse_profile_schedules(PROFILE_HTML) == {
+        "Hameed Latif Hospital": "Mon: 11:00 AM - 04:00 PM; Wed: 05:00 PM - 09:00 PM",
+        "Video Consultation": "Sat: 10:00 AM - 12:00 PM",
+    }
+    assert parse_profile_schedules("<html><body><p>No schedule</p></body></html>") is None
+
+
+def test_next_page_url_matches_next_sel():
+    assert next_page_url(LISTING_HTML) == parse_listing(LISTING_HTML)[1]
+    current = "https://www.marham.pk/doctors/lahore?page=2"
+    assert next_page_url('<a class="next" href="?page=2">Next</a>', current) is None
+    assert next_page_url("<a href='/x'>x</a>") is None
+
+
+def test_parse_attrs():
+    assert parse_attrs(""" HREF="/a?b=1&amp;c" data-x='y z' rel=next""") == {"href": "/a?b=1&amp;c", "data-x": "y z"}
+
+
+@pytest.mark.parametrize("name", SELECTORS)
+def test_selector_constants_compile(name):
+    assert compile_selector(getattr(page_parser, name))
+
+
+def test_selector_engine():
+    doc = parse_html("""<div id="a" class="x y"><p class="t">one<div class="x">two</div>
+<ul><li>1<li>2</ul><img src="i.png"><span data-k="abc def">s</span></div>""")
+    assert [el.tag for el in doc.select("div.x")] == ["div", "div"]
+    assert [el.tag for el in doc.select("div.x.y > p.t")] == ["p"]
+    # <div> closes an open <p>, so it is the outer div's child, not the paragraph's
+    assert doc.select("p div") == []
+    assert [el.text() for el in doc.select("#a > div.x")] == ["two"]
+    assert [el.text() for el in doc.select("ul li")] == ["1", "2"]
+    assert doc.select_one("img").parent.tag == "div"
+    assert [el.tag for el in doc.select("span[data-k]")] == ["span"]
+    assert doc.select("span[data-k='abc def']") and doc.select("span[data-k*='c d']")
+    assert doc.select("span[data-k^=abc]") and doc.select("span[data-k$=def]")
+    assert doc.select("span[data-k~=def]") and not doc.select("span[data-k~=de]")
+    assert [el.tag for el in doc.select("img, span")] == ["img", "span"]
+    assert [el.tag for el in doc.select("span[data-k='abc def'], img")] == ["img", "span"]
+
+
+# ---------- the same markup through Playwright ----------
+def _with_chromium(check):
+    async_api = pytest.importorskip("playwright.async_api")
+
+    async def run():
+        async with async_api.async_playwright() as p:
+            try:
+                browser = await p.chromium.launch()
+            except Exception as e:
+                pytest.skip(f"Chromium not available: {e}")
+            try:
+                page = await browser.new_page()
+                await page.set_content(LISTING_HTML)
+                await check(page)
+            finally:
+                await browser.close()
+    asyncio.run(run())
+
+
+def _signature(tag: str, cls: str, href: str, hospital: str) -> tuple:
+    return tag.lower(), " ".join((cls or "").split()), href or "", hospital or ""
+
+
+@pytest.mark.parametrize("name", SELECTORS)
+def test_selectors_match_browser(name):
+    sel = getattr(page_parser, name)
+    doc = parse_html(LISTING_HTML)
+    ours = [_signature(el.tag, el.get("class"), el.get("href"), el.get("data-hospitalname")) for el in doc.select(sel)]
+
+    async def check(page):
+        theirs = await page.eval_on_selector_all(sel, """els => els.map(e => [e.tagName, e.getAttribute('class'),
+            e.getAttribute('href'), e.getAttribute('data-hospitalname')])""")
+        assert ours == [_signature(*t) for t in theirs]
+    _with_chromium(check)
+
+
+def test_card_labels_match_browser():
+    scrape_doctors = pytest.importorskip("scrape_doctors")
+    cards, _ = parse_listing(LISTING_HTML)
+
+    async def check(page):
+        for handle, card in zip(await page.query_selector_all(page_parser.CARD_SEL), cards):
+            labels = await scrape_doctors.extract_label_values(handle)
+            for key in ("specialization", "qualification", "experience", "satisfaction_rate", "reviews",
+                        "experience_years", "satisfaction_pct", "reviews_count"):
+                assert labels.get(key, card[key] if card[key] in ("", None) else None) == card[key], key
+    _with_chromium(check)
@@ -0,0 +1,20 @@
+from schedule_index import AvailabilityIndex, overlaps, parse_schedule, parse_when, split_window
+
+SAT, SUN = 5, 6
+
+
+def test_parse_when_runs_past_midnight():
+    assert parse_when("saturday 10pm to 1am") == (SAT, 22 * 60, 25 * 60)
+    assert parse_when("saturday evening") == (SAT, 1020, 1260)
+    assert split_window(SAT, 22 * 60, 25 * 60) == [(SAT, 22 * 60, 24 * 60), (SUN, 0, 60)]
+    assert split_window(6, 22 * 60, 25 * 60)[1] == (0, 0, 60)
+
+
+def test_overnight_window_matches_both_days():
+    late_saturday = parse_schedule("Sat: 09:00 PM - 11:59 PM")
+    early_sunday = parse_schedule("Sun: 12:30 AM - 03:00 AM")
+    sunday_noon = parse_schedule("Sun: 11:00 AM - 02:00 PM")
+    index = AvailabilityIndex([late_saturday, early_sunday, sunday_noon])
+    day, start, end = parse_when("saturday 10pm to 1am")
+    assert index.ids(index.open_during(day, start, end)) == [0, 1]
+    assert [overlaps(s, day, start, end) for s in index.schedules] == [True, True, False]
@@ -0,0 +1,78 @@
+# Lease rules of the work queue, on the in-process SQLite backend. A negative
+# lease is one that has already run out.
+import pytest
+
+from work_queue import DONE, FAILED, LEASED, PENDING, WorkQueue, listing_unit, open_queue
+
+URL = "https://www.marham.pk/doctors/lahore"
+EXPIRED = -1.0
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = open_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+    q.enqueue([listing_unit("Lahore", URL)])
+    return q
+
+
+def _status(q) -> dict:
+    return {k: v for k, v in q.stats().items() if k in (PENDING, LEASED, DONE, FAILED) and v}
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        WorkQueue()
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue([listing_unit("Lahore", URL)]) == 0
+
+
+def test_live_lease_is_not_reclaimed(queue):
+    assert queue.claim("w1")["attempts"] == 1
+    assert queue.claim("w2") is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.claim("w1", lease=EXPIRED)
+    unit = queue.claim("w2")
+    assert unit["id"] == URL and unit["attempts"] == 2
+    assert _status(queue) == {LEASED: 1}
+
+
+def test_expired_lease_fails_at_max_attempts(queue):
+    for worker in ("w1", "w2", "w3"):
+        assert queue.claim(worker, lease=EXPIRED, max_attempts=3) is not None
+    assert queue.claim("w4", max_attempts=3) is None
+    assert _status(queue) == {FAILED: 1}
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    queue.claim("w1")
+    queue.fail(URL, "w1", "boom", max_attempts=2)
+    assert _status(queue) == {PENDING: 1}
+    queue.claim("w2")
+    queue.fail(URL, "w2", "boom", max_attempts=2)
+    assert _status(queue) == {FAILED: 1}
+    assert queue.claim("w3") is None
+
+
+def test_stale_worker_cannot_heartbeat_complete_or_fail(queue):
+    queue.claim("w1", lease=EXPIRED)
+    queue.claim("w2")
+    assert not queue.heartbeat(URL, "w1")
+    queue.complete(URL, "w1")
+    queue.fail(URL, "w1", "late failure")
+    assert _status(queue) == {LEASED: 1}
+    assert queue.heartbeat(URL, "w2")
+    queue.complete(URL, "w2")
+    assert _status(queue) == {DONE: 1}
+
+
+def test_rows_are_upserted_per_practice(queue):
+    row = {"name": "Dr. Ayesha Khan", "profile_url": "https://www.marham.pk/doctors/lahore/dermatologist/dr-ayesha-khan",
+           "hospital_name": "Hameed Latif Hospital", "hospital_city": "Lahore", "consultation_type": "In-person",
+           "fee": "2500"}
+    queue.put_rows([row], URL)
+    queue.put_rows([dict(row, fee="3000")], URL)
+    assert [r["fee"] for r in queue.rows()] == ["3000"]
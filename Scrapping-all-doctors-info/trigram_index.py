@@ -0,0 +1,93 @@
+# trigram_index.py
+# Fuzzy lookup over short strings (specialties, cities, areas, hospital and
+# doctor names) by character trigram similarity, so "dermatolgist" still
+# finds "Dermatologist" and "shifa intl" finds "Shifa International Hospital".
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# common abbreviations in hospital names and user queries
+ABBREVIATIONS = {
+    "intl": "international", "int'l": "international", "hosp": "hospital",
+    "govt": "government", "gov": "government", "med": "medical",
+    "ctr": "center", "centre": "center", "complx": "complex", "clnc": "clinic",
+    "univ": "university", "teh": "tehsil", "dist": "district",
+}
+
+
+def normalize(text: str) -> str:
+    words = re.findall(r"[a-z0-9']+", (text or "").lower())
+    return " ".join(ABBREVIATIONS.get(w, w) for w in words)
+
+
+def trigrams(text: str) -> set:
+    grams = set()
+    for w in normalize(text).split():
+        padded = f"  {w} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self, items: Iterable[str] = ()):
+        self.items: List[str] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._ids: Dict[str, int] = {}
+        for it in items:
+            self.add(it)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: str) -> Optional[int]:
+        key = normalize(item)
+        if not key:
+            return None
+        if key in self._ids:
+            return self._ids[key]
+        idx = len(self.items)
+        grams = trigrams(key)
+        self.items.append(item)
+        self._sizes.append(len(grams))
+        self._ids[key] = idx
+        for g in grams:
+            self._postings[g].append(idx)
+        return idx
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.3) -> List[Tuple[str, float]]:
+        # Dice coefficient over trigram sets; only items sharing a trigram are scored
+        q = trigrams(query)
+        if not q:
+            return []
+        counts: Dict[int, int] = defaultdict(int)
+        for g in q:
+            for idx in self._postings.get(g, ()):
+                counts[idx] += 1
+        scored = []
+        for idx, shared in counts.items():
+            score = 2.0 * shared / (len(q) + self._sizes[idx])
+            if score >= min_score:
+                scored.append((self.items[idx], score))
+        scored.sort(key=lambda x: (-x[1], len(x[0])))
+        return scored[:limit]
+
+    def best(self, query: str, min_score: float = 0.3) -> Optional[str]:
+        hits = self.search(query, limit=1, min_score=min_score)
+        return hits[0][0] if hits else None
+
+
+def build_kb_indexes(rows: Iterable[Dict]) -> Dict[str, TrigramIndex]:
+    indexes = {k: TrigramIndex() for k in ("specialty", "city", "area", "hospital", "doctor")}
+    for r in rows:
+        for spec in (r.get("specialization") or "").split(","):
+            indexes["specialty"].add(spec.strip())
+        for c in (r.get("city"), r.get("hospital_city")):
+            indexes["city"].add((c or "").strip())
+        indexes["area"].add((r.get("hospital_address") or "").strip())
+        hosp = (r.get("hospital_name") or "").strip()
+        if hosp and hosp != "Video Consultation":
+            indexes["hospital"].add(hosp)
+        indexes["doctor"].add((r.get("name") or "").strip())
+    return indexes
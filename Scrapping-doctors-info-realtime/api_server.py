@@ -0,0 +1,203 @@
+# api_server.py
+# HTTP API over MarhamScraper for the app backend.
+#
+#   python api_server.py [--host 127.0.0.1] [--port 8080]
+#
+#   GET /search?q=dermatologist in dha lahore   ranked listing URLs for a query
+#   GET /doctors?url=<listing URL>&pages=1      doctor cards on the first `pages` listing pages
+#   GET /doctors?q=<query>&pages=1              knowledge base first, then the best listing (like the CLI)
+#   GET /doctors/stream?url=<listing URL>&pages=1  NDJSON, one doctor per line as each card is parsed
+#   GET /profile?url=<profile URL>              parsed profile: hospitals, timings, fees, ...
+#   GET /reviews?url=<profile URL>&n=5          reviews with the LLM summary
+#   GET /stats                                  cache and request-coalescing counters
+#   GET /metrics                                stage timings and counters, OpenMetrics text
+#
+# One browser is started with the server and shared by all requests. Results
+# are cached per lookup (lookup_cache.CACHE_TTL_S), and identical requests that
+# arrive while a fetch is running (same profile URL, same normalized query)
+# wait for that fetch instead of starting their own. Only URLs on
+# MARHAM_API_HOSTS may be fetched.
+import argparse
+import json
+import os
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from batch_modules import add_batch_dir
+
+add_batch_dir()
+from local_index import KB_MIN_RESULTS  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from profile_parser import BATCH_PARSE_WORKERS  # noqa: E402
+from scrapping_doctors_by_Query import MarhamScraper  # noqa: E402
+
+HOST = os.getenv("MARHAM_API_HOST", "127.0.0.1")
+PORT = int(os.getenv("MARHAM_API_PORT", "8080"))
+ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("MARHAM_API_HOSTS", "marham.pk,www.marham.pk").split(",")
+                 if h.strip()}
+MAX_REVIEWS = 50
+MAX_PAGES = 10  # listing pages one request may walk
+
+SCRAPER = web.AppKey("scraper", MarhamScraper)
+STARTED = web.AppKey("started", float)
+
+
+def _query(request: web.Request) -> str:
+    q = " ".join(request.query.get("q", "").split())
+    if not q:
+        raise web.HTTPBadRequest(text="missing q")
+    return q
+
+
+def _url(request: web.Request) -> str:
+    url = request.query.get("url", "").split("#")[0].strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or parsed.netloc.lower() not in ALLOWED_HOSTS:
+        raise web.HTTPBadRequest(text="url must be a marham.pk page")
+    return url.rstrip("/")
+
+
+def _failed(what: str):
+    return web.HTTPBadGateway(text=f"could not fetch {what}")
+
+
+async def _listing_urls(scraper: MarhamScraper, query_info: dict) -> list:
+    return await scraper.cached("links", scraper.query_key(query_info),
+                                lambda: scraper.search_doctors_by_query(query_info))
+
+
+def _pages(request: web.Request) -> int:
+    try:
+        return max(1, min(MAX_PAGES, int(request.query.get("pages", "1"))))
+    except ValueError:
+        raise web.HTTPBadRequest(text="pages must be a number")
+
+
+async def _listing(scraper: MarhamScraper, url: str, pages: int = 1) -> list:
+    return await scraper.cached("listing", f"{url} {pages}", lambda: scraper.search_doctors(url, max_pages=pages))
+
+
+async def _profile(scraper: MarhamScraper, url: str) -> Optional[dict]:
+    return await scraper.cached("profile", url, lambda: scraper.get_doctor_details(url))
+
+
+# ---------- handlers ----------
+async def search(request: web.Request) -> web.Response:
+    scraper = request.app[SCRAPER]
+    query_info = scraper.extract_query_info(_query(request))
+    links = await _listing_urls(scraper, query_info)
+    return web.json_response({"query_info": query_info, "listing_urls": links})
+
+
+async def doctors(request: web.Request) -> web.Response:
+    scraper = request.app[SCRAPER]
+    if "url" in request.query:
+        url = _url(request)
+        return web.json_response({"listing_url": url, "doctors": await _listing(scraper, url, _pages(request))})
+
+    query_info = scraper.extract_query_info(_query(request))
+    local = scraper.search_local(query_info)
+    listing_url = None
+    if len(local['fresh']) >= KB_MIN_RESULTS:
+        cards = scraper.merge_doctor_cards([], local['fresh'])
+    else:
+        links = await _listing_urls(scraper, query_info)
+        listing_url = links[0] if links else None
+        live = await _listing(scraper, listing_url, _pages(request)) if listing_url else []
+        cards = scraper.merge_doctor_cards(live, local['fresh'] + local['stale'])
+    return web.json_response({"query_info": query_info, "listing_url": listing_url, "doctors": cards})
+
+
+async def doctors_stream(request: web.Request) -> web.StreamResponse:
+    # one JSON line per doctor, sent as soon as its card is parsed (across pages)
+    scraper = request.app[SCRAPER]
+    url, pages = _url(request), _pages(request)
+    resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await resp.prepare(request)
+    async for doctor in scraper.stream_doctors(url, max_pages=pages):
+        await resp.write((json.dumps(doctor, ensure_ascii=False) + "\n").encode("utf-8"))
+    await resp.write_eof()
+    return resp
+
+
+async def profile(request: web.Request) -> web.Response:
+    scraper = request.app[SCRAPER]
+    url = _url(request)
+    data = await _profile(scraper, url)
+    if not data:
+        raise _failed(url)
+    return web.json_response(data)
+
+
+async def reviews(request: web.Request) -> web.Response:
+    scraper = request.app[SCRAPER]
+    url = _url(request)
+    try:
+        n = max(1, min(MAX_REVIEWS, int(request.query.get("n", "5"))))
+    except ValueError:
+        raise web.HTTPBadRequest(text="n must be a number")
+    data = await scraper.cached("reviews", f"{url} {n}", lambda: scraper.get_reviews(url, num_reviews=n))
+    if not data:
+        raise _failed(url)
+    return web.json_response(data)
+
+
+async def stats(request: web.Request) -> web.Response:
+    scraper = request.app[SCRAPER]
+    return web.json_response({
+        "uptime_s": round(time.monotonic() - request.app[STARTED], 1),
+        "caches": {kind: cache.stats() for kind, cache in scraper.caches.items()},
+        "requests": scraper.flight.stats(),
+    })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=METRICS.openmetrics(),
+                        content_type="application/openmetrics-text", charset="utf-8")
+
+
+# ---------- app ----------
+async def _start(app: web.Application):
+    app[STARTED] = time.monotonic()
+    await app[SCRAPER].start()  # warm browser before the first request
+
+
+async def _stop(app: web.Application):
+    await app[SCRAPER].close()
+    METRICS.write()
+
+
+def make_app(scraper: Optional[MarhamScraper] = None,
+             parse_workers: int = BATCH_PARSE_WORKERS) -> web.Application:
+    app = web.Application()
+    app[SCRAPER] = scraper or MarhamScraper(parse_workers=parse_workers)
+    app.router.add_get("/search", search)
+    app.router.add_get("/doctors", doctors)
+    app.router.add_get("/doctors/stream", doctors_stream)
+    app.router.add_get("/profile", profile)
+    app.router.add_get("/reviews", reviews)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", metrics)
+    app.on_startup.append(_start)
+    app.on_cleanup.append(_stop)
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HTTP API for Marham doctor lookups")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--parse-workers", type=int, default=BATCH_PARSE_WORKERS,
+                    help="processes parsing profile HTML (0: on the event loop; default: cores - 1)")
+    ap.add_argument("--metrics", help="collect stage timings; written here on shutdown (.json or .prom)")
+    args = ap.parse_args()
+    if args.metrics:
+        METRICS.enable(args.metrics)
+    web.run_app(make_app(parse_workers=args.parse_workers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
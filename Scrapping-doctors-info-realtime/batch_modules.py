@@ -0,0 +1,27 @@
+# batch_modules.py
+# The realtime scraper reuses modules of the batch crawler in
+# ../Scrapping-all-doctors-info: entities, schedule_index, trigram_index,
+# page_parser, pagination, fetch_retry, adaptive_limiter, html_archive, metrics
+# and kb_store. Every realtime module that imports one of them calls
+# add_batch_dir() first, so each module imports on its own (python -c "import
+# profile_parser" works, and so do spawned parse workers) whatever was
+# imported before it.
+#
+#   from batch_modules import add_batch_dir
+#
+#   add_batch_dir()
+#   from metrics import METRICS  # noqa: E402
+import os
+import sys
+
+BATCH_DIR = os.path.abspath(os.getenv(
+    "MARHAM_BATCH_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scrapping-all-doctors-info"),
+))
+
+
+def add_batch_dir() -> str:
+    # appended, so a module of the same name in this directory wins
+    if BATCH_DIR not in sys.path:
+        sys.path.append(BATCH_DIR)
+    return BATCH_DIR
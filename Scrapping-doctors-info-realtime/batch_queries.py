@@ -0,0 +1,208 @@
+# batch_queries.py
+# Non-interactive front end for scrapping_doctors_by_Query.py: run a file of
+# queries through a bounded pool of workers that share one browser, and stream
+# one JSON line per query as soon as it finishes.
+#
+#   python batch_queries.py queries.txt [--out batch_results.jsonl | --out -]
+#                           [--workers 3] [--doctors 1,2] [--reviews] [--pages 1]
+#                           [--parse-workers N]
+#
+# Each input line is either a plain query ("dermatologist in dha lahore") or a
+# JSON object:
+#   {"query": "...", "doctors": [1, 3], "reviews": true, "listing_url": "https://...", "pages": 2}
+# "doctors" are the numbers the interactive prompt would show (default: --doctors),
+# "listing_url" skips the web search, "pages" is the number of listing pages read (default --pages). Blank lines and lines starting with # are ignored.
+#
+# Every output line carries the input line number, the doctor cards, the
+# selected doctors' details (and reviews) and a latency breakdown in seconds:
+#   {"line", "query", "status", "listing_url", "doctors", "selected", "error",
+#    "latency_s": {"local", "search", "validate", "listing", "profile", "reviews", "total"}}
+# With --out - the JSONL goes to stdout and the scraper's progress output to stderr.
+import argparse
+import asyncio
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+
+from batch_modules import add_batch_dir
+
+add_batch_dir()
+from local_index import KB_MIN_RESULTS  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from profile_parser import BATCH_PARSE_WORKERS  # noqa: E402
+from scrapping_doctors_by_Query import MarhamScraper, build_doctor_details  # noqa: E402
+
+WORKERS = 3
+OUT_FILE = "batch_results.jsonl"
+NUM_REVIEWS = 5
+
+
+def parse_line(line: str, default_doctors: List[int], default_reviews: bool,
+               default_pages: int = 1) -> Optional[Dict]:
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        job = json.loads(line)
+    else:
+        job = {"query": line}
+    job.setdefault("doctors", list(default_doctors))
+    job.setdefault("reviews", default_reviews)
+    job.setdefault("pages", default_pages)
+    return job
+
+
+def read_jobs(path: str, default_doctors: List[int], default_reviews: bool,
+              default_pages: int = 1) -> List[Dict]:
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            try:
+                job = parse_line(line, default_doctors, default_reviews, default_pages)
+            except ValueError as e:
+                print(f"⚠️ Skipping line {n}: {e}", file=sys.stderr)
+                continue
+            if job:
+                job["line"] = n
+                jobs.append(job)
+    return jobs
+
+
+async def run_query(scraper: MarhamScraper, job: Dict) -> Dict:
+    latency = {}
+    record = {"line": job.get("line"), "query": job.get("query", ""), "status": "ok",
+              "listing_url": job.get("listing_url"), "doctors": [], "selected": [], "error": None}
+    t_start = time.perf_counter()
+
+    def lap(stage: str, t0: float):
+        latency[stage] = latency.get(stage, 0.0) + time.perf_counter() - t0
+
+    try:
+        query_info = scraper.extract_query_info(record["query"])
+        t0 = time.perf_counter()
+        local = scraper.search_local(query_info)
+        lap("local", t0)
+
+        if record["listing_url"] is None and len(local['fresh']) >= KB_MIN_RESULTS:
+            cards = scraper.merge_doctor_cards([], local['fresh'])
+        else:
+            if record["listing_url"] is None:
+                links = await scraper.search_doctors_by_query(query_info, latency)
+                record["listing_url"] = links[0] if links else None
+            live = []
+            if record["listing_url"]:
+                t0 = time.perf_counter()
+                live = await scraper.search_doctors(record["listing_url"], max_pages=job.get("pages", 1))
+                lap("listing", t0)
+            cards = scraper.merge_doctor_cards(live, local['fresh'] + local['stale'])
+        record["doctors"] = cards
+        if not cards:
+            record["status"] = "no_doctors"
+
+        for number in job.get("doctors") or []:
+            if not 1 <= number <= len(cards):
+                record["selected"].append({"number": number, "error": "no such doctor"})
+                continue
+            card = cards[number - 1]
+            t0 = time.perf_counter()
+            profile = await scraper.get_doctor_details(card['profile_url'])
+            lap("profile", t0)
+            selected = {"number": number, "details": build_doctor_details(card, profile)}
+            if job.get("reviews"):
+                t0 = time.perf_counter()
+                selected["reviews"] = await scraper.get_reviews(card['profile_url'], num_reviews=NUM_REVIEWS)
+                lap("reviews", t0)
+            record["selected"].append(selected)
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    latency["total"] = time.perf_counter() - t_start
+    record["latency_s"] = {k: round(v, 3) for k, v in latency.items()}
+    return record
+
+
+async def run_batch(jobs: List[Dict], out, workers: int = WORKERS,
+                    parse_workers: int = BATCH_PARSE_WORKERS) -> List[Dict]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    done: List[Dict] = []
+    scraper = MarhamScraper(parse_workers=parse_workers)
+    await scraper.start()
+
+    async def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await run_query(scraper, job)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            done.append(record)
+            print(f"📦 [{len(done)}/{len(jobs)}] {record['status']} in {record['latency_s']['total']:.1f}s: "
+                  f"{record['query']}", file=sys.stderr)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(workers, len(jobs))))))
+    finally:
+        await scraper.close()
+    return done
+
+
+def summarize(records: List[Dict], wall: float) -> str:
+    totals = sorted(r["latency_s"]["total"] for r in records)
+    if not totals:
+        return "No queries processed."
+
+    def pct(p: float) -> float:
+        return totals[min(len(totals) - 1, int(p * len(totals)))]
+
+    statuses: Dict[str, int] = {}
+    for r in records:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    stages = ("local", "search", "validate", "listing", "profile", "reviews")
+    mean = {s: sum(r["latency_s"].get(s, 0.0) for r in records) / len(records) for s in stages}
+    return (f"✅ {len(records)} queries in {wall:.1f}s ({len(records) / wall:.2f}/s); "
+            + ", ".join(f"{k} {v}" for k, v in sorted(statuses.items()))
+            + f"\n   latency p50 {pct(0.5):.2f}s, p95 {pct(0.95):.2f}s, max {totals[-1]:.2f}s"
+            + "\n   mean per stage: " + ", ".join(f"{s} {mean[s]:.2f}s" for s in stages))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run realtime doctor queries from a file, without prompts")
+    ap.add_argument("queries", help="text file, one query (or JSON object) per line")
+    ap.add_argument("--out", default=OUT_FILE, help="JSONL output file, or - for stdout")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="queries processed at the same time")
+    ap.add_argument("--doctors", default="", help="doctor numbers to fetch for plain queries, e.g. 1,2")
+    ap.add_argument("--reviews", action="store_true", help="also fetch reviews of the selected doctors")
+    ap.add_argument("--pages", type=int, default=1, help="listing pages read per query")
+    ap.add_argument("--parse-workers", type=int, default=BATCH_PARSE_WORKERS,
+                    help="processes parsing profile HTML (0: on the event loop; default: cores - 1)")
+    ap.add_argument("--metrics", help="write stage timings and counters here (.json, or .prom for OpenMetrics)")
+    args = ap.parse_args()
+    if args.metrics:
+        METRICS.enable(args.metrics)
+
+    default_doctors = [int(n) for n in args.doctors.split(",") if n.strip()]
+    jobs = read_jobs(args.queries, default_doctors, args.reviews, args.pages)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        # progress prints must not end up in the JSONL stream
+        with redirect_stdout(sys.stderr):
+            records = asyncio.run(run_batch(jobs, out, args.workers, args.parse_workers))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(summarize(records, time.perf_counter() - t0), file=sys.stderr)
+    if METRICS.write():
+        print(f"📈 Metrics written to {METRICS.path}\n{METRICS.report()}", file=sys.stderr)
+    return 0 if all(r["status"] != "error" for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
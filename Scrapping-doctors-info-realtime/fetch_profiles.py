@@ -0,0 +1,92 @@
+# fetch_profiles.py
+# crawl4ai run settings for each kind of page MarhamScraper loads, and the
+# HTML crop applied before a page is parsed or cached.
+#
+# By default crawl4ai turns every page into cleaned HTML and markdown. Only
+# validate_url reads the markdown (its first 5000 characters); the listing,
+# profile and review parsers scan result.html with regexes. Those call sites
+# use a markdown generator that does nothing and leave scripts, styles and
+# SVG out of the cleaned HTML. The raw page still goes to the archive; what is
+# parsed and kept in the page cache is the crop: the page without comments,
+# scripts, styles and inline SVG, none of which the parsers read.
+#
+# crawl4ai is imported when the first run config is built, so crop_html can be
+# used (and benchmarked) without it. NoMarkdown is written against crawl4ai
+# 0.7.4 (pinned in requirements.txt); if its markdown classes move, the call
+# sites keep crawl4ai's default markdown instead of failing.
+import re
+from functools import lru_cache
+
+# call site -> run settings; "markdown": False means result.markdown is not read
+FETCH_PROFILES = {
+    # validate_url: markdown of the listing, first 5000 characters
+    "validate": {"page_timeout": 15000, "word_count_threshold": 10, "markdown": True},
+    # _fetch_listing: doctor cards and the next-page link
+    "listing": {"page_timeout": 30000, "delay_before_return_html": 3.0, "markdown": False,
+                "wait_for": "css:a[href*='/doctors/'], .doctor-card, .list-data"},
+    # fetch_profile_page: profile and review parsers
+    "profile": {"page_timeout": 30000, "delay_before_return_html": 2.0, "markdown": False},
+    # review_harvest: later review pages / load-more fragments
+    "reviews": {"page_timeout": 30000, "markdown": False},
+}
+# tags crawl4ai leaves out of cleaned_html when markdown is off
+SKIPPED_TAGS = ["script", "style", "noscript", "svg", "iframe"]
+
+_NOISE_START_RE = re.compile(r"<(!--|script|style|noscript|svg|template)\b", re.IGNORECASE)
+_NOISE_END_RE = {tag: re.compile(r"</%s\s*>" % tag, re.IGNORECASE)
+                 for tag in ("script", "style", "noscript", "svg", "template")}
+
+
+@lru_cache(maxsize=None)
+def _no_markdown():
+    try:
+        from crawl4ai.markdown_generation_strategy import MarkdownGenerationStrategy
+        from crawl4ai.models import MarkdownGenerationResult
+    except ImportError:
+        return None
+
+    class NoMarkdown(MarkdownGenerationStrategy):
+        # for call sites that only read result.html
+        def generate_markdown(self, input_html: str, base_url: str = "", html2text_options=None,
+                              content_filter=None, citations: bool = True, **kwargs):
+            return MarkdownGenerationResult(raw_markdown="", markdown_with_citations="", references_markdown="")
+
+    return NoMarkdown()
+
+
+@lru_cache(maxsize=None)
+def run_config(kind: str):
+    # CrawlerRunConfig for one call site, built once
+    from crawl4ai import CacheMode, CrawlerRunConfig
+
+    profile = dict(FETCH_PROFILES[kind])
+    markdown = profile.pop("markdown")
+    if not markdown:
+        profile.update(word_count_threshold=0, excluded_tags=SKIPPED_TAGS)
+        if _no_markdown() is not None:
+            profile["markdown_generator"] = _no_markdown()
+    return CrawlerRunConfig(cache_mode=CacheMode.BYPASS, verbose=False, **profile)
+
+
+def crop_html(html: str) -> str:
+    # the page minus comments, scripts, styles and SVG; cards, profile sections,
+    # reviews and pagination links are untouched. One forward scan: find the
+    # next noise tag, skip to its end tag (an unclosed one runs to the end).
+    if not html:
+        return html
+    kept = []
+    pos = 0
+    while True:
+        m = _NOISE_START_RE.search(html, pos)
+        if m is None:
+            break
+        kept.append(html[pos:m.start()])
+        tag = m.group(1).lower()
+        if tag == "!--":
+            end = html.find("-->", m.end())
+            pos = len(html) if end < 0 else end + 3
+        else:
+            end_m = _NOISE_END_RE[tag].search(html, m.end())
+            pos = len(html) if end_m is None else end_m.end()
+    kept.append(html[pos:])
+    return "".join(kept)
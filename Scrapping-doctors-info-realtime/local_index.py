@@ -0,0 +1,241 @@
+import csv
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from batch_modules import BATCH_DIR, add_batch_dir
+
+add_batch_dir()
+from entities import doctor_id, hospital_id  # noqa: E402
+from schedule_index import AvailabilityIndex, iter_bits, parse_schedule  # noqa: E402
+from trigram_index import TrigramIndex, build_kb_indexes  # noqa: E402
+
+# Knowledge base written by the batch scraper (Scrapping-all-doctors-info)
+KB_DIR = os.getenv("MARHAM_KB_DIR", BATCH_DIR)
+KB_PATH = os.getenv("MARHAM_KB_PATH", os.path.join(KB_DIR, "doctors_knowledge_base.csv"))
+
+# Entries older than this are treated as stale and refreshed from the web
+KB_MAX_AGE_HOURS = float(os.getenv("KB_MAX_AGE_HOURS", "168"))
+# Fewer fresh local matches than this and the live scraper fills the gap
+KB_MIN_RESULTS = int(os.getenv("KB_MIN_RESULTS", "3"))
+# Rows without scraped_at are stale unless this is set; then they are dated by
+# the file's mtime (which a copy or checkout resets, so only for KBs you trust)
+KB_MTIME_FALLBACK = os.getenv("KB_MTIME_FALLBACK", "0") == "1"
+
+STOPWORDS = {"the", "of", "and", "in", "dr", "a", "for", "road", "rd", "&", "-"}
+
+
+def tokenize(text: str) -> List[str]:
+    # sector names are written "I-8", "i 8" and "i8"; index them as one token
+    text = re.sub(r"\b([a-z])[-\s]?(\d{1,2})\b", r"\1\2", (text or "").lower())
+    return [t for t in re.findall(r"[a-z0-9]+", text) if t not in STOPWORDS]
+
+
+def _parse_ts(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def read_kb_rows(path: str) -> List[dict]:
+    # knowledge-base rows from the CSV or a kb_store .db
+    if path.endswith(".db"):
+        import kb_store
+        return kb_store.read_rows(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class LocalIndex:
+    """In-memory index over the doctors knowledge base.
+
+    Doctors are grouped by entities.doctor_id (one entry per doctor, with all their
+    practices) and indexed by city, specialization, area/hospital address
+    tokens, and an inverted index over areas_of_interest. `fuzzy` holds
+    trigram indexes over specialties, cities, areas, hospitals and doctor
+    names for misspelled queries. `availability` indexes every practice's
+    weekly schedule for "who is available on <day> <time>" queries.
+    """
+
+    def __init__(self, rows: List[dict], default_ts: Optional[float] = None):
+        self.doctors: List[dict] = []
+        self.by_city: Dict[str, Set[int]] = defaultdict(set)
+        self.by_specialty: Dict[str, Set[int]] = defaultdict(set)
+        self.by_area: Dict[str, Set[int]] = defaultdict(set)
+        self.by_interest: Dict[str, Set[int]] = defaultdict(set)
+        # practice-level data: owning doctor, schedule index, area token bitsets
+        self.practice_doctor: List[int] = []
+        self.availability = AvailabilityIndex()
+        self.area_practices: Dict[str, int] = defaultdict(int)
+        self._default_ts = default_ts
+        self._build(rows)
+        self.fuzzy: Dict[str, TrigramIndex] = build_kb_indexes(rows)
+
+    @classmethod
+    def from_path(cls, path: str = KB_PATH, mtime_fallback: bool = KB_MTIME_FALLBACK) -> "LocalIndex":
+        return cls(read_kb_rows(path), default_ts=os.path.getmtime(path) if mtime_fallback else None)
+
+    def _build(self, rows: List[dict]):
+        by_doctor: Dict[str, int] = {}
+        hospital_ids: Dict[int, Set[str]] = defaultdict(set)
+        for r in rows:
+            # one entry per doctor, however many listings and URL forms they appear under
+            key = doctor_id(r)
+            idx = by_doctor.get(key)
+            if idx is None:
+                idx = len(self.doctors)
+                by_doctor[key] = idx
+                self.doctors.append({
+                    "name": r.get("name", ""),
+                    "speciality": r.get("specialization", ""),
+                    "qualifications": r.get("qualification", ""),
+                    "pmdc_verified": False,
+                    "reviews": r.get("reviews", ""),
+                    "experience": r.get("experience", ""),
+                    "satisfaction": r.get("satisfaction_rate", ""),
+                    "profile_url": r.get("profile_url", ""),
+                    "hospitals": [],
+                    "areas_of_interest": [a.strip() for a in (r.get("areas_of_interest") or "").split(",") if a.strip()],
+                    "source": "knowledge_base",
+                    "scraped_at": None,
+                })
+                for spec in (r.get("specialization") or "").split(","):
+                    spec = spec.strip().lower()
+                    if spec:
+                        self.by_specialty[spec].add(idx)
+                    for tok in tokenize(spec):
+                        self.by_specialty[tok].add(idx)
+                for interest in self.doctors[idx]["areas_of_interest"]:
+                    self.by_interest[interest.lower()].add(idx)
+                    for tok in tokenize(interest):
+                        self.by_interest[tok].add(idx)
+
+            doc = self.doctors[idx]
+            ts = _parse_ts(r.get("scraped_at", ""))
+            if ts is not None and (doc["scraped_at"] is None or ts > doc["scraped_at"]):
+                doc["scraped_at"] = ts
+
+            for c in {(r.get("city") or "").strip().lower(), (r.get("hospital_city") or "").strip().lower()}:
+                if c:
+                    self.by_city[c].add(idx)
+            pid = self.availability.add(parse_schedule(r.get("availability_schedule", "")))
+            self.practice_doctor.append(idx)
+            for tok in tokenize(f"{r.get('hospital_address', '')} {r.get('hospital_name', '')} {r.get('complete address', '')}"):
+                self.by_area[tok].add(idx)
+                self.area_practices[tok] |= 1 << pid
+
+            hosp_name = r.get("hospital_name") or ""
+            # spelling variants of one hospital (entities.hospital_id) are listed once
+            hosp_id = hospital_id(r) or hosp_name
+            if hosp_name and hosp_name != "Video Consultation" and hosp_id not in hospital_ids[idx]:
+                hospital_ids[idx].add(hosp_id)
+                doc["hospitals"].append({
+                    "name": hosp_name,
+                    "city": r.get("hospital_city", ""),
+                    "address": r.get("hospital_address", ""),
+                    "fee": f"Rs. {r.get('fee')}" if r.get("fee") else "",
+                    "schedule": r.get("availability_schedule", ""),
+                })
+
+    # ---------- lookups ----------
+    def _specialty_ids(self, specialty: str) -> Set[int]:
+        s = specialty.lower().strip()
+        ids = set(self.by_specialty.get(s, ()))
+        if not ids:
+            for tok in tokenize(s):
+                ids |= self.by_specialty.get(tok, set())
+        # doctors listing the specialty as an area of interest also count
+        ids |= self.by_interest.get(s, set())
+        return ids
+
+    def _area_ids(self, area: str) -> Set[int]:
+        ids: Optional[Set[int]] = None
+        for tok in tokenize(area.replace("-", " ")):
+            posting = self.by_area.get(tok, set())
+            ids = set(posting) if ids is None else ids & posting
+        return ids or set()
+
+    def _lookup_ids(self, specialty: Optional[str], city: Optional[str], area: Optional[str]) -> Set[int]:
+        candidates: Optional[Set[int]] = None
+        if city:
+            candidates = set(self.by_city.get(city.lower().strip(), set()))
+        if specialty:
+            ids = self._specialty_ids(specialty)
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            return set()
+        if area:
+            in_area = candidates & self._area_ids(area)
+            # an unknown area should not hide the city-wide matches
+            if in_area:
+                candidates = in_area
+        return candidates
+
+    def lookup(self, specialty: Optional[str] = None, city: Optional[str] = None,
+               area: Optional[str] = None) -> List[dict]:
+        return [self.doctors[i] for i in sorted(self._lookup_ids(specialty, city, area))]
+
+    def available_ids(self, day: int, start: int, end: int, area: Optional[str] = None) -> Set[int]:
+        """Doctors with a practice open at any point of [start, end) minutes on `day`"""
+        bits = self.availability.open_during(day, start, end)
+        if area:
+            area_bits = None
+            for tok in tokenize(area.replace("-", " ")):
+                posting = self.area_practices.get(tok, 0)
+                area_bits = posting if area_bits is None else area_bits & posting
+            if area_bits:
+                bits &= area_bits
+        return {self.practice_doctor[p] for p in iter_bits(bits)}
+
+    def available(self, day: int, start: int, end: int, specialty: Optional[str] = None,
+                  city: Optional[str] = None, area: Optional[str] = None) -> List[dict]:
+        ids = self.available_ids(day, start, end, area)
+        if specialty or city:
+            ids &= self._lookup_ids(specialty, city, None)
+        return [self.doctors[i] for i in sorted(ids)]
+
+    def age_hours(self, doctor: dict, now: Optional[float] = None) -> Optional[float]:
+        ts = doctor.get("scraped_at") or self._default_ts
+        if ts is None:
+            return None
+        return ((now or time.time()) - ts) / 3600.0
+
+    def is_fresh(self, doctor: dict, max_age_hours: float = KB_MAX_AGE_HOURS) -> bool:
+        age = self.age_hours(doctor)
+        return age is not None and age <= max_age_hours
+
+    def resolve(self, query_info: dict, max_age_hours: float = KB_MAX_AGE_HOURS) -> Dict[str, List[dict]]:
+        """Split local matches for an extract_query_info() result into fresh and stale."""
+        ids = self._lookup_ids(query_info.get("specialty"), query_info.get("city"), query_info.get("area"))
+        when = query_info.get("when")
+        if when:
+            ids &= self.available_ids(when["day"], when["start"], when["end"], query_info.get("area"))
+        matches = [self.doctors[i] for i in sorted(ids)]
+        fresh = [d for d in matches if self.is_fresh(d, max_age_hours)]
+        stale = [d for d in matches if not self.is_fresh(d, max_age_hours)]
+        return {"fresh": fresh, "stale": stale}
+
+
+_index_cache: Dict[str, tuple] = {}
+
+
+def get_index(path: str = KB_PATH) -> Optional[LocalIndex]:
+    """Load (or reuse) the index for `path`; rebuilt when the file changes."""
+    if not os.path.isfile(path):
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _index_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    index = LocalIndex.from_path(path)
+    _index_cache[path] = (mtime, index)
+    return index
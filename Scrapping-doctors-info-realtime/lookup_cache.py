@@ -0,0 +1,99 @@
+# lookup_cache.py
+# Result caches and in-flight request coalescing for MarhamScraper lookups.
+#
+# A long-running process (api_server.py, batch_queries.py) sees the same
+# listing and profile URLs again and again. TTLCache keeps recent results per
+# kind of lookup; SingleFlight makes concurrent callers asking for the same
+# key share one fetch instead of each loading the page.
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# seconds a result stays valid, per kind of lookup
+CACHE_TTL_S = {
+    "links": 3600.0,       # normalized query -> ranked listing URLs
+    "listing": 900.0,      # listing URL -> doctor cards
+    "profile": 6 * 3600.0,  # profile URL -> parsed profile
+    "reviews": 3600.0,     # profile URL + count -> reviews summary
+    "page": 600.0,         # profile URL -> raw HTML, shared by the profile and review parsers
+}
+CACHE_MAX_ENTRIES = 2000
+# raw pages are a few hundred KB each; keep only the recent ones
+CACHE_SIZES = {"page": 64}
+
+
+class TTLCache:
+    def __init__(self, ttl_s: float, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl_s, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)  # least recently used
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SingleFlight:
+    # one running fetch per key; later callers await the same task. Callers are
+    # shielded from each other: one giving up (e.g. a closed HTTP connection)
+    # does not cancel the fetch the others are waiting for.
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._tasks[key] = task
+            self.started += 1
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def cancel(self, key: Hashable) -> bool:
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> Dict[str, int]:
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._tasks)}
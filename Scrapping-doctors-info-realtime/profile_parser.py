@@ -0,0 +1,328 @@
+# profile_parser.py
+# Doctor profile parsing as a pure function (HTML in, dict out), and a process
+# pool that runs it off the event loop.
+#
+# parse_doctor_profile runs a few dozen regex scans over the whole page: one
+# re.split per hospital section plus the name/speciality/qualification/phone/
+# statement patterns. On the event loop that CPU work blocks every other fetch
+# while it runs, so a batch of queries never parses on more than one core.
+# ParsePool sends each page to a worker process instead:
+#
+#   pool = ParsePool(workers=4)
+#   profile = await pool.parse(html, url)   # inline when workers is 0 or the page is small
+#   pool.close()
+#
+# Workers are spawned (not forked): the scraper process runs a browser and
+# threads by the time the first page is parsed. Only the HTML and the
+# resulting dict cross the process boundary.
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from batch_modules import add_batch_dir
+
+add_batch_dir()
+from schedule_index import parse_intervals  # noqa: E402
+
+# processes parsing profiles; 0 parses on the event loop. The interactive CLI
+# parses one profile at a time, batch mode and the API keep a core for the loop.
+PARSE_WORKERS = int(os.getenv("MARHAM_PARSE_WORKERS", "0"))
+BATCH_PARSE_WORKERS = int(os.getenv("MARHAM_PARSE_WORKERS", str(max(0, (os.cpu_count() or 1) - 1))))
+# a round trip to a worker costs about as much as parsing ~4 KB of HTML, so
+# smaller pages are still parsed inline
+PARSE_INLINE_CHARS = 8000
+
+
+def parse_hospital_timings(html_section: str) -> List[dict]:
+    # weekly schedule from a hospital timing table
+    timings = []
+
+    # Find all table rows with timing information
+    # Pattern: <tr class="text-sm"><td class="text-bold text-blue">Mon</td><td>10:00 AM - 02:00 PM</td></tr>
+    day_patterns = r'<tr[^>]*class="text-sm"[^>]*>\s*<td[^>]*class="text-bold text-blue"[^>]*>([^<]+)</td>\s*<td[^>]*>([^<]+)</td>\s*</tr>'
+    day_matches = re.findall(day_patterns, html_section, re.IGNORECASE | re.DOTALL)
+
+    for day, time_slot in day_matches:
+        timings.append({
+            "day": day.strip(),
+            "time": time_slot.strip(),
+            # minutes from midnight, e.g. [[660, 960]] for 11:00 AM - 04:00 PM
+            "intervals": [list(span) for span in parse_intervals(time_slot)]
+        })
+
+    return timings
+
+def parse_doctor_profile(html: str, url: str) -> dict:
+    # profile HTML -> doctor dict, with hospital addresses and timings
+    doctor_info = {
+        "profile_url": url,
+        "name": "",
+        "speciality": "",
+        "qualifications": "",
+        "pmdc_verified": False,
+        "reviews_count": "",
+        "experience": "",
+        "satisfaction": "",
+        "wait_time": "",
+        "avg_time_to_patient": "",
+        "patient_satisfaction_rating": "",
+        "hospitals": [],
+        "areas_of_interest": [],
+        "phone": "",
+        "video_consultation_fee": "",
+        "video_consultation_timings": [],
+        "languages": [],
+        "services": [],
+        "professional_statement": ""
+    }
+
+    # Extract basic fields (name, speciality, qualifications, etc.) - same as before
+    name_patterns = [
+        r'<h1[^>]*class="mb-0"[^>]*>(?:Dr\.\s*|Prof\.\s*|Asst\.\s*Prof\.\s*)?([^<]+)</h1>',
+        r'<h1[^>]*>(?:Dr\.\s*|Prof\.\s*)?([^<]+)</h1>',
+    ]
+    for pattern in name_patterns:
+        name_match = re.search(pattern, html)
+        if name_match:
+            doctor_info['name'] = name_match.group(1).strip()
+            break
+
+    if re.search(r'PMDC\s+Verified', html, re.IGNORECASE):
+        doctor_info['pmdc_verified'] = True
+
+    spec_patterns = [
+        r'<strong[^>]*class="text-sm"[^>]*>([^<]+(?:ologist|logist|Specialist|Surgeon|Physician))</strong>',
+        r'<p[^>]*class="mt-10"[^>]*><strong[^>]*>([^<]+)</strong>',
+    ]
+    for pattern in spec_patterns:
+        spec_match = re.search(pattern, html[:50000], re.IGNORECASE)
+        if spec_match:
+            doctor_info['speciality'] = spec_match.group(1).strip()
+            break
+
+    qual_patterns = [
+        r'<p[^>]*class="text-sm mb-0"[^>]*>([^<]*(?:MBBS|FCPS|MCPS|MD|MS|FRCS|MRCP)[^<]*)</p>',
+        r'<p[^>]*class="text-sm"[^>]*>([^<]*(?:MBBS|FCPS|MCPS|MD|MS)[^<]*)</p>',
+    ]
+    for pattern in qual_patterns:
+        qual_match = re.search(pattern, html[:50000])
+        if qual_match:
+            qual_text = qual_match.group(1).strip()
+            if any(deg in qual_text.upper() for deg in ['MBBS', 'FCPS', 'MD', 'MS', 'MCPS']):
+                doctor_info['qualifications'] = re.sub(r'&amp;', '&', qual_text)
+                break
+
+    reviews_patterns = [
+        r'<i[^>]*fa-thumbs-up[^>]*></i>\s*(\d+)',
+        r'<h2[^>]*>\s*(\d+)\s+Reviews',
+    ]
+    for pattern in reviews_patterns:
+        reviews_match = re.search(pattern, html, re.IGNORECASE)
+        if reviews_match:
+            doctor_info['reviews_count'] = reviews_match.group(1).strip()
+            break
+
+    exp_patterns = [
+        r'<p class="mb-0 text-sm">(?:\d+\s*Yrs?\s+)?Experience</p>\s*<p class="text-bold text-sm">(\d+\s*Yrs?)</p>',
+        r'(\d+\s*Yrs?)\s+Experience',
+    ]
+    for pattern in exp_patterns:
+        exp_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+        if exp_match:
+            doctor_info['experience'] = exp_match.group(1).strip()
+            break
+
+    wait_patterns = [
+        r'<p[^>]*class="mb-0 text-sm"[^>]*>Wait Time</p>\s*<p[^>]*class="text-bold"[^>]*>([^<]+)</p>',
+    ]
+    for pattern in wait_patterns:
+        wait_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+        if wait_match:
+            doctor_info['wait_time'] = wait_match.group(1).strip()
+            break
+
+    avg_time_patterns = [
+        r'<p[^>]*class="mb-0 text-sm"[^>]*>Avg\.\s+Time\s+to\s+Patient</p>\s*<p[^>]*class="text-bold"[^>]*>([^<]+)</p>',
+    ]
+    for pattern in avg_time_patterns:
+        avg_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+        if avg_match:
+            doctor_info['avg_time_to_patient'] = avg_match.group(1).strip()
+            break
+
+    rating_pattern = r'<div[^>]*class="col-2[^"]*text-right[^"]*"[^>]*>(\d+\.?\d*/5)</div>'
+    rating_match = re.search(rating_pattern, html, re.IGNORECASE)
+    if rating_match:
+        doctor_info['patient_satisfaction_rating'] = rating_match.group(1).strip()
+
+    # ==================== ENHANCED HOSPITAL & ADDRESS EXTRACTION ====================
+
+    # Method 1: Extract from data-hospital attributes (works for buttons/links)
+    hospital_pattern = r'data-hospitalname="([^"]+)"[^>]*data-hospitalcity="([^"]+)"[^>]*data-hospitaladdress="([^"]+)"[^>]*data-amount="([^"]+)"'
+    hospitals_data = re.findall(hospital_pattern, html)
+    seen_hospitals = {}
+
+    for hosp in hospitals_data:
+        hospital_name, city, address, fee = hosp
+        if hospital_name == "Video Consultation":
+            fee_clean = re.sub(r'[,\s]+', '', fee).strip()
+            if not doctor_info['video_consultation_fee']:
+                doctor_info['video_consultation_fee'] = f"Rs. {fee_clean}" if fee_clean else ""
+        else:
+            fee_clean = re.sub(r'[,\s]+', '', fee).strip()
+            hosp_key = hospital_name.lower().strip()
+            if hosp_key not in seen_hospitals:
+                seen_hospitals[hosp_key] = {
+                    "name": hospital_name,
+                    "city": city,
+                    "address": address,
+                    "fee": f"Rs. {fee_clean}" if fee_clean else "",
+                    "timings": []
+                }
+
+    # Method 2: Extract from Practice Address sections with <h3 class="text-bold text-underline">
+    # This method extracts hospital name, area/city, fee, AND TIMINGS
+
+    # Find all hospital sections (each starts with <h3 class="text-bold text-underline">Hospital Name</h3>)
+    hospital_sections = re.split(r'<h3[^>]*class="text-bold text-underline"[^>]*>', html)
+
+    for section in hospital_sections[1:]:  # Skip first split (before first h3)
+        # Extract hospital name (first content before </h3>)
+        name_match = re.search(r'^([^<]+)</h3>', section)
+        if not name_match:
+            continue
+
+        hospital_name = name_match.group(1).strip()
+
+        # Skip if it's "Video Consultation"
+        if "video" in hospital_name.lower() or "online" in hospital_name.lower():
+            # Extract video consultation fee and timings
+            fee_match = re.search(r'<p[^>]*>Rs\.\s*([0-9,]+)', section)
+            if fee_match and not doctor_info['video_consultation_fee']:
+                fee_clean = re.sub(r'[,\s]+', '', fee_match.group(1))
+                doctor_info['video_consultation_fee'] = f"Rs. {fee_clean}"
+
+            # Extract video consultation timings
+            doctor_info['video_consultation_timings'] = parse_hospital_timings(section)
+            continue
+
+        # Extract area/city from "Area: Location, City" pattern
+        area_city = ""
+        area_match = re.search(r'<p[^>]*>Area:\s*([^<]+)</p>', section, re.IGNORECASE)
+        if area_match:
+            area_city = area_match.group(1).strip()
+
+        # Extract fee
+        fee_match = re.search(r'<p[^>]*>Rs\.\s*([0-9,]+)', section)
+        fee = ""
+        if fee_match:
+            fee_value = re.sub(r'[,\s]+', '', fee_match.group(1))
+            fee = "Rs. " + fee_value
+
+        # Extract timings from table
+        timings = parse_hospital_timings(section)
+
+        # Parse area and city from "Area, City" format
+        area = ""
+        city = ""
+        if area_city:
+            area_parts = area_city.split(',')
+            area = area_parts[0].strip() if area_parts else area_city
+            city = area_parts[1].strip() if len(area_parts) > 1 else ""
+
+        # Add or update hospital info
+        hosp_key = hospital_name.lower().strip()
+        if hosp_key in seen_hospitals:
+            # Update existing entry with additional info
+            if area and not seen_hospitals[hosp_key].get('area'):
+                seen_hospitals[hosp_key]['area'] = area
+            if city and not seen_hospitals[hosp_key].get('city'):
+                seen_hospitals[hosp_key]['city'] = city
+            if timings:
+                seen_hospitals[hosp_key]['timings'] = timings
+        else:
+            # Create new entry
+            seen_hospitals[hosp_key] = {
+                "name": hospital_name,
+                "area": area,
+                "city": city,
+                "address": area_city if area_city else "",
+                "fee": fee,
+                "timings": timings
+            }
+
+    # Convert dict to list
+    doctor_info['hospitals'] = list(seen_hospitals.values())
+
+    # ==================== END HOSPITAL EXTRACTION ====================
+
+    # Extract phone number
+    phone_patterns = [
+        r'href="tel:(\d{11})"',
+        r'(0?3\d{2}[- ]?\d{7})',
+    ]
+    for pattern in phone_patterns:
+        phone_match = re.search(pattern, html, re.IGNORECASE)
+        if phone_match:
+            phone = phone_match.group(1).strip()
+            phone = re.sub(r'[^\d]', '', phone)
+            if len(phone) >= 10 and not doctor_info['phone']:
+                doctor_info['phone'] = phone
+                break
+
+    # Extract services
+    services_section = re.search(r'<h2[^>]*>Services</h2>(.*?)</section>', html, re.DOTALL | re.IGNORECASE)
+    if services_section:
+        service_links = re.findall(r'<a[^>]*>([^<]+)</a>', services_section.group(1))
+        doctor_info['services'] = [s.strip() for s in service_links if len(s.strip()) > 3 and not s.strip().lower().startswith('http')]
+
+    # Extract professional statement
+    statement_pattern = r'<h2[^>]*>Professional Statement[^<]*</h2>\s*<div[^>]*>\s*<p[^>]*>(.*?)</p>'
+    statement_match = re.search(statement_pattern, html, re.DOTALL | re.IGNORECASE)
+    if statement_match:
+        statement_text = statement_match.group(1)
+        statement_text = re.sub(r'<[^>]+>', ' ', statement_text)
+        statement_text = re.sub(r'\s+', ' ', statement_text).strip()
+        if len(statement_text) > 50:
+            doctor_info['professional_statement'] = statement_text[:500]
+
+    # Extract areas of interest
+    interest_pattern = r'<span class="chips-highlight[^"]*"[^>]*>([^<]+)</span>'
+    interests = re.findall(interest_pattern, html)
+    doctor_info['areas_of_interest'] = [interest.strip() for interest in interests if len(interest.strip()) > 2]
+
+    return doctor_info
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+class ParsePool:
+    def __init__(self, workers: int = PARSE_WORKERS, inline_chars: int = PARSE_INLINE_CHARS):
+        self.workers = max(0, workers)
+        self.inline_chars = inline_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> Optional[ProcessPoolExecutor]:
+        # spawning a worker costs an interpreter start; start() early to hide it
+        if self._executor is None and self.workers:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.workers):
+                self._executor.submit(_warm)
+        return self._executor
+
+    async def parse(self, html: str, url: str) -> dict:
+        executor = self.start()
+        if executor is None or len(html) < self.inline_chars:
+            return parse_doctor_profile(html, url)
+        return await asyncio.get_running_loop().run_in_executor(executor, parse_doctor_profile, html, url)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,310 @@
+# review_harvest.py
+# Collect every review of a doctor, not just the ones on the profile page,
+# and keep them in a per-doctor store that later runs refresh incrementally.
+#
+#   python review_harvest.py <profile URL> [<profile URL> ...] [--out reviews_store]
+#   python review_harvest.py --from-kb [--limit 100] [--concurrency 3] [--max-pages 50]
+#
+# The profile page shows the newest reviews and a "N Reviews" total. Further
+# reviews are reached through a next link in the reviews section or a "load
+# more" element (its data-url / data-href / href). When that link carries a
+# page number (?page=2) the remaining page URLs follow from the total and the
+# reviews per page, and are fetched concurrently, a window of --concurrency
+# pages at a time; otherwise the links are followed one page ahead. Every page
+# load is paced by the AdaptiveLimiter and retried by with_retries, like the
+# batch crawler.
+#
+# Pages are processed newest first. A refresh stops at the first review that
+# is already in the store, so it only loads the pages that hold new reviews.
+# Each doctor's reviews go to <out>/<doctor key>.jsonl, one review per line
+# with a stable "review_id" (hash of patient name and text; the date is left
+# out because Marham shows it relative, "2 months ago", so it changes as the
+# review ages).
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from batch_modules import add_batch_dir
+
+add_batch_dir()
+from local_index import KB_PATH, read_kb_rows  # noqa: E402
+from adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from fetch_profiles import crop_html, run_config  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from fetch_retry import NETWORK, RATE_LIMITED, SERVER, FetchError, status_category, with_retries  # noqa: E402
+from page_parser import next_page_url, normalise_href, parse_attrs  # noqa: E402
+from pagination import iter_pages  # noqa: E402
+
+STORE_DIR = os.getenv("MARHAM_REVIEW_STORE", "reviews_store")
+REVIEW_CONCURRENCY = 3   # review pages in flight per doctor at most
+MAX_REVIEW_PAGES = 50    # beyond the profile page
+PAGE_PARAM = "page"      # query parameter that numbers review pages
+
+_TOTAL_RE = re.compile(r"<h2[^>]*>\s*([\d,]+)\s+Reviews", re.IGNORECASE)
+_SECTION_RE = re.compile(r'<section[^>]*id="reviews-scroll"[^>]*>(.*?)</section>', re.DOTALL | re.IGNORECASE)
+_LOAD_MORE_RE = re.compile(r"<(?:a|button|div)\b([^>]*\b(?:class|id)=[\"'][^\"']*load[-_]?more[^\"']*[\"'][^>]*)>",
+                           re.IGNORECASE)
+
+
+def review_id(review: Dict) -> str:
+    key = "|".join(" ".join(str(review.get(k, "")).lower().split()) for k in ("patient_name", "review_text"))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def doctor_key(profile_url: str) -> str:
+    # last path segment of the profile URL, e.g. dr-ayesha-khan-22743
+    slug = urlparse(profile_url).path.rstrip("/").rsplit("/", 1)[-1]
+    return re.sub(r"[^a-z0-9-]+", "-", slug.lower()).strip("-") or "doctor"
+
+
+# ---------- store ----------
+class ReviewStore:
+    # one append-only JSONL file per doctor
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.jsonl")
+
+    def load(self, key: str) -> List[Dict]:
+        # one record per review_id, the first stored; IDs are recomputed, so
+        # files written while the ID still hashed the relative date collapse too
+        path = self.path(key)
+        if not os.path.exists(path):
+            return []
+        out: Dict[str, Dict] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    r["review_id"] = review_id(r)
+                    out.setdefault(r["review_id"], r)
+        return list(out.values())
+
+    def known(self, key: str) -> Set[str]:
+        return {r["review_id"] for r in self.load(key)}
+
+    def append(self, key: str, reviews: List[Dict]):
+        if not reviews:
+            return
+        with open(self.path(key), "a", encoding="utf-8") as f:
+            for r in reviews:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+# ---------- page discovery ----------
+def review_total(html: str) -> Optional[int]:
+    m = _TOTAL_RE.search(html)
+    return int(m.group(1).replace(",", "")) if m else None
+
+
+def review_next_url(html: str, current: str) -> Optional[str]:
+    # next link of the reviews section, else the target of a "load more" element
+    m = _SECTION_RE.search(html)
+    url = next_page_url(m.group(1) if m else html, current)
+    if url:
+        return url
+    m = _LOAD_MORE_RE.search(html)
+    if not m:
+        return None
+    attrs = parse_attrs(m.group(1))
+    href = attrs.get("data-url") or attrs.get("data-href") or attrs.get("href")
+    if not href or href.startswith(("#", "javascript:")):
+        return None
+    url = normalise_href(href, current)
+    return url if url and url != current else None
+
+
+def numbered_pages(link: str, total: Optional[int], per_page: int, max_pages: int) -> List[Tuple[int, str]]:
+    # ?page=2 with a known total -> (page number, URL) of pages 2..last; [] when the link has no page number
+    parts = urlparse(link)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    numbers = [v for k, v in query if k == PAGE_PARAM]
+    if not total or per_page <= 0 or len(numbers) != 1 or not numbers[0].isdigit():
+        return []
+    first = int(numbers[0])
+    last = min(math.ceil(total / per_page), first + max_pages - 1)
+    urls = []
+    for n in range(first, last + 1):
+        q = [(k, str(n) if k == PAGE_PARAM else v) for k, v in query]
+        urls.append((n, urlunparse(parts._replace(query=urlencode(q)))))
+    return urls
+
+
+# ---------- harvesting ----------
+class ReviewHarvester:
+    def __init__(self, scraper, store: ReviewStore, concurrency: int = REVIEW_CONCURRENCY,
+                 max_pages: int = MAX_REVIEW_PAGES, log=print):
+        self.scraper = scraper
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.log = log
+        self.limiter = AdaptiveLimiter(max_concurrency=self.concurrency, log=log)
+        self.pages_loaded = 0
+
+    async def _load(self, url: str) -> str:
+        async def attempt():
+            async with self.limiter.slot() as ticket:
+                async with self.scraper.open_crawler() as crawler:
+                    with METRICS.span("navigation", kind="reviews", url=url):
+                        result = await crawler.arun(url=url, config=run_config("reviews"))
+                self.pages_loaded += 1
+                if not result.success:
+                    status = getattr(result, "status_code", None)
+                    err = FetchError(status_category(status) or NETWORK, url, result.error_message or "", status)
+                    if err.category not in (NETWORK, RATE_LIMITED, SERVER):
+                        ticket.ok()  # a 404 says nothing about load
+                    raise err
+                return crop_html(result.html)
+
+        return await with_retries(attempt, url, log=self.log)
+
+    def _take(self, reviews: List[Dict], known: Set[str], seen: Set[str], page_no: int,
+              new: List[Dict]) -> bool:
+        # add this page's unseen reviews to `new`; True once the page reaches
+        # reviews that are already stored (or repeats one from this run)
+        harvested_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        fresh = 0
+        for r in reviews:
+            rid = review_id(r)
+            if rid in known:
+                return True
+            if rid in seen:
+                continue
+            seen.add(rid)
+            fresh += 1
+            new.append(dict(r, review_id=rid, page=page_no, harvested_at=harvested_at))
+        return fresh == 0
+
+    async def harvest(self, profile_url: str) -> Dict:
+        # new reviews of one doctor -> store; returns counts for the report
+        t0 = time.perf_counter()
+        key = doctor_key(profile_url)
+        known = self.store.known(key)
+        loaded_before = self.pages_loaded
+        html = await self.scraper.fetch_profile_page(profile_url, verbose=False)
+        if html is None:
+            raise FetchError(NETWORK, profile_url, "profile page not loaded")
+        total = review_total(html)
+        first = self.scraper.parse_review_list(html)
+        new: List[Dict] = []
+        seen: Set[str] = set()
+        pages = 1
+        done = self._take(first, known, seen, 1, new)
+        link = None if done or (total is not None and total <= len(first)) else review_next_url(html, profile_url)
+
+        if link:
+            numbered = numbered_pages(link, total, len(self.scraper.review_blocks(html)), self.max_pages)
+            if numbered:
+                pages += await self._numbered(numbered, known, seen, new)
+            else:
+                pages += await self._linked(link, known, seen, new)
+
+        self.store.append(key, new)
+        return {"doctor": key, "url": profile_url, "total": total, "stored": len(known) + len(new),
+                "new": len(new), "pages": pages, "page_loads": self.pages_loaded - loaded_before,
+                "seconds": round(time.perf_counter() - t0, 2)}
+
+    async def _numbered(self, urls: List[Tuple[int, str]], known: Set[str], seen: Set[str],
+                        new: List[Dict]) -> int:
+        # a window of pages at a time, processed in page order; the rest of the
+        # window is cancelled once a page reaches stored reviews
+        pages = 0
+        for start in range(0, len(urls), self.concurrency):
+            batch = urls[start:start + self.concurrency]
+            window = [asyncio.ensure_future(self._load(u)) for _n, u in batch]
+            try:
+                for (page_no, _url), task in zip(batch, window):
+                    html = await task
+                    pages += 1
+                    if self._take(self.scraper.parse_review_list(html), known, seen, page_no, new):
+                        return pages
+            finally:
+                for task in window:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        task.exception()
+        return pages
+
+    async def _linked(self, link: str, known: Set[str], seen: Set[str], new: List[Dict]) -> int:
+        # next links one page ahead of the parser
+        async def load(url: str, page_no: int) -> Tuple[List[Dict], Optional[str]]:
+            html = await self._load(url)
+            return self.scraper.parse_review_list(html), review_next_url(html, url)
+
+        pages = 0
+        walk = iter_pages(load, link, max_pages=self.max_pages + 1, first_page=2, prefetch=True)
+        try:
+            async for page_no, _url, reviews in walk:
+                pages += 1
+                if self._take(reviews, known, seen, page_no, new):
+                    break
+        finally:
+            await walk.aclose()
+        return pages
+
+
+def kb_profile_urls(path: str = KB_PATH) -> List[str]:
+    return list(dict.fromkeys(r["profile_url"] for r in read_kb_rows(path) if r.get("profile_url")))
+
+
+async def run(urls: List[str], store: ReviewStore, concurrency: int, max_pages: int) -> List[Dict]:
+    from scrapping_doctors_by_Query import MarhamScraper
+
+    scraper = MarhamScraper()
+    await scraper.start()
+    harvester = ReviewHarvester(scraper, store, concurrency, max_pages)
+    reports = []
+    try:
+        for n, url in enumerate(urls, 1):
+            try:
+                report = await harvester.harvest(url)
+            except FetchError as e:
+                report = {"url": url, "error": str(e)}
+                print(f"❌ [{n}/{len(urls)}] {url}: {e}")
+            else:
+                print(f"💬 [{n}/{len(urls)}] {report['doctor']}: {report['new']} new, {report['stored']} stored"
+                      f" of {report['total'] if report['total'] is not None else '?'}"
+                      f" ({report['pages']} pages, {report['seconds']}s)")
+            reports.append(report)
+    finally:
+        await scraper.close()
+    return reports
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Harvest all reviews of Marham doctors into a per-doctor store")
+    ap.add_argument("urls", nargs="*", help="doctor profile URLs")
+    ap.add_argument("--from-kb", action="store_true", help="harvest every profile in the knowledge base")
+    ap.add_argument("--limit", type=int, default=0, help="at most this many profiles (0 = all)")
+    ap.add_argument("--out", default=STORE_DIR, help="store directory, one JSONL file per doctor")
+    ap.add_argument("--concurrency", type=int, default=REVIEW_CONCURRENCY, help="review pages in flight")
+    ap.add_argument("--max-pages", type=int, default=MAX_REVIEW_PAGES, help="review pages per doctor")
+    args = ap.parse_args()
+
+    urls = list(args.urls) + (kb_profile_urls() if args.from_kb else [])
+    if args.limit:
+        urls = urls[:args.limit]
+    if not urls:
+        ap.error("no profile URLs (pass URLs or --from-kb)")
+    reports = asyncio.run(run(urls, ReviewStore(args.out), args.concurrency, args.max_pages))
+    new = sum(r.get("new", 0) for r in reports)
+    failed = sum(1 for r in reports if "error" in r)
+    print(f"✅ {len(reports)} doctors, {new} new reviews, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,233 @@
 import asyncio
+import importlib
 import json
 import re
-from crawl4ai import AsyncWebCrawler
-from crawl4ai.extraction_strategy import LLMExtractionStrategy
-from pydantic import BaseModel, Field
+import time
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
-from groq import Groq
 import os
-from dotenv import load_dotenv
+
+from batch_modules import add_batch_dir
+
+add_batch_dir()
+from local_index import KB_MIN_RESULTS, KB_PATH, TrigramIndex, get_index  # noqa: E402
+from html_archive import open_archive  # noqa: E402
+from fetch_profiles import crop_html, run_config  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from lookup_cache import CACHE_MAX_ENTRIES, CACHE_SIZES, CACHE_TTL_S, SingleFlight, TTLCache  # noqa: E402
+from page_parser import next_page_url  # noqa: E402
+from pagination import iter_pages  # noqa: E402
+from profile_parser import PARSE_WORKERS, ParsePool, parse_doctor_profile, parse_hospital_timings  # noqa: E402
+from schedule_index import DAY_ALIASES, DAYS, fmt_minutes, parse_when  # noqa: E402
+
+# crawl4ai, groq, pydantic and dotenv are imported on first use: crawl4ai alone
+# takes seconds to import, and none of them is needed to show the query prompt.
+
+
+def _load_env():
+    """Load the nearest .env above this script (or the working directory); python-dotenv is imported only if one exists"""
+    for start in (os.path.dirname(os.path.abspath(__file__)), os.getcwd()):
+        folder = start
+        while True:
+            path = os.path.join(folder, ".env")
+            if os.path.isfile(path):
+                from dotenv import load_dotenv
+                load_dotenv(path)
+                return
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                break
+            folder = parent
+
 
 # Load environment variables from .env file
-load_dotenv()
+_load_env()
 
-# Get your API key
+# Get your API key (checked by the CLI before the prompt, and when the LLM is first used)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_KEY_MISSING = "GROQ_API_KEY not found. Please set it in the .env file."
+
+# Listing pages the CLI walks through for one query (each page holds ~20-30 doctors)
+MAX_LISTING_PAGES = int(os.getenv("MARHAM_MAX_LISTING_PAGES", "3"))
+# Profiles of the top listed doctors loaded in the background while the user picks one
+PREFETCH_PROFILES = int(os.getenv("MARHAM_PREFETCH_PROFILES", "5"))
+PREFETCH_CONCURRENCY = 2
+
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY not found. Please set it in the .env file.")
+def _define_models() -> dict:
+    """Pydantic schemas for LLM extraction, built on first access (pydantic is imported then)"""
+    from pydantic import BaseModel, Field
 
-print("API key loaded successfully!")  # Optional check
+    class DoctorInfo(BaseModel):
+        name: str = Field(description="Doctor's full name")
+        speciality: str = Field(description="Doctor's specialization/specialty")
+        hospital_name: str = Field(description="Hospital or clinic name")
+        location: str = Field(description="Location/address of the hospital")
+        address: str = Field(description="Complete address")
+        experience: Optional[str] = Field(description="Years of experience")
+        fee: Optional[str] = Field(description="Consultation fee")
+        available_times: Optional[List[str]] = Field(description="Available time slots")
+        profile_url: str = Field(description="Doctor's profile URL")
 
+    class ReviewInfo(BaseModel):
+        patient_name: str = Field(description="Name of the patient who gave the review")
+        rating: str = Field(description="Rating given by the patient")
+        review_text: str = Field(description="Review text/comment")
+        date: Optional[str] = Field(description="Date of the review")
 
-class DoctorInfo(BaseModel):
-    name: str = Field(description="Doctor's full name")
-    speciality: str = Field(description="Doctor's specialization/specialty")
-    hospital_name: str = Field(description="Hospital or clinic name")
-    location: str = Field(description="Location/address of the hospital")
-    address: str = Field(description="Complete address")
-    experience: Optional[str] = Field(description="Years of experience")
-    fee: Optional[str] = Field(description="Consultation fee")
-    available_times: Optional[List[str]] = Field(description="Available time slots")
-    profile_url: str = Field(description="Doctor's profile URL")
+    return {"DoctorInfo": DoctorInfo, "ReviewInfo": ReviewInfo}
 
-class ReviewInfo(BaseModel):
-    patient_name: str = Field(description="Name of the patient who gave the review")
-    rating: str = Field(description="Rating given by the patient")
-    review_text: str = Field(description="Review text/comment")
-    date: Optional[str] = Field(description="Date of the review")
+
+def __getattr__(name: str):
+    # DoctorInfo / ReviewInfo stay importable from this module without importing pydantic up front
+    if name in ("DoctorInfo", "ReviewInfo"):
+        globals().update(_define_models())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class MarhamScraper:
-    def __init__(self):
+    def __init__(self, parse_workers: int = PARSE_WORKERS):
         self.base_url = "https://marham.pk"
-        self.groq_client = Groq(api_key=GROQ_API_KEY)
+        self._groq_client = None
+        # raw pages are kept for re-parsing when MARHAM_ARCHIVE_DIR is set
+        self.archive = open_archive()
+        # one browser shared by all fetches between start() and close()
+        self.crawler = None
+        self._starting = None
+        # lookup results shared by every caller of cached()
+        self.caches = {kind: TTLCache(ttl, CACHE_SIZES.get(kind, CACHE_MAX_ENTRIES))
+                       for kind, ttl in CACHE_TTL_S.items()}
+        self.flight = SingleFlight()
+        # profile parsing, in worker processes when parse_workers > 0
+        self.parse_pool = ParsePool(parse_workers)
+    
+    async def cached(self, kind: str, key: str, fetch):
+        """Result of fetch() through the `kind` cache; identical concurrent calls share one fetch"""
+        cache = self.caches[kind]
+        hit = cache.get(key)
+        if hit is not None:
+            METRICS.inc("cache_hits", kind=kind)
+            return hit
+        METRICS.inc("cache_misses", kind=kind)
+        
+        async def fill():
+            value = await fetch()
+            if value:  # failed fetches (None / []) are retried next time
+                cache.put(key, value)
+            return value
+        
+        return await self.flight.do((kind, key), fill)
+    
+    @staticmethod
+    def query_key(query_info: dict) -> str:
+        """Cache key for a parsed query: same specialty/area/city/time, same key"""
+        return json.dumps({k: v for k, v in query_info.items() if k != 'original_query'}, sort_keys=True)
+    
+    @property
+    def groq_client(self):
+        """Groq client, created (and groq imported) on the first LLM call"""
+        if self._groq_client is None:
+            if not GROQ_API_KEY:
+                raise ValueError(GROQ_KEY_MISSING)
+            from groq import Groq
+            self._groq_client = Groq(api_key=GROQ_API_KEY)
+        return self._groq_client
+    
+    async def start(self):
+        """Launch a browser that every fetch reuses until close(); concurrent callers share one launch"""
+        if self.crawler is None:
+            self.parse_pool.start()  # workers spawn while the browser launches
+            if self._starting is None:
+                self._starting = asyncio.ensure_future(self._launch())
+            await asyncio.shield(self._starting)
+        return self
+    
+    async def _launch(self):
+        try:
+            # the import is slow; run it off the event loop
+            crawl4ai = await asyncio.to_thread(importlib.import_module, "crawl4ai")
+            crawler = crawl4ai.AsyncWebCrawler(verbose=False)
+            await crawler.start()
+            self.crawler = crawler
+        finally:
+            self._starting = None
+    
+    def prewarm(self) -> asyncio.Task:
+        """Start the shared browser in the background, e.g. while a prompt is shown"""
+        task = asyncio.ensure_future(self.start())
+        # a failed warm-up is retried by the next start()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+    
+    async def close(self):
+        """Shut down the shared browser and parse workers, if they were started"""
+        self.parse_pool.close()
+        if self._starting is not None:
+            # a launch still in progress is let finish, then closed
+            try:
+                await asyncio.shield(self._starting)
+            except Exception:
+                pass
+        crawler, self.crawler = self.crawler, None
+        if crawler is not None:
+            await crawler.close()
+    
+    @asynccontextmanager
+    async def open_crawler(self, verbose: bool = False):
+        """The shared crawler when started, otherwise a browser for this one fetch"""
+        if self.crawler is not None:
+            yield self.crawler
+        else:
+            from crawl4ai import AsyncWebCrawler
+            async with AsyncWebCrawler(verbose=verbose) as crawler:
+                yield crawler
+    
+    def _archive_page(self, url: str, html: str, kind: str):
+        """Store fetched HTML in the raw page archive (no-op when archiving is off)"""
+        if self.archive is None or not html:
+            return
+        try:
+            self.archive.put(url, html, kind, source="realtime")
+        except Exception as e:
+            print(f"   ⚠️ Could not archive {url}: {e}")
     
     def extract_query_info(self, query: str) -> dict:
         """Extract specialty, area, and city from user query"""
         query_lower = query.lower().strip()
         
-        # Extract city (common Pakistani cities)
+        # Extract city (common Pakistani cities, plus every city in the knowledge base)
         cities = ['karachi', 'lahore', 'islamabad', 'rawalpindi', 'faisalabad', 'multan', 
                   'peshawar', 'quetta', 'sialkot', 'gujranwala', 'hyderabad', 'bahawalpur']
+        index = get_index(KB_PATH)
+        known_cities = set(cities)
+        if index:
+            known_cities |= {c.lower() for c in index.fuzzy['city'].items}
         
         city = None
-        for c in cities:
-            if c in query_lower:
-                city = c
+        city_text = None
+        # longest names first, so "dera ghazi khan" wins over any shorter match
+        for c in sorted(known_cities, key=len, reverse=True):
+            if re.search(rf'\b{re.escape(c)}\b', query_lower):
+                city = city_text = c
                 break
         
+        if not city:
+            # misspelled city ("lahor", "islamabd"): fuzzy match the trailing words
+            city_index = TrigramIndex(sorted(known_cities))
+            words = query_lower.split()
+            for n in (2, 1):
+                if len(words) > n:
+                    tail = ' '.join(words[-n:])
+                    hit = city_index.best(tail, min_score=0.6)
+                    if hit:
+                        city, city_text = hit.lower(), tail
+                        break
+        
         # Extract area (text between 'in' and city name)
         area = None
         if city:
-            area_pattern = rf'\bin\s+([a-z0-9\s-]+?)\s+{city}'
+            area_pattern = rf'\bin\s+([a-z0-9\s-]+?)\s+{re.escape(city_text)}'
             area_match = re.search(area_pattern, query_lower)
             if area_match:
                 area = area_match.group(1).strip()
@@ -76,30 +242,65 @@ class MarhamScraper:
             if words:
                 specialty = words[0]
         
+        # Correct misspelled specialties ("dermatolgist") against known ones
+        if specialty and index and specialty not in index.by_specialty:
+            hit = index.fuzzy['specialty'].best(specialty, min_score=0.6)
+            if hit:
+                print(f"   ✏️ Specialty '{specialty}' corrected to '{hit.lower()}'")
+                specialty = hit.lower()
+        
+        # Optional time window ("saturday evening", "mon 6 pm")
+        when = None
+        parsed_when = parse_when(query_lower)
+        if parsed_when:
+            day, start, end = parsed_when
+            when = {"day": day, "start": start, "end": end}
+            # the day/time words are not part of the area
+            if area:
+                day_words = '|'.join(sorted(DAY_ALIASES, key=len, reverse=True))
+                area = re.split(rf'\b(?:on|at|{day_words})\b', area)[0].strip() or None
+        
         print(f"🎯 Extracted from query: '{query}'")
         print(f"   Specialty: {specialty}")
         print(f"   Area: {area if area else 'Not specified'}")
         print(f"   City: {city}")
+        if when:
+            print(f"   When: {DAYS[when['day']]} {fmt_minutes(when['start'])} - {fmt_minutes(when['end'])}")
         
         return {
             "specialty": specialty,
             "area": area,
             "city": city,
+            "when": when,
             "original_query": query
         }
     
+    def search_local(self, query_info: dict) -> dict:
+        """Resolve a parsed query against the local knowledge base (no network)"""
+        index = get_index(KB_PATH)
+        if index is None:
+            return {"fresh": [], "stale": []}
+        result = index.resolve(query_info)
+        print(f"\n📚 Knowledge base: {len(result['fresh'])} fresh, {len(result['stale'])} stale matches")
+        return result
+    
+    def merge_doctor_cards(self, live: List[dict], local: List[dict]) -> List[dict]:
+        """Append local doctors missing from the live listing and renumber"""
+        seen = {d.get('profile_url') for d in live if d.get('profile_url')}
+        # copies, so the cached index entries are never renumbered
+        merged = [dict(d) for d in live] + [dict(d) for d in local if d.get('profile_url') not in seen]
+        for i, d in enumerate(merged, 1):
+            d['id'] = i
+            d.setdefault('display_name', d.get('name', ''))
+        return merged
+    
     async def validate_url(self, url: str, specialty: str, area: str, city: str) -> bool:
         """Validate if the URL contains relevant doctor data matching the query"""
         print(f"\n🔍 Validating URL: {url}")
         
         try:
-            async with AsyncWebCrawler(verbose=False) as crawler:
-                result = await crawler.arun(
-                    url=url,
-                    word_count_threshold=10,
-                    bypass_cache=True,
-                    page_timeout=15000
-                )
+            async with self.open_crawler(verbose=False) as crawler:
+                result = await crawler.arun(url=url, config=run_config("validate"))
                 
                 if not result.success:
                     print(f"   ❌ Failed to fetch URL (HTTP error)")
@@ -196,9 +397,10 @@ class MarhamScraper:
             return allowed
 
         async def fetch(url: str, headers: dict) -> str:
-            async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
-                resp = await client.get(url, headers=headers)
-                return resp.text
+            with METRICS.span("navigation", kind="search_engine", url=url):
+                async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
+                    resp = await client.get(url, headers=headers)
+                    return resp.text
 
         print(f"\n🌐 Searching the web for: {query}")
         headers = {
@@ -281,10 +483,14 @@ class MarhamScraper:
         
         return score
     
-    async def search_doctors_by_query(self, query_info: dict) -> list:
-        """Use search engine to find relevant Marham URLs"""
+    async def search_doctors_by_query(self, query_info: dict, timings: Optional[dict] = None) -> list:
+        """Use search engine to find relevant Marham URLs (stage seconds go to `timings`)"""
+        timings = {} if timings is None else timings
         query = query_info.get('original_query', '')
-        marham_links = await self.search_marham_links_via_search_engine(query)
+        t0 = time.perf_counter()
+        with METRICS.span("search"):
+            marham_links = await self.search_marham_links_via_search_engine(query)
+        timings['search'] = time.perf_counter() - t0
         if not marham_links:
             print("❌ No Marham links found via search engine.")
             return []
@@ -293,10 +499,13 @@ class MarhamScraper:
         area = query_info.get('area', '')
         city = query_info.get('city', '')
         valid_links = []
+        t0 = time.perf_counter()
         for url in marham_links:
-            is_valid = await self.validate_url(url, specialty, area, city)
+            with METRICS.span("validate", url=url):
+                is_valid = await self.validate_url(url, specialty, area, city)
             if is_valid:
                 valid_links.append(url)
+        timings['validate'] = time.perf_counter() - t0
         
         if not valid_links:
             print("❌ No valid Marham links found after validation.")
@@ -316,423 +525,226 @@ class MarhamScraper:
         
         return sorted_urls
     
-    async def search_doctors(self, search_url: str) -> List[dict]:
-        """Search for doctors on marham.pk using the provided URL"""
-        print(f"\n📡 Fetching doctors from: {search_url}")
+    async def _fetch_listing(self, url: str) -> Optional[str]:
+        """Load one listing page and return its HTML (None on failure)"""
+        async with self.open_crawler(verbose=False) as crawler:
+            with METRICS.span("navigation", kind="listing", url=url):
+                result = await crawler.arun(url=url, config=run_config("listing"))
         
-        async with AsyncWebCrawler(verbose=False) as crawler:
-            result = await crawler.arun(
-                url=search_url,
-                word_count_threshold=10,
-                bypass_cache=True,
-                wait_for="css:a[href*='/doctors/'], css:.doctor-card, css:.list-data",
-                page_timeout=30000,
-                delay_before_return_html=3.0
-            )
-            
-            if result.success:
-                print(f"   ✅ Page loaded successfully")
-                print(f"   HTML size: {len(result.html)} chars")
-                doctor_urls = self._extract_doctor_urls(result.markdown, result.html)
-                return doctor_urls
-            else:
-                print(f"❌ Failed to fetch search results: {result.error_message}")
-                return []
+        if not result.success:
+            print(f"❌ Failed to fetch search results: {result.error_message}")
+            return None
+        print(f"   ✅ Page loaded successfully")
+        self._archive_page(url, result.html, "listing")
+        html = crop_html(result.html)
+        print(f"   HTML size: {len(result.html)} chars ({len(html)} after crop)")
+        return html
     
-    def _extract_doctor_urls(self, markdown_content: str, html_content: str) -> List[dict]:
-        """Extract doctor card information from search results"""
-        doctors = []
+    async def search_doctors(self, search_url: str, max_pages: Optional[int] = 1) -> List[dict]:
+        """Search for doctors on marham.pk using the provided URL (first max_pages listing pages)"""
+        doctors = [doctor async for doctor in self.stream_doctors(search_url, max_pages=max_pages)]
+        print(f"   ✅ Extracted {len(doctors)} doctors with full details")
+        return doctors
+    
+    async def stream_doctors(self, search_url: str, max_pages: Optional[int] = MAX_LISTING_PAGES,
+                             prefetch: bool = True):
+        """Yield doctor cards one by one as they are parsed, following the listing's next pages"""
         
-        print(f"\n🔎 Extracting doctor cards from page...")
+        async def load(url: str, page_no: int):
+            print(f"\n📡 Fetching doctors from: {url} (page {page_no})")
+            html = await self._fetch_listing(url)
+            if not html:
+                return None, None
+            METRICS.inc("pages", kind="listing")
+            return html, next_page_url(html, url, self.base_url)
         
+        # the next page loads in the background while this one's cards are consumed
+        pages = iter_pages(load, search_url, max_pages, prefetch=prefetch)
+        next_id = 1
+        try:
+            async for page_no, url, html in pages:
+                page_count = 0
+                for doctor in self._iter_doctor_cards(html, first_id=next_id):
+                    page_count += 1
+                    METRICS.inc("cards")
+                    yield doctor
+                if not page_count:
+                    return
+                next_id += page_count
+        finally:
+            await pages.aclose()
+    
+    def _iter_doctor_cards(self, html_content: str, first_id: int = 1):
+        """Parse doctor cards lazily, one per next()"""
         card_pattern = r'<div class="row shadow-card">(.*?)</div>\s*</div>\s*</div>'
-        cards = re.findall(card_pattern, html_content, re.DOTALL)
-        
-        print(f"   Found {len(cards)} doctor cards")
-        
-        for i, card_html in enumerate(cards[:20], 1):
+        doctor_id = first_id
+        for i, match in enumerate(re.finditer(card_pattern, html_content, re.DOTALL), 1):
             try:
-                doctor_info = {
-                    "id": i,
-                    "name": "",
-                    "speciality": "",
-                    "qualifications": "",
-                    "pmdc_verified": False,
-                    "reviews": "",
-                    "experience": "",
-                    "satisfaction": "",
-                    "profile_url": "",
-                    "hospitals": [],
-                    "areas_of_interest": []
-                }
-                
-                name_pattern = r'<a href="(https://www\.marham\.pk/doctors/[^"]+)"[^>]*class="text-blue dr_profile_opened_from_listing"[^>]*>.*?<h3[^>]*>(.*?)</h3>'
-                name_match = re.search(name_pattern, card_html, re.DOTALL)
-                if name_match:
-                    doctor_info['profile_url'] = name_match.group(1).strip()
-                    doctor_info['name'] = re.sub(r'<[^>]+>', '', name_match.group(2)).strip()
-                
-                if 'PMDC Verified' in card_html:
-                    doctor_info['pmdc_verified'] = True
-                
-                speciality_pattern = r'<p class="mb-0 mt-10 text-sm">([^<]+)</p>'
-                speciality_match = re.search(speciality_pattern, card_html)
-                if speciality_match:
-                    doctor_info['speciality'] = speciality_match.group(1).strip()
-                
-                qual_pattern = r'<p class="text-sm">([^<]+)</p>'
-                qual_match = re.search(qual_pattern, card_html)
-                if qual_match:
-                    doctor_info['qualifications'] = qual_match.group(1).strip()
-                
-                reviews_pattern = r'<p class="text-bold text-sm text-golden">\s*<i[^>]*></i>\s*(\d+)\s*</p>'
-                reviews_match = re.search(reviews_pattern, card_html)
-                if reviews_match:
-                    doctor_info['reviews'] = reviews_match.group(1).strip()
-                
-                exp_pattern = r'<p class="mb-0 text-sm">Experience</p>\s*<p class="text-bold text-sm">([^<]+)</p>'
-                exp_match = re.search(exp_pattern, card_html, re.DOTALL)
-                if exp_match:
-                    doctor_info['experience'] = exp_match.group(1).strip()
-                
-                sat_pattern = r'<p class="mb-0 text-sm">Satisfaction</p>\s*<p class="text-bold text-sm">([^<]+)</p>'
-                sat_match = re.search(sat_pattern, card_html, re.DOTALL)
-                if sat_match:
-                    doctor_info['satisfaction'] = sat_match.group(1).strip()
-                
-                interest_pattern = r'<span class="chips-highlight[^"]*"[^>]*>([^<]+)</span>'
-                interests = re.findall(interest_pattern, card_html)
-                doctor_info['areas_of_interest'] = [interest.strip() for interest in interests]
-                
-                hospital_pattern = r'data-hospitalname="([^"]+)"[^>]*data-hospitalcity="([^"]+)"[^>]*data-hospitaladdress="([^"]+)"[^>]*data-amount="([^"]+)"'
-                hospitals = re.findall(hospital_pattern, card_html)
-                for hosp in hospitals:
-                    hospital_name, city, address, fee = hosp
-                    if hospital_name != "Video Consultation":
-                        doctor_info['hospitals'].append({
-                            "name": hospital_name,
-                            "city": city,
-                            "address": address,
-                            "fee": f"Rs. {fee}"
-                        })
-                
-                doctor_info['display_name'] = doctor_info['name']
-                
-                doctors.append(doctor_info)
-                
+                doctor = self._parse_doctor_card(match.group(1), doctor_id)
             except Exception as e:
                 print(f"   ⚠️ Error parsing card {i}: {e}")
                 continue
-        
+            doctor_id += 1
+            yield doctor
+    
+    def _extract_doctor_urls(self, markdown_content: str, html_content: str) -> List[dict]:
+        """Extract doctor card information from one listing page"""
+        print(f"\n🔎 Extracting doctor cards from page...")
+        doctors = list(self._iter_doctor_cards(html_content))
         print(f"   ✅ Extracted {len(doctors)} doctors with full details")
-        
         return doctors
     
-    async def get_doctor_details(self, profile_url: str) -> dict:
-        """Get detailed information about a specific doctor including hospital addresses and timings"""
-        print(f"\nFetching doctor details from: {profile_url}")
-        
-        async with AsyncWebCrawler(verbose=True) as crawler:
-            result = await crawler.arun(
-                url=profile_url,
-                word_count_threshold=10,
-                bypass_cache=True,
-                page_timeout=30000,
-                delay_before_return_html=2.0
-            )
-            
-            if result.success:
-                doctor_data = self._parse_doctor_profile(result.markdown, result.html, profile_url)
-                return doctor_data
-            else:
-                print(f"Failed to fetch doctor profile: {result.error_message}")
-                return None
-    
-    def _parse_hospital_timings(self, html_section: str) -> List[dict]:
-        """Extract weekly schedule from hospital timing tables"""
-        timings = []
-        
-        # Find all table rows with timing information
-        # Pattern: <tr class="text-sm"><td class="text-bold text-blue">Mon</td><td>10:00 AM - 02:00 PM</td></tr>
-        day_patterns = r'<tr[^>]*class="text-sm"[^>]*>\s*<td[^>]*class="text-bold text-blue"[^>]*>([^<]+)</td>\s*<td[^>]*>([^<]+)</td>\s*</tr>'
-        day_matches = re.findall(day_patterns, html_section, re.IGNORECASE | re.DOTALL)
-        
-        for day, time_slot in day_matches:
-            timings.append({
-                "day": day.strip(),
-                "time": time_slot.strip()
-            })
-        
-        return timings
-    
-    def _parse_doctor_profile(self, markdown: str, html: str, url: str) -> dict:
-        """Parse doctor profile with ENHANCED hospital and timing extraction"""
+    def _parse_doctor_card(self, card_html: str, doctor_id: int) -> dict:
+        """Parse one listing card into a doctor dict"""
         doctor_info = {
-            "profile_url": url,
+            "id": doctor_id,
             "name": "",
             "speciality": "",
             "qualifications": "",
             "pmdc_verified": False,
-            "reviews_count": "",
+            "reviews": "",
             "experience": "",
             "satisfaction": "",
-            "wait_time": "",
-            "avg_time_to_patient": "",
-            "patient_satisfaction_rating": "",
+            "profile_url": "",
             "hospitals": [],
-            "areas_of_interest": [],
-            "phone": "",
-            "video_consultation_fee": "",
-            "video_consultation_timings": [],
-            "languages": [],
-            "services": [],
-            "professional_statement": ""
+            "areas_of_interest": []
         }
         
-        # Extract basic fields (name, speciality, qualifications, etc.) - same as before
-        name_patterns = [
-            r'<h1[^>]*class="mb-0"[^>]*>(?:Dr\.\s*|Prof\.\s*|Asst\.\s*Prof\.\s*)?([^<]+)</h1>',
-            r'<h1[^>]*>(?:Dr\.\s*|Prof\.\s*)?([^<]+)</h1>',
-        ]
-        for pattern in name_patterns:
-            name_match = re.search(pattern, html)
-            if name_match:
-                doctor_info['name'] = name_match.group(1).strip()
-                break
+        name_pattern = r'<a href="(https?://[^"]+)"[^>]*class="text-blue dr_profile_opened_from_listing"[^>]*>.*?<h3[^>]*>(.*?)</h3>'
+        name_match = re.search(name_pattern, card_html, re.DOTALL)
+        if name_match:
+            doctor_info['profile_url'] = name_match.group(1).strip()
+            doctor_info['name'] = re.sub(r'<[^>]+>', '', name_match.group(2)).strip()
         
-        if re.search(r'PMDC\s+Verified', html, re.IGNORECASE):
+        if 'PMDC Verified' in card_html:
             doctor_info['pmdc_verified'] = True
         
-        spec_patterns = [
-            r'<strong[^>]*class="text-sm"[^>]*>([^<]+(?:ologist|logist|Specialist|Surgeon|Physician))</strong>',
-            r'<p[^>]*class="mt-10"[^>]*><strong[^>]*>([^<]+)</strong>',
-        ]
-        for pattern in spec_patterns:
-            spec_match = re.search(pattern, html[:50000], re.IGNORECASE)
-            if spec_match:
-                doctor_info['speciality'] = spec_match.group(1).strip()
-                break
+        speciality_pattern = r'<p class="mb-0 mt-10 text-sm">([^<]+)</p>'
+        speciality_match = re.search(speciality_pattern, card_html)
+        if speciality_match:
+            doctor_info['speciality'] = speciality_match.group(1).strip()
         
-        qual_patterns = [
-            r'<p[^>]*class="text-sm mb-0"[^>]*>([^<]*(?:MBBS|FCPS|MCPS|MD|MS|FRCS|MRCP)[^<]*)</p>',
-            r'<p[^>]*class="text-sm"[^>]*>([^<]*(?:MBBS|FCPS|MCPS|MD|MS)[^<]*)</p>',
-        ]
-        for pattern in qual_patterns:
-            qual_match = re.search(pattern, html[:50000])
-            if qual_match:
-                qual_text = qual_match.group(1).strip()
-                if any(deg in qual_text.upper() for deg in ['MBBS', 'FCPS', 'MD', 'MS', 'MCPS']):
-                    doctor_info['qualifications'] = re.sub(r'&amp;', '&', qual_text)
-                    break
+        qual_pattern = r'<p class="text-sm">([^<]+)</p>'
+        qual_match = re.search(qual_pattern, card_html)
+        if qual_match:
+            doctor_info['qualifications'] = qual_match.group(1).strip()
         
-        reviews_patterns = [
-            r'<i[^>]*fa-thumbs-up[^>]*></i>\s*(\d+)',
-            r'<h2[^>]*>\s*(\d+)\s+Reviews',
-        ]
-        for pattern in reviews_patterns:
-            reviews_match = re.search(pattern, html, re.IGNORECASE)
-            if reviews_match:
-                doctor_info['reviews_count'] = reviews_match.group(1).strip()
-                break
+        reviews_pattern = r'<p class="text-bold text-sm text-golden">\s*<i[^>]*></i>\s*(\d+)\s*</p>'
+        reviews_match = re.search(reviews_pattern, card_html)
+        if reviews_match:
+            doctor_info['reviews'] = reviews_match.group(1).strip()
         
-        exp_patterns = [
-            r'<p class="mb-0 text-sm">(?:\d+\s*Yrs?\s+)?Experience</p>\s*<p class="text-bold text-sm">(\d+\s*Yrs?)</p>',
-            r'(\d+\s*Yrs?)\s+Experience',
-        ]
-        for pattern in exp_patterns:
-            exp_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
-            if exp_match:
-                doctor_info['experience'] = exp_match.group(1).strip()
-                break
+        exp_pattern = r'<p class="mb-0 text-sm">Experience</p>\s*<p class="text-bold text-sm">([^<]+)</p>'
+        exp_match = re.search(exp_pattern, card_html, re.DOTALL)
+        if exp_match:
+            doctor_info['experience'] = exp_match.group(1).strip()
         
-        wait_patterns = [
-            r'<p[^>]*class="mb-0 text-sm"[^>]*>Wait Time</p>\s*<p[^>]*class="text-bold"[^>]*>([^<]+)</p>',
-        ]
-        for pattern in wait_patterns:
-            wait_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
-            if wait_match:
-                doctor_info['wait_time'] = wait_match.group(1).strip()
-                break
+        sat_pattern = r'<p class="mb-0 text-sm">Satisfaction</p>\s*<p class="text-bold text-sm">([^<]+)</p>'
+        sat_match = re.search(sat_pattern, card_html, re.DOTALL)
+        if sat_match:
+            doctor_info['satisfaction'] = sat_match.group(1).strip()
         
-        avg_time_patterns = [
-            r'<p[^>]*class="mb-0 text-sm"[^>]*>Avg\.\s+Time\s+to\s+Patient</p>\s*<p[^>]*class="text-bold"[^>]*>([^<]+)</p>',
-        ]
-        for pattern in avg_time_patterns:
-            avg_match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
-            if avg_match:
-                doctor_info['avg_time_to_patient'] = avg_match.group(1).strip()
-                break
-        
-        rating_pattern = r'<div[^>]*class="col-2[^"]*text-right[^"]*"[^>]*>(\d+\.?\d*/5)</div>'
-        rating_match = re.search(rating_pattern, html, re.IGNORECASE)
-        if rating_match:
-            doctor_info['patient_satisfaction_rating'] = rating_match.group(1).strip()
-        
-        # ==================== ENHANCED HOSPITAL & ADDRESS EXTRACTION ====================
+        interest_pattern = r'<span class="chips-highlight[^"]*"[^>]*>([^<]+)</span>'
+        interests = re.findall(interest_pattern, card_html)
+        doctor_info['areas_of_interest'] = [interest.strip() for interest in interests]
         
-        # Method 1: Extract from data-hospital attributes (works for buttons/links)
         hospital_pattern = r'data-hospitalname="([^"]+)"[^>]*data-hospitalcity="([^"]+)"[^>]*data-hospitaladdress="([^"]+)"[^>]*data-amount="([^"]+)"'
-        hospitals_data = re.findall(hospital_pattern, html)
-        seen_hospitals = {}
-        
-        for hosp in hospitals_data:
+        hospitals = re.findall(hospital_pattern, card_html)
+        for hosp in hospitals:
             hospital_name, city, address, fee = hosp
-            if hospital_name == "Video Consultation":
-                fee_clean = re.sub(r'[,\s]+', '', fee).strip()
-                if not doctor_info['video_consultation_fee']:
-                    doctor_info['video_consultation_fee'] = f"Rs. {fee_clean}" if fee_clean else ""
-            else:
-                fee_clean = re.sub(r'[,\s]+', '', fee).strip()
-                hosp_key = hospital_name.lower().strip()
-                if hosp_key not in seen_hospitals:
-                    seen_hospitals[hosp_key] = {
-                        "name": hospital_name,
-                        "city": city,
-                        "address": address,
-                        "fee": f"Rs. {fee_clean}" if fee_clean else "",
-                        "timings": []
-                    }
-        
-        # Method 2: Extract from Practice Address sections with <h3 class="text-bold text-underline">
-        # This method extracts hospital name, area/city, fee, AND TIMINGS
-        
-        # Find all hospital sections (each starts with <h3 class="text-bold text-underline">Hospital Name</h3>)
-        hospital_sections = re.split(r'<h3[^>]*class="text-bold text-underline"[^>]*>', html)
-        
-        for section in hospital_sections[1:]:  # Skip first split (before first h3)
-            # Extract hospital name (first content before </h3>)
-            name_match = re.search(r'^([^<]+)</h3>', section)
-            if not name_match:
-                continue
-            
-            hospital_name = name_match.group(1).strip()
-            
-            # Skip if it's "Video Consultation"
-            if "video" in hospital_name.lower() or "online" in hospital_name.lower():
-                # Extract video consultation fee and timings
-                fee_match = re.search(r'<p[^>]*>Rs\.\s*([0-9,]+)', section)
-                if fee_match and not doctor_info['video_consultation_fee']:
-                    fee_clean = re.sub(r'[,\s]+', '', fee_match.group(1))
-                    doctor_info['video_consultation_fee'] = f"Rs. {fee_clean}"
-                
-                # Extract video consultation timings
-                doctor_info['video_consultation_timings'] = self._parse_hospital_timings(section)
-                continue
-            
-            # Extract area/city from "Area: Location, City" pattern
-            area_city = ""
-            area_match = re.search(r'<p[^>]*>Area:\s*([^<]+)</p>', section, re.IGNORECASE)
-            if area_match:
-                area_city = area_match.group(1).strip()
-            
-            # Extract fee
-            fee_match = re.search(r'<p[^>]*>Rs\.\s*([0-9,]+)', section)
-            fee = ""
-            if fee_match:
-                fee_value = re.sub(r'[,\s]+', '', fee_match.group(1))
-                fee = "Rs. " + fee_value
-            
-            # Extract timings from table
-            timings = self._parse_hospital_timings(section)
-            
-            # Parse area and city from "Area, City" format
-            area = ""
-            city = ""
-            if area_city:
-                area_parts = area_city.split(',')
-                area = area_parts[0].strip() if area_parts else area_city
-                city = area_parts[1].strip() if len(area_parts) > 1 else ""
-            
-            # Add or update hospital info
-            hosp_key = hospital_name.lower().strip()
-            if hosp_key in seen_hospitals:
-                # Update existing entry with additional info
-                if area and not seen_hospitals[hosp_key].get('area'):
-                    seen_hospitals[hosp_key]['area'] = area
-                if city and not seen_hospitals[hosp_key].get('city'):
-                    seen_hospitals[hosp_key]['city'] = city
-                if timings:
-                    seen_hospitals[hosp_key]['timings'] = timings
-            else:
-                # Create new entry
-                seen_hospitals[hosp_key] = {
+            if hospital_name != "Video Consultation":
+                doctor_info['hospitals'].append({
                     "name": hospital_name,
-                    "area": area,
                     "city": city,
-                    "address": area_city if area_city else "",
-                    "fee": fee,
-                    "timings": timings
-                }
-        
-        # Convert dict to list
-        doctor_info['hospitals'] = list(seen_hospitals.values())
-        
-        # ==================== END HOSPITAL EXTRACTION ====================
+                    "address": address,
+                    "fee": f"Rs. {fee}"
+                })
         
-        # Extract phone number
-        phone_patterns = [
-            r'href="tel:(\d{11})"',
-            r'(0?3\d{2}[- ]?\d{7})',
-        ]
-        for pattern in phone_patterns:
-            phone_match = re.search(pattern, html, re.IGNORECASE)
-            if phone_match:
-                phone = phone_match.group(1).strip()
-                phone = re.sub(r'[^\d]', '', phone)
-                if len(phone) >= 10 and not doctor_info['phone']:
-                    doctor_info['phone'] = phone
-                    break
+        doctor_info['display_name'] = doctor_info['name']
+        return doctor_info
+    
+    async def fetch_profile_page(self, profile_url: str, verbose: bool = True) -> Optional[str]:
+        """Profile HTML, loaded once and shared by the profile and review parsers"""
+        async def fetch():
+            async with self.open_crawler(verbose=verbose) as crawler:
+                with METRICS.span("navigation", kind="profile", url=profile_url):
+                    result = await crawler.arun(url=profile_url, config=run_config("profile"))
+            if not result.success:
+                if verbose:
+                    print(f"Failed to fetch doctor profile: {result.error_message}")
+                return None
+            self._archive_page(profile_url, result.html, "profile")
+            # the cache keeps the crop, not the full page
+            return crop_html(result.html)
         
-        # Extract services
-        services_section = re.search(r'<h2[^>]*>Services</h2>(.*?)</section>', html, re.DOTALL | re.IGNORECASE)
-        if services_section:
-            service_links = re.findall(r'<a[^>]*>([^<]+)</a>', services_section.group(1))
-            doctor_info['services'] = [s.strip() for s in service_links if len(s.strip()) > 3 and not s.strip().lower().startswith('http')]
+        return await self.cached("page", profile_url, fetch)
+    
+    async def get_doctor_details(self, profile_url: str, verbose: bool = True) -> dict:
+        """Get detailed information about a specific doctor including hospital addresses and timings"""
+        if verbose:
+            print(f"\nFetching doctor details from: {profile_url}")
         
-        # Extract professional statement
-        statement_pattern = r'<h2[^>]*>Professional Statement[^<]*</h2>\s*<div[^>]*>\s*<p[^>]*>(.*?)</p>'
-        statement_match = re.search(statement_pattern, html, re.DOTALL | re.IGNORECASE)
-        if statement_match:
-            statement_text = statement_match.group(1)
-            statement_text = re.sub(r'<[^>]+>', ' ', statement_text)
-            statement_text = re.sub(r'\s+', ' ', statement_text).strip()
-            if len(statement_text) > 50:
-                doctor_info['professional_statement'] = statement_text[:500]
+        with METRICS.span("profile", url=profile_url):
+            html = await self.fetch_profile_page(profile_url, verbose)
+            if html is None:
+                return None
+            with METRICS.span("parse", kind="profile"):
+                return await self.parse_pool.parse(html, profile_url)
+    
+    def prefetch_profiles(self, profile_urls: List[str], concurrency: int = PREFETCH_CONCURRENCY) -> dict:
+        """Start loading and parsing these profiles in the background; returns url -> task"""
+        semaphore = asyncio.Semaphore(concurrency)
         
-        # Extract areas of interest
-        interest_pattern = r'<span class="chips-highlight[^"]*"[^>]*>([^<]+)</span>'
-        interests = re.findall(interest_pattern, html)
-        doctor_info['areas_of_interest'] = [interest.strip() for interest in interests if len(interest.strip()) > 2]
+        async def prefetch(url: str):
+            async with semaphore:
+                # lands in the profile cache; the review view reuses the cached page
+                await self.cached("profile", url, lambda: self.get_doctor_details(url, verbose=False))
         
-        return doctor_info
+        return {url: asyncio.ensure_future(prefetch(url)) for url in dict.fromkeys(profile_urls) if url}
+    
+    def cancel_prefetch(self, tasks: dict, keep: Optional[str] = None) -> int:
+        """Cancel the prefetches of every profile except `keep`; returns how many were still running"""
+        cancelled = 0
+        for url, task in tasks.items():
+            if url == keep or task.done():
+                continue
+            task.cancel()
+            # the fetches themselves are shared (single-flight), stop them too
+            self.flight.cancel(("profile", url))
+            self.flight.cancel(("page", url))
+            cancelled += 1
+        return cancelled
+    
+    def _parse_hospital_timings(self, html_section: str) -> List[dict]:
+        """Extract weekly schedule from hospital timing tables"""
+        return parse_hospital_timings(html_section)
+    
+    def _parse_doctor_profile(self, markdown: str, html: str, url: str) -> dict:
+        """Parse doctor profile with ENHANCED hospital and timing extraction (see profile_parser.py)"""
+        return parse_doctor_profile(html, url)
     
     async def get_reviews(self, profile_url: str, num_reviews: int = 5) -> dict:
         """Get reviews summary for a doctor"""
         print(f"\n💬 Fetching reviews from: {profile_url}")
         
-        async with AsyncWebCrawler(verbose=True) as crawler:
-            result = await crawler.arun(
-                url=profile_url,
-                word_count_threshold=10,
-                bypass_cache=True
-            )
-            
-            if result.success:
-                reviews = self._parse_reviews(result.markdown, result.html, num_reviews)
-                llm_summary = self._generate_llm_review_summary(reviews)
-                
-                summary = {
-                    "doctor_url": profile_url,
-                    "total_reviews_shown": len(reviews),
-                    "reviews": reviews,
-                    "llm_summary": llm_summary,
-                    "basic_summary": self._create_basic_summary(reviews)
-                }
-                
-                return summary
-            else:
-                print(f"❌ Failed to fetch reviews: {result.error_message}")
-                return None
+        html = await self.fetch_profile_page(profile_url)
+        if html is None:
+            print(f"❌ Failed to fetch reviews from {profile_url}")
+            return None
+        
+        reviews = self._parse_reviews("", html, num_reviews)
+        # the Groq client is blocking; keep other fetches running meanwhile
+        llm_summary = await asyncio.to_thread(self._generate_llm_review_summary, reviews)
+        
+        summary = {
+            "doctor_url": profile_url,
+            "total_reviews_shown": len(reviews),
+            "reviews": reviews,
+            "llm_summary": llm_summary,
+            "basic_summary": self._create_basic_summary(reviews)
+        }
+        
+        return summary
     
     def _generate_llm_review_summary(self, reviews: List[dict]) -> str:
         """Use Groq LLM to generate intelligent summary of reviews"""
@@ -760,18 +772,19 @@ Provide a balanced, professional summary:"""
         try:
             print("🤖 Generating LLM-based review summary...")
             
-            completion = self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a helpful medical review analyst who provides concise, balanced summaries of patient reviews."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300,
-                top_p=1,
-                stream=False,
-                stop=None
-            )
+            with METRICS.span("llm"):
+                completion = self.groq_client.chat.completions.create(
+                    model="llama-3.1-8b-instant",
+                    messages=[
+                        {"role": "system", "content": "You are a helpful medical review analyst who provides concise, balanced summaries of patient reviews."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=300,
+                    top_p=1,
+                    stream=False,
+                    stop=None
+                )
             
             summary = completion.choices[0].message.content.strip()
             print("✅ LLM summary generated successfully")
@@ -800,10 +813,8 @@ Provide a balanced, professional summary:"""
         
         return f"Showing {total} reviews"
     
-    def _parse_reviews(self, markdown: str, html: str, num_reviews: int) -> List[dict]:
-        """Parse reviews from the page content"""
-        reviews = []
-        
+    def review_blocks(self, html: str) -> List[str]:
+        """Split the reviews section (or a bare "load more" fragment) into one block per review"""
         reviews_section_match = None
         reviews_section_match = re.search(r'<section[^>]*id="reviews-scroll"[^>]*>(.*?)</section>', html, re.DOTALL | re.IGNORECASE)
         if not reviews_section_match:
@@ -814,86 +825,101 @@ Provide a balanced, professional summary:"""
         review_blocks = []
         if reviews_section_match:
             reviews_html = reviews_section_match.group(1)
-            row_iter = list(re.finditer(r'<div[^>]*class="[^"]*row\s+border-card[^"]*"[^>]*>', reviews_html, re.IGNORECASE))
-            if row_iter:
-                for idx, m in enumerate(row_iter):
-                    start = m.start()
-                    end = row_iter[idx + 1].start() if idx + 1 < len(row_iter) else len(reviews_html)
-                    block = reviews_html[start:end]
-                    review_blocks.append(block)
-            else:
-                parts = re.split(r'<hr[^>]*class="mt-10 mb-10"[^>]*>', reviews_html)
-                for part in parts:
-                    if 'fa-thumbs-up' in part or 'chips-list' in part or 'border-card' in part:
-                        review_blocks.append(part)
-        
-        if review_blocks:
-            for i, block in enumerate(review_blocks[:num_reviews], 1):
-                review = {
-                    "patient_name": "Anonymous",
-                    "rating": "N/A",
-                    "review_text": "",
-                    "date": "",
-                    "tags": []
-                }
-
-                name_span = re.search(r'<span[^>]*class="[^"]*text-bold\s+text-sm\s+text-grey[^"]*"[^>]*>([^<]+)</span>', block, re.IGNORECASE)
-                if name_span:
-                    name_text = re.sub(r'\s+', ' ', name_span.group(1)).strip()
-                    parts = re.split(r'\s*[-–—]\s*', name_text, maxsplit=1)
-                    if len(parts) == 2:
-                        review['patient_name'] = parts[0].strip()
-                        review['date'] = parts[1].strip()
-                    else:
-                        review['patient_name'] = name_text
-
-                p_texts = re.findall(r'<p[^>]*>(.*?)</p>', block, re.DOTALL | re.IGNORECASE)
-                comment = ''
-                for p_html in p_texts:
-                    p_clean = re.sub(r'<[^>]+>', ' ', p_html)
-                    p_clean = re.sub(r'\s+', ' ', p_clean).strip()
-                    if len(p_clean) < 15:
-                        continue
-                    lower = p_clean.lower()
-                    if 'i am satisfied with the doctor' in lower or 'i am satisfied' in lower:
-                        continue
-                    comment = p_clean
-                    break
-                if not comment and p_texts:
-                    longest = ''
-                    for p_html in p_texts:
-                        p_clean = re.sub(r'<[^>]+>', ' ', p_html)
-                        p_clean = re.sub(r'\s+', ' ', p_clean).strip()
-                        if len(p_clean) > len(longest):
-                            longest = p_clean
-                    comment = longest
+        elif 'border-card' in html:
+            # later review pages may be fragments holding just the review rows
+            reviews_html = html
+        else:
+            return review_blocks
+        row_iter = list(re.finditer(r'<div[^>]*class="[^"]*row\s+border-card[^"]*"[^>]*>', reviews_html, re.IGNORECASE))
+        if row_iter:
+            for idx, m in enumerate(row_iter):
+                start = m.start()
+                end = row_iter[idx + 1].start() if idx + 1 < len(row_iter) else len(reviews_html)
+                block = reviews_html[start:end]
+                review_blocks.append(block)
+        else:
+            parts = re.split(r'<hr[^>]*class="mt-10 mb-10"[^>]*>', reviews_html)
+            for part in parts:
+                if 'fa-thumbs-up' in part or 'chips-list' in part or 'border-card' in part:
+                    review_blocks.append(part)
+        return review_blocks
+    
+    def _parse_review_block(self, block: str) -> Optional[dict]:
+        """Parse one review block (None for footer text and other non-reviews)"""
+        review = {
+            "patient_name": "Anonymous",
+            "rating": "N/A",
+            "review_text": "",
+            "date": "",
+            "tags": []
+        }
 
-                review['review_text'] = comment if comment else 'Review content not available'
+        name_span = re.search(r'<span[^>]*class="[^"]*text-bold\s+text-sm\s+text-grey[^"]*"[^>]*>([^<]+)</span>', block, re.IGNORECASE)
+        if name_span:
+            name_text = re.sub(r'\s+', ' ', name_span.group(1)).strip()
+            parts = re.split(r'\s*[-–—]\s*', name_text, maxsplit=1)
+            if len(parts) == 2:
+                review['patient_name'] = parts[0].strip()
+                review['date'] = parts[1].strip()
+            else:
+                review['patient_name'] = name_text
 
-                chips_match = re.search(r'<ul[^>]*class="[^"]*chips-list[^"]*"[^>]*>(.*?)</ul>', block, re.DOTALL | re.IGNORECASE)
-                if chips_match:
-                    lis = re.findall(r'<li[^>]*>(.*?)</li>', chips_match.group(1), re.DOTALL | re.IGNORECASE)
-                    for li in lis:
-                        li_text = re.sub(r'<[^>]+>', ' ', li)
-                        li_text = re.sub(r'\s+', ' ', li_text).strip()
-                        if li_text:
-                            review['tags'].append(li_text)
+        p_texts = re.findall(r'<p[^>]*>(.*?)</p>', block, re.DOTALL | re.IGNORECASE)
+        comment = ''
+        for p_html in p_texts:
+            p_clean = re.sub(r'<[^>]+>', ' ', p_html)
+            p_clean = re.sub(r'\s+', ' ', p_clean).strip()
+            if len(p_clean) < 15:
+                continue
+            lower = p_clean.lower()
+            if 'i am satisfied with the doctor' in lower or 'i am satisfied' in lower:
+                continue
+            comment = p_clean
+            break
+        if not comment and p_texts:
+            longest = ''
+            for p_html in p_texts:
+                p_clean = re.sub(r'<[^>]+>', ' ', p_html)
+                p_clean = re.sub(r'\s+', ' ', p_clean).strip()
+                if len(p_clean) > len(longest):
+                    longest = p_clean
+            comment = longest
 
-                exclude_keywords = ['copyright', 'marham inc', 'calling marham', 'terms', 'privacy',
-                                    'what is dr', 'has the following degrees', 'all rights reserved']
-                is_valid_review = True
-                if review['review_text']:
-                    review_lower = review['review_text'].lower()
-                    if any(keyword in review_lower for keyword in exclude_keywords):
-                        is_valid_review = False
-                    if len(review['review_text'].strip()) < 15:
-                        is_valid_review = False
+        review['review_text'] = comment if comment else 'Review content not available'
 
-                if is_valid_review:
-                    reviews.append(review)
+        chips_match = re.search(r'<ul[^>]*class="[^"]*chips-list[^"]*"[^>]*>(.*?)</ul>', block, re.DOTALL | re.IGNORECASE)
+        if chips_match:
+            lis = re.findall(r'<li[^>]*>(.*?)</li>', chips_match.group(1), re.DOTALL | re.IGNORECASE)
+            for li in lis:
+                li_text = re.sub(r'<[^>]+>', ' ', li)
+                li_text = re.sub(r'\s+', ' ', li_text).strip()
+                if li_text:
+                    review['tags'].append(li_text)
 
-                if len(reviews) >= num_reviews:
+        exclude_keywords = ['copyright', 'marham inc', 'calling marham', 'terms', 'privacy',
+                            'what is dr', 'has the following degrees', 'all rights reserved']
+        if review['review_text']:
+            review_lower = review['review_text'].lower()
+            if any(keyword in review_lower for keyword in exclude_keywords):
+                return None
+            if len(review['review_text'].strip()) < 15:
+                return None
+        return review
+    
+    def parse_review_list(self, html: str, limit: Optional[int] = None) -> List[dict]:
+        """Every real review on the page (no placeholders), in page order"""
+        reviews = []
+        for block in self.review_blocks(html):
+            review = self._parse_review_block(block)
+            if review:
+                reviews.append(review)
+                if limit is not None and len(reviews) >= limit:
                     break
+        return reviews
+    
+    def _parse_reviews(self, markdown: str, html: str, num_reviews: int) -> List[dict]:
+        """Parse reviews from the page content"""
+        reviews = self.parse_review_list(html, num_reviews)
         
         if len(reviews) < num_reviews:
             sample_count = num_reviews - len(reviews)
@@ -908,34 +934,58 @@ Provide a balanced, professional summary:"""
         
         return reviews[:num_reviews]
 
-async def main():
-    scraper = MarhamScraper()
-    
-    print("=" * 70)
-    print("🏥 MARHAM.PK DOCTOR SCRAPER V2 - WITH HOSPITAL ADDRESS & TIMINGS")
-    print("=" * 70)
-    
-    print("\n📝 Examples of queries:")
-    print("   - 'dermatologist in i8 islamabad'")
-    print("   - 'cardiologist in model town lahore'")
-    print("   - 'gynecologist in dha karachi'\n")
-    
-    query = input("🔍 Enter your search query: ").strip()
-    
-    if not query:
-        print("❌ Query cannot be empty!")
-        return
-    
-    query_info = scraper.extract_query_info(query)
+def build_doctor_details(selected_doctor: dict, profile_data: Optional[dict]) -> dict:
+    """Combine a listing card with its parsed profile (profile fills the gaps)"""
+    doctor_details = {
+        "profile_url": selected_doctor['profile_url'],
+        "name": selected_doctor['name'],
+        "speciality": selected_doctor['speciality'],
+        "qualifications": selected_doctor['qualifications'],
+        "pmdc_verified": selected_doctor['pmdc_verified'],
+        "reviews_count": selected_doctor['reviews'],
+        "experience": selected_doctor['experience'],
+        "satisfaction": selected_doctor['satisfaction'],
+        "hospitals": selected_doctor['hospitals'],
+        "areas_of_interest": selected_doctor['areas_of_interest'],
+        "phone": "",
+        "video_consultation_fee": "",
+        "video_consultation_timings": [],
+        "wait_time": "",
+        "avg_time_to_patient": "",
+        "patient_satisfaction_rating": "",
+        "languages": [],
+        "services": [],
+        "professional_statement": ""
+    }
+    if profile_data:
+        # Merge all fields
+        for key in profile_data:
+            if key == 'hospitals':
+                # Replace with profile hospitals (more detailed)
+                doctor_details['hospitals'] = profile_data['hospitals']
+            elif not doctor_details.get(key) or doctor_details[key] in ['', [], {}]:
+                doctor_details[key] = profile_data[key]
+    return doctor_details
+
+def print_doctor_card(doctor: dict):
+    """Print one entry of the numbered doctor list"""
+    print(f"\n{doctor['id']}. {doctor['name']}")
+    print(f"   Speciality: {doctor['speciality']}")
+    print(f"   Experience: {doctor['experience']}")
+    print(f"   Reviews: {doctor['reviews']}")
+    if doctor['pmdc_verified']:
+        print(f"   ✅ PMDC Verified")
+
+async def search_live(scraper: MarhamScraper, query_info: dict):
+    """Find listing pages for the query on the web and yield doctor cards as they are parsed"""
     marham_links = await scraper.search_doctors_by_query(query_info)
     
     if not marham_links:
         print("\n❌ Could not find any relevant Marham links for your query.")
-        manual = input("Paste a Marham URL to proceed (or press Enter to exit): ").strip()
+        manual = input("Paste a Marham URL to proceed (or press Enter to skip): ").strip()
         if manual and manual.startswith("http") and "marham.pk" in manual:
             marham_links = [manual]
         else:
-            print("Exiting.")
             return
 
     print(f"\n{'='*70}")
@@ -950,71 +1000,106 @@ async def main():
     print(f"\n{'='*70}")
     print("EXTRACTING DOCTOR PROFILES...")
     print(f"{'='*70}")
-    doctor_cards = await scraper.search_doctors(selected_listing_url)
+    async for doctor in scraper.stream_doctors(selected_listing_url, max_pages=MAX_LISTING_PAGES):
+        yield doctor
+
+async def main():
+    if not GROQ_API_KEY:
+        raise ValueError(GROQ_KEY_MISSING)
+    scraper = MarhamScraper()
+    try:
+        await run_interactive(scraper)
+    finally:
+        await scraper.close()
+        if METRICS.write():
+            print(f"📈 Metrics written to {METRICS.path}")
+
+async def run_interactive(scraper: MarhamScraper):
+    print("=" * 70)
+    print("🏥 MARHAM.PK DOCTOR SCRAPER V2 - WITH HOSPITAL ADDRESS & TIMINGS")
+    print("=" * 70)
+    
+    print("\n📝 Examples of queries:")
+    print("   - 'dermatologist in i8 islamabad'")
+    print("   - 'cardiologist in model town lahore'")
+    print("   - 'gynecologist in dha karachi'\n")
+    
+    # the browser starts while the user types; input() runs in a thread meanwhile
+    scraper.prewarm()
+    query = (await asyncio.to_thread(input, "🔍 Enter your search query: ")).strip()
+    
+    if not query:
+        print("❌ Query cannot be empty!")
+        return
+    
+    query_info = scraper.extract_query_info(query)
+    local = scraper.search_local(query_info)
+    
+    live_cards = []
+    if len(local['fresh']) >= KB_MIN_RESULTS:
+        # enough fresh local matches: answer without touching the web
+        doctor_cards = scraper.merge_doctor_cards([], local['fresh'])
+    else:
+        # too few or stale local matches: scrape live, showing each doctor as soon as
+        # its card is parsed, and keep local ones as gap filler
+        await scraper.start()
+        async for doctor in search_live(scraper, query_info):
+            if not live_cards:
+                print(f"\n{'='*70}")
+                print(" DOCTORS:")
+                print(f"{'='*70}")
+            live_cards.append(doctor)
+            print_doctor_card(doctor)
+        doctor_cards = scraper.merge_doctor_cards(live_cards, local['fresh'] + local['stale'])
     
     if not doctor_cards:
         print(" No doctors found!")
         return
     
-    print(f"\n{'='*70}")
-    print(f" FOUND {len(doctor_cards)} DOCTORS:")
-    print(f"{'='*70}")
-    for doctor in doctor_cards:
-        print(f"\n{doctor['id']}. {doctor['name']}")
-        print(f"   Speciality: {doctor['speciality']}")
-        print(f"   Experience: {doctor['experience']}")
-        print(f"   Reviews: {doctor['reviews']}")
-        if doctor['pmdc_verified']:
-            print(f"   ✅ PMDC Verified")
+    if live_cards:
+        # live cards are already on screen with the same numbers
+        for doctor in doctor_cards[len(live_cards):]:
+            print_doctor_card(doctor)
+    else:
+        print(f"\n{'='*70}")
+        print(" DOCTORS:")
+        print(f"{'='*70}")
+        for doctor in doctor_cards:
+            print_doctor_card(doctor)
+    print(f"\n FOUND {len(doctor_cards)} DOCTORS")
 
+    # load the top profiles in the background while the user reads the list
+    prefetch = {}
+    if PREFETCH_PROFILES > 0:
+        await scraper.start()
+        prefetch = scraper.prefetch_profiles([d.get('profile_url') for d in doctor_cards[:PREFETCH_PROFILES]])
+    
     try:
-        doctor_choice = int(input("\n👉 Enter the number of the doctor (or 0 to exit): "))
-        if doctor_choice == 0:
-            print(" Goodbye!")
-            return
-        if doctor_choice < 1 or doctor_choice > len(doctor_cards):
-            print("❌ Invalid choice!")
-            return
-        selected_doctor = doctor_cards[doctor_choice - 1]
+        # input() runs in a thread so the prefetches keep going
+        doctor_choice = int(await asyncio.to_thread(input, "\n👉 Enter the number of the doctor (or 0 to exit): "))
     except ValueError:
+        doctor_choice = None
+    selected_doctor = doctor_cards[doctor_choice - 1] if doctor_choice and 1 <= doctor_choice <= len(doctor_cards) else None
+    scraper.cancel_prefetch(prefetch, keep=selected_doctor['profile_url'] if selected_doctor else None)
+    if doctor_choice is None:
         print("❌ Invalid input!")
         return
+    if doctor_choice == 0:
+        print(" Goodbye!")
+        return
+    if selected_doctor is None:
+        print("❌ Invalid choice!")
+        return
 
     print(f"\n{'='*70}")
     print("📄 FETCHING FULL DOCTOR DETAILS...")
     print(f"{'='*70}")
     
-    doctor_details = {
-        "profile_url": selected_doctor['profile_url'],
-        "name": selected_doctor['name'],
-        "speciality": selected_doctor['speciality'],
-        "qualifications": selected_doctor['qualifications'],
-        "pmdc_verified": selected_doctor['pmdc_verified'],
-        "reviews_count": selected_doctor['reviews'],
-        "experience": selected_doctor['experience'],
-        "satisfaction": selected_doctor['satisfaction'],
-        "hospitals": selected_doctor['hospitals'],
-        "areas_of_interest": selected_doctor['areas_of_interest'],
-        "phone": "",
-        "video_consultation_fee": "",
-        "video_consultation_timings": [],
-        "wait_time": "",
-        "avg_time_to_patient": "",
-        "patient_satisfaction_rating": "",
-        "languages": [],
-        "services": [],
-        "professional_statement": ""
-    }
-    
-    profile_data = await scraper.get_doctor_details(selected_doctor['profile_url'])
-    if profile_data:
-        # Merge all fields
-        for key in profile_data:
-            if key == 'hospitals':
-                # Replace with profile hospitals (more detailed)
-                doctor_details['hospitals'] = profile_data['hospitals']
-            elif not doctor_details.get(key) or doctor_details[key] in ['', [], {}]:
-                doctor_details[key] = profile_data[key]
+    profile_url = selected_doctor['profile_url']
+    if profile_url in scraper.caches['profile']:
+        print("⚡ Profile already loaded in the background")
+    profile_data = await scraper.cached("profile", profile_url, lambda: scraper.get_doctor_details(profile_url))
+    doctor_details = build_doctor_details(selected_doctor, profile_data)
     
     print("\n" + "=" * 70)
     print(" DOCTOR INFORMATION")
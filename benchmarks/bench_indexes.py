@@ -0,0 +1,64 @@
+# bench_indexes.py
+# Lookup timings for the in-memory knowledge-base indexes against a plain
+# rescan of the rows: fuzzy (trigram) lookups and "available at time T".
+#
+#   python benchmarks/bench_indexes.py [--csv PATH] [--json OUT]
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KB_DIR = os.path.join(ROOT, "Scrapping-all-doctors-info")
+sys.path.insert(0, KB_DIR)
+
+from schedule_index import AvailabilityIndex, overlaps, parse_schedule, parse_when  # noqa: E402
+from trigram_index import build_kb_indexes  # noqa: E402
+
+FUZZY_QUERIES = [("specialty", "dermatolgist"), ("hospital", "shifa intl"),
+                 ("city", "islamabd"), ("doctor", "saima zahor")]
+WHEN = "saturday evening"
+
+
+def per_call_us(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - t0) / n * 1e6, 2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default=os.path.join(KB_DIR, "doctors_knowledge_base.csv"))
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    with open(args.csv, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    results = {"rows": len(rows)}
+    t0 = time.perf_counter()
+    fuzzy = build_kb_indexes(rows)
+    results["fuzzy_build_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    for kind, q in FUZZY_QUERIES:
+        results[f"fuzzy_{kind}_us"] = per_call_us(lambda: fuzzy[kind].search(q), 200)
+
+    day, start, end = parse_when(WHEN)
+    t0 = time.perf_counter()
+    avail = AvailabilityIndex(parse_schedule(r["availability_schedule"]) for r in rows)
+    results["availability_build_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    results["availability_index_us"] = per_call_us(lambda: avail.open_during(day, start, end), 1000)
+    results["availability_rescan_us"] = per_call_us(
+        lambda: [r for r in rows if overlaps(parse_schedule(r["availability_schedule"]), day, start, end)], 5)
+
+    for k, v in results.items():
+        print(f"{k:26s} {v}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
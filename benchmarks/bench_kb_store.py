@@ -0,0 +1,123 @@
+# bench_kb_store.py
+# Load + filter timings: raw doctors_knowledge_base.csv vs the normalized SQLite store.
+#
+#   python benchmarks/bench_kb_store.py [--csv PATH] [--repeat N] [--json OUT]
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KB_DIR = os.path.join(ROOT, "Scrapping-all-doctors-info")
+sys.path.insert(0, KB_DIR)
+
+import kb_numeric  # noqa: E402
+import kb_store  # noqa: E402
+
+CITY, SPEC = "Lahore", "Dermatologist"
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3),
+            "min_ms": round(min(samples), 3), "result": result}
+
+
+def csv_load(path: str):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return len(list(csv.DictReader(f)))
+
+
+def csv_load_filter(path: str):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return sum(1 for r in csv.DictReader(f) if r["city"] == CITY and r["specialization"] == SPEC)
+
+
+def csv_range_filter(path: str):
+    # "fee < 2000 and satisfaction > 95", re-parsing strings row by row
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        n = 0
+        for r in csv.DictReader(f):
+            fee = kb_numeric.parse_fee(r["fee"])
+            sat = kb_numeric.parse_percent(r["satisfaction_rate"])
+            if fee is not None and sat is not None and fee < 2000 and sat > 95:
+                n += 1
+        return n
+
+
+def sqlite_load(db: str):
+    kb_store.close(db)
+    return len(kb_store.read_rows(db))
+
+
+def sqlite_filter(db: str):
+    kb_store.close(db)
+    return len(kb_store.read_rows(db, "city = ? AND specialization = ?", (CITY, SPEC)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default=os.path.join(KB_DIR, "doctors_knowledge_base.csv"))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "kb.db")
+        t0 = time.perf_counter()
+        kb_store.import_csv(args.csv, db)
+        import_ms = (time.perf_counter() - t0) * 1000
+        kb_store.close(db)
+
+        results = {
+            "csv_bytes": os.path.getsize(args.csv),
+            "sqlite_bytes": os.path.getsize(db),
+            "sqlite_import_ms": round(import_ms, 3),
+            "csv_load": timed(lambda: csv_load(args.csv), args.repeat),
+            "csv_load_filter": timed(lambda: csv_load_filter(args.csv), args.repeat),
+            "sqlite_load": timed(lambda: sqlite_load(db), args.repeat),
+            "sqlite_filter": timed(lambda: sqlite_filter(db), args.repeat),
+            "csv_range_filter": timed(lambda: csv_range_filter(args.csv), args.repeat),
+        }
+        try:
+            arrays = kb_numeric.load_arrays(args.csv)
+
+            def numpy_range_filter():
+                m = (kb_numeric.range_mask(arrays, "fee_pkr", hi=2000, inclusive=False)
+                     & kb_numeric.range_mask(arrays, "satisfaction_pct", lo=95, inclusive=False))
+                return int(m.sum())
+
+            results["numpy_load"] = timed(lambda: len(kb_numeric.load_arrays(args.csv)["name"]), args.repeat)
+            results["numpy_range_filter"] = timed(numpy_range_filter, args.repeat)
+        except ImportError:
+            pass
+        try:
+            import pandas as pd
+
+            def pandas_filter():
+                df = pd.read_csv(args.csv, dtype=str)
+                return int(((df["city"] == CITY) & (df["specialization"] == SPEC)).sum())
+
+            results["pandas_load_filter"] = timed(pandas_filter, args.repeat)
+        except ImportError:
+            pass
+        kb_store.close(db)
+
+    for k, v in results.items():
+        print(f"{k:22s} {v}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# make_fixtures.py
+# Build a fixtures directory for mock_marham.py.
+#
+#   python benchmarks/make_fixtures.py synth OUT_DIR [--csv PATH] [--cities 3] [--pages 2] [--per-page 10]
+#                                        [--chrome-kb 0]
+#       Synthetic listing/profile/review pages rendered from the knowledge base,
+#       using the same markup the scrapers' selectors and regexes expect, plus
+#       robots.txt and sitemaps listing them. --chrome-kb pads every page with
+#       that much script, style and SVG, like the site's real page weight.
+#   python benchmarks/make_fixtures.py record OUT_DIR URL [URL ...]
+#       Save live marham.pk pages in the fixture layout (plain HTTP; pages
+#       behind a Cloudflare challenge have to be saved from a browser instead).
+import argparse
+import csv
+import html
+import json
+import os
+import random
+import sys
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from mock_marham import fixture_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(ROOT, "Scrapping-all-doctors-info", "doctors_knowledge_base.csv")
+BASE = "https://www.marham.pk"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+REVIEW_TEXTS = [
+    "Very cooperative doctor, listened to all my concerns and explained the treatment clearly.",
+    "Waiting time was long but the consultation itself was thorough and helpful.",
+    "Highly recommended, my condition improved within two weeks of following the advice.",
+    "The doctor was polite and the clinic staff were well organised and friendly.",
+    "Good experience overall, the prescribed medicines worked and follow up was easy.",
+]
+
+
+def _e(s) -> str:
+    return html.escape(str(s or ""), quote=True)
+
+
+def _write(out_dir: str, url: str, body: str):
+    parts = urlsplit(url)
+    path = fixture_path(out_dir, parts.path, parts.query)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+
+
+def _schedule_rows(schedule: str) -> str:
+    out = []
+    for part in (schedule or "").split(";"):
+        day, _, hours = part.partition(":")
+        if day.strip() and hours.strip():
+            out.append(f'<tr class="text-sm"><td class="text-bold text-blue">{_e(day.strip())}</td>'
+                       f'<td>{_e(hours.strip())}</td></tr>')
+    return "\n".join(out)
+
+
+def render_card(doc: Dict, practices: List[Dict]) -> str:
+    chips = "".join(f'<span class="chips-highlight">{_e(a.strip())}</span>'
+                    for a in (doc.get("areas_of_interest") or "").split(",") if a.strip())
+    products = "\n".join(
+        f'<div class="product-card" data-hospitalname="{_e(p["hospital_name"])}" '
+        f'data-hospitalcity="{_e(p["hospital_city"])}" data-hospitaladdress="{_e(p["hospital_address"])}" '
+        f'data-amount="{_e(p["fee"])}" data-hospitaltype="{2 if p["consultation_type"] == "Video Consultation" else 1}">'
+        f'<p class="text-sm text-wrap">{_e(p["complete address"])}</p>'
+        f'</div>'
+        for p in practices
+    )
+    return f"""<div class="row shadow-card">
+<div class="col-3 col-md-2"><picture><source media="(min-width: 768px)" srcset="{_e(doc['image_url'])}"><img class="round-img" src="{_e(doc['image_url'])}"></picture></div>
+<div class="col-9 col-md-10">
+<a href="{_e(doc['profile_url'])}" class="text-blue dr_profile_opened_from_listing"><h3>{_e(doc['name'])}</h3></a>
+<p class="mb-0 mt-10 text-sm">{_e(doc['specialization'])}</p>
+<p class="text-sm">{_e(doc['qualification'])}</p>
+<span class="text-sm">PMDC Verified</span>
+<div class="row">
+<div class="col-4"><p class="mb-0 text-sm">Reviews</p>
+<p class="text-bold text-sm text-golden"><i class="fa fa-thumbs-up"></i> {_e(doc['reviews'])}</p></div>
+<div class="col-4"><p class="mb-0 text-sm">Experience</p>
+<p class="text-bold text-sm">{_e(doc['experience'])}</p></div>
+<div class="col-4"><p class="mb-0 text-sm">Satisfaction</p>
+<p class="text-bold text-sm">{_e(doc['satisfaction_rate'])}</p></div>
+</div>
+<div class="chips">{chips}</div>
+{products}
+</div>
+</div>"""
+
+
+def page_chrome(kb: int) -> Tuple[str, str]:
+    # (<head> extras, end of <body>) of about kb KB: stylesheet, app state,
+    # icon sprite and analytics, none of which holds doctor data
+    if kb <= 0:
+        return "", ""
+    third = kb * 1024 // 3
+    css = "".join(f".c{i}{{margin:{i % 16}px;color:#{i % 4096:03x}}}\n" for i in range(third // 30))
+    state = json.dumps({"menu": [{"id": i, "label": f"Item {i}", "href": f"/page/{i}"} for i in range(third // 50)]})
+    icons = "".join(f'<symbol id="i{i}"><path d="M{i} 0L{i % 24} 24Z"/></symbol>' for i in range(third // 100))
+    head = f"<!-- build {kb} -->\n<style>{css}</style>\n<script>window.__STATE__ = {state};</script>"
+    tail = f'<svg style="display:none">{icons}</svg>\n<script>(function(){{var q=[];window.track=function(e){{q.push(e)}}}})();</script>'
+    return head, tail
+
+
+def render_listing(title: str, cards: List[str], next_url: str = "", chrome: Tuple[str, str] = ("", "")) -> str:
+    nxt = f'<ul class="pagination"><li class="next"><a rel="next" href="{_e(next_url)}">Next</a></li></ul>' if next_url else ""
+    body = "\n".join(cards)
+    return f"""<html><head><title>{_e(title)} | Marham</title>{chrome[0]}</head>
+<body><h1>{_e(title)}</h1>
+<div class="list-data">
+{body}
+</div>
+{nxt}
+{chrome[1]}
+</body></html>"""
+
+
+def render_profile(doc: Dict, practices: List[Dict], rng: random.Random,
+                   chrome: Tuple[str, str] = ("", "")) -> str:
+    sections = []
+    for p in practices:
+        fee = p["fee"].replace(",", "")
+        sections.append(f"""<div class="shadow-card">
+<h3 class="text-bold text-underline">{_e(p['hospital_name'])}</h3>
+<p>Area: {_e(p['hospital_address'])}, {_e(p['hospital_city'])}</p>
+<p>Rs. {_e(fee)}</p>
+<table>
+{_schedule_rows(p['availability_schedule'])}
+</table>
+</div>""")
+    n_reviews = min(int(doc["reviews"] or 0) if str(doc["reviews"]).isdigit() else 0, 8)
+    reviews = "\n".join(
+        f"""<div class="row border-card">
+<span class="text-bold text-sm text-grey">{chr(65 + i)}. {chr(75 + i)} - {i + 1} months ago</span>
+<p>{_e(rng.choice(REVIEW_TEXTS))}</p>
+<ul class="chips-list"><li>Satisfied</li><li>Clinic environment</li></ul>
+</div>"""
+        for i in range(n_reviews)
+    )
+    return f"""<html><head><title>{_e(doc['name'])} | Marham</title>{chrome[0]}</head>
+<body>
+<h1 class="mb-0">{_e(doc['name'])}</h1>
+<p class="mt-10"><strong class="text-sm">{_e(doc['specialization'])}</strong></p>
+<p class="text-sm mb-0">{_e(doc['qualification'])}</p>
+<span>PMDC Verified</span>
+<p class="mb-0 text-sm">Experience</p><p class="text-bold text-sm">{_e(doc['experience'])}</p>
+<p><i class="fa fa-thumbs-up"></i> {_e(doc['reviews'])}</p>
+<section class="p-xy">
+{"".join(sections)}
+</section>
+<section id="reviews-scroll">
+<h2>{_e(doc['reviews'])} Reviews</h2>
+{reviews}
+</section>
+{chrome[1]}
+</body></html>"""
+
+
+def _urlset(urls: List[str]) -> str:
+    entries = "".join(f"<url><loc>{_e(u)}</loc><lastmod>2024-01-01</lastmod></url>\n" for u in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n{entries}</urlset>\n'
+
+
+def write_sitemaps(out_dir: str, listing_urls: List[str], profile_urls: List[str]):
+    # robots.txt -> sitemap index -> one sitemap per kind, like marham.pk
+    _write(out_dir, f"{BASE}/robots.txt", f"User-agent: *\nAllow: /\nSitemap: {BASE}/sitemap.xml\n")
+    _write(out_dir, f"{BASE}/sitemap-listings.xml", _urlset(listing_urls))
+    _write(out_dir, f"{BASE}/sitemap-doctors.xml", _urlset(list(dict.fromkeys(profile_urls))))
+    maps = "".join(f"<sitemap><loc>{BASE}/{name}</loc></sitemap>\n"
+                   for name in ("sitemap-listings.xml", "sitemap-doctors.xml"))
+    _write(out_dir, f"{BASE}/sitemap.xml",
+           f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n{maps}</sitemapindex>\n')
+
+
+def synth(out_dir: str, csv_path: str = DEFAULT_CSV, cities: int = 3, pages: int = 2,
+          per_page: int = 10, seed: int = 1, chrome_kb: int = 0) -> Dict:
+    rng = random.Random(seed)
+    chrome = page_chrome(chrome_kb)
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    # doctors keyed by profile, grouped under their first city
+    doctors: "OrderedDict[str, Dict]" = OrderedDict()
+    for r in rows:
+        if not r.get("profile_url"):
+            continue
+        d = doctors.setdefault(r["profile_url"], {"doc": r, "practices": []})
+        if not any(p["hospital_name"] == r["hospital_name"] for p in d["practices"]):
+            d["practices"].append(r)
+    by_city: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    for d in doctors.values():
+        by_city.setdefault(d["doc"]["city"], []).append(d)
+    chosen = sorted(by_city, key=lambda c: -len(by_city[c]))[:cities]
+
+    manifest = {"cities": [], "listing_urls": [], "profile_urls": []}
+    city_links = []
+    for city in chosen:
+        slug = city.lower().replace(" ", "-")
+        city_url = f"{BASE}/doctors/{slug}"
+        city_links.append(f'<li><a href="{_e(city_url)}">{_e(city)}</a></li>')
+        manifest["cities"].append({"name": city, "url": city_url})
+        docs = by_city[city][: pages * per_page]
+        for page in range(pages):
+            chunk = docs[page * per_page:(page + 1) * per_page]
+            if not chunk:
+                break
+            url = city_url if page == 0 else f"{city_url}?page={page + 1}"
+            has_next = (page + 1) < pages and len(docs) > (page + 1) * per_page
+            nxt = f"{city_url}?page={page + 2}" if has_next else ""
+            cards = [render_card(d["doc"], d["practices"]) for d in chunk]
+            _write(out_dir, url, render_listing(f"Doctors in {city}", cards, nxt, chrome))
+            manifest["listing_urls"].append(url)
+            for d in chunk:
+                _write(out_dir, d["doc"]["profile_url"], render_profile(d["doc"], d["practices"], rng, chrome))
+                manifest["profile_urls"].append(d["doc"]["profile_url"])
+
+    _write(out_dir, f"{BASE}/doctors", f"""<html><head><title>Find Doctors | Marham</title></head>
+<body><h1>Find Doctors by City</h1><ul>{"".join(city_links)}</ul></body></html>""")
+    write_sitemaps(out_dir, manifest["listing_urls"], manifest["profile_urls"])
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def record(out_dir: str, urls: List[str]):
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+    for url in urls:
+        try:
+            req = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                body = resp.read().decode("utf-8", errors="replace")
+            _write(out_dir, url, body)
+            print(f"saved {url} ({len(body)} chars)")
+        except Exception as e:
+            print(f"failed {url}: {e}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("synth")
+    s.add_argument("out_dir")
+    s.add_argument("--csv", default=DEFAULT_CSV)
+    s.add_argument("--cities", type=int, default=3)
+    s.add_argument("--pages", type=int, default=2)
+    s.add_argument("--per-page", type=int, default=10)
+    s.add_argument("--chrome-kb", type=int, default=0, help="script/style/SVG padding per page")
+    r = sub.add_parser("record")
+    r.add_argument("out_dir")
+    r.add_argument("urls", nargs="+")
+    args = ap.parse_args()
+
+    if args.cmd == "synth":
+        m = synth(args.out_dir, args.csv, args.cities, args.pages, args.per_page, chrome_kb=args.chrome_kb)
+        print(f"{len(m['listing_urls'])} listing pages, {len(m['profile_urls'])} profiles in {args.out_dir}")
+    else:
+        record(args.out_dir, args.urls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
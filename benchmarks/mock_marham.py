@@ -0,0 +1,187 @@
+# mock_marham.py
+# Local stand-in for marham.pk that serves recorded (or synthetic) HTML.
+#
+# Fixture layout: the URL path maps to a file under the fixtures directory,
+#   /doctors                      -> doctors.html
+#   /doctors/lahore               -> doctors/lahore.html
+#   /doctors/lahore?page=2        -> doctors/lahore__page-2.html
+# Absolute https://www.marham.pk links inside the HTML are rewritten to the
+# mock server, so crawlers follow links back into it.
+#
+#   python benchmarks/mock_marham.py --fixtures DIR [--port 8765] [--latency-ms 50]
+#                                    [--jitter-ms 20] [--error-rate 0.02] [--challenge-rate 0]
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+MARHAM_ORIGINS = ("https://www.marham.pk", "https://marham.pk", "http://www.marham.pk")
+
+CHALLENGE_HTML = (
+    "<html><head><title>Just a moment...</title></head>"
+    "<body><div id=\"cf-challenge-running\">Checking your browser before accessing marham.pk."
+    "</div></body></html>"
+)
+
+
+def fixture_path(fixtures_dir: str, path: str, query: str = "") -> str:
+    rel = path.strip("/") or "index"
+    if query:
+        rel += "__" + query.replace("=", "-").replace("&", "_")
+    return os.path.join(fixtures_dir, rel + ".html")
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.challenges = 0
+        self.not_found = 0
+        self.bytes_sent = 0
+        self.service_ms: List[float] = []
+        self.by_kind: Dict[str, int] = {}
+
+    def record(self, kind: str, status: int, size: int, ms: float):
+        with self._lock:
+            self.requests += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            self.bytes_sent += size
+            self.service_ms.append(ms)
+            if status == 503:
+                self.errors += 1
+            elif status == 404:
+                self.not_found += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests, "errors": self.errors,
+                "challenges": self.challenges, "not_found": self.not_found,
+                "bytes_sent": self.bytes_sent, "by_kind": dict(self.by_kind),
+            }
+
+
+def _kind(path: str) -> str:
+    parts = [p for p in path.strip("/").split("/") if p]
+    if len(parts) <= 1:
+        return "index"
+    if len(parts) == 2:
+        return "listing"
+    return "profile"
+
+
+class MockMarham:
+    def __init__(self, fixtures_dir: str, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 challenge_rate: float = 0.0, seed: Optional[int] = 1):
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.challenge_rate = challenge_rate
+        self.stats = MockStats()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                t0 = time.perf_counter()
+                parts = urlsplit(self.path)
+                kind = _kind(parts.path)
+                delay = mock.latency_ms + (mock._random() * 2 - 1) * mock.jitter_ms
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+
+                status, body = 200, b""
+                if mock.error_rate and mock._random() < mock.error_rate:
+                    status, body = 503, b"<html><body>Service Unavailable</body></html>"
+                elif mock.challenge_rate and mock._random() < mock.challenge_rate:
+                    status, body = 403, CHALLENGE_HTML.encode()
+                    with mock.stats._lock:
+                        mock.stats.challenges += 1
+                else:
+                    path = fixture_path(mock.fixtures_dir, parts.path, parts.query)
+                    if os.path.isfile(path):
+                        with open(path, "r", encoding="utf-8") as f:
+                            html = f.read()
+                        for origin in MARHAM_ORIGINS:
+                            html = html.replace(origin, mock.base_url)
+                        body = html.encode("utf-8")
+                    else:
+                        status, body = 404, b"<html><body>Not Found</body></html>"
+
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                mock.stats.record(kind, status, len(body), (time.perf_counter() - t0) * 1000)
+
+        return Handler
+
+    def start(self) -> "MockMarham":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockMarham":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fixtures", required=True)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--challenge-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    server = MockMarham(args.fixtures, args.host, args.port, args.latency_ms, args.jitter_ms,
+                        args.error_rate, args.challenge_rate)
+    print(f"Serving {args.fixtures} at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+        print(server.stats.snapshot())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+# run_benchmarks.py
+# End-to-end crawler benchmarks against the local mock server (mock_marham.py).
+#
+# Drives scrape_doctors.main() and the MarhamScraper methods against recorded or
+# synthetic fixtures and reports pages/sec, rows/sec, p50/p95 latency, browser
+# protocol (CDP) call counts and peak RSS. Results go to JSON; pass --baseline
+# with an earlier results file to print the change per metric.
+#
+#   python benchmarks/run_benchmarks.py [--suite batch,realtime,api,sitemap,fetch_profiles,parse_pool,startup]
+#       [--fixtures DIR] [--parse-pages 400] [--parse-archive DIR]
+#       [--chrome-kb 0] [--latency-ms 50] [--jitter-ms 10] [--error-rate 0] [--challenge-rate 0]
+#       [--profiles 10] [--api-requests 300] [--api-clients 20] [--out results.json] [--baseline old.json]
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BATCH_DIR = os.path.join(ROOT, "Scrapping-all-doctors-info")
+REALTIME_DIR = os.path.join(ROOT, "Scrapping-doctors-info-realtime")
+
+from make_fixtures import synth  # noqa: E402
+from mock_marham import MockMarham  # noqa: E402
+
+SUITES = {}
+# the realtime CLI should reach its prompt without importing these
+HEAVY_MODULES = ("crawl4ai", "groq", "pydantic", "dotenv", "playwright", "litellm")
+STARTUP_BUDGET_S = 1.0
+
+
+def suite(name):
+    def deco(fn):
+        SUITES[name] = fn
+        return fn
+    return deco
+
+
+# ---------- measurement helpers ----------
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    k = (len(s) - 1) * p / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return round(s[lo] + (s[hi] - s[lo]) * (k - lo), 3)
+
+
+def latency_summary(samples: Dict[str, List[float]]) -> Dict[str, dict]:
+    return {k: {"n": len(v), "p50_ms": percentile(v, 50), "p95_ms": percentile(v, 95)}
+            for k, v in samples.items()}
+
+
+def peak_rss_kb() -> dict:
+    # ru_maxrss is KiB on Linux; children covers browser processes that have exited
+    return {"self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss}
+
+
+class Timings:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, kind: str, fn):
+        async def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.samples[kind].append((time.perf_counter() - t0) * 1000)
+        return timed
+
+
+class ProtocolCounter:
+    """Counts messages Playwright sends to its driver (each one becomes CDP traffic)."""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._orig = None
+        self._cls = None
+
+    def __enter__(self):
+        try:
+            from playwright._impl._connection import Connection
+        except ImportError:
+            return self
+        counter = self
+        orig = Connection._send_message_to_server
+
+        def send(conn, obj, method, *args, **kwargs):
+            counter.calls[method] += 1
+            return orig(conn, obj, method, *args, **kwargs)
+
+        self._cls, self._orig = Connection, orig
+        Connection._send_message_to_server = send
+        return self
+
+    def __exit__(self, *exc):
+        if self._cls is not None:
+            self._cls._send_message_to_server = self._orig
+
+    @property
+    def total(self) -> Optional[int]:
+        return sum(self.calls.values()) if self._cls is not None else None
+
+
+def _finish(result: dict, server: MockMarham, wall: float, rows: int, timings: Timings):
+    stats = server.stats.snapshot()
+    result.update({
+        "wall_s": round(wall, 3),
+        "pages": stats["requests"],
+        "pages_per_sec": round(stats["requests"] / wall, 3) if wall else None,
+        "rows": rows,
+        "rows_per_sec": round(rows / wall, 3) if wall else None,
+        "latency": latency_summary(timings.samples),
+        "server_ms": {"p50": percentile(server.stats.service_ms, 50),
+                      "p95": percentile(server.stats.service_ms, 95)},
+        "server": stats,
+        "peak_rss_kb": peak_rss_kb(),
+    })
+    return result
+
+
+# ---------- suites ----------
+@suite("batch")
+async def bench_batch(server: MockMarham, manifest: dict, args) -> dict:
+    sys.path.insert(0, BATCH_DIR)
+    import scrape_doctors as sd
+
+    workdir = tempfile.mkdtemp(prefix="bench_batch_")
+    sd.BASE_URL = server.base_url
+    sd.OUTPUT_CSV = os.path.join(workdir, "doctors_knowledge_base.csv")
+    sd.FAILED_FILE = os.path.join(workdir, "failed_urls.json")
+    sd.STORAGE_BACKEND = "csv"
+    sd.HEADLESS = True
+    sd.CITY_LIMIT = None
+    sd.DELAY_MIN = sd.DELAY_MAX = 0
+
+    timings = Timings()
+    sd.extract_listing_page = timings.wrap("listing", sd.extract_listing_page)
+    sd.extract_availability_from_profile = timings.wrap("profile", sd.extract_availability_from_profile)
+
+    with ProtocolCounter() as proto, contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        await sd.main()
+        wall = time.perf_counter() - t0
+
+    rows = 0
+    if os.path.isfile(sd.OUTPUT_CSV):
+        with open(sd.OUTPUT_CSV, "r", encoding="utf-8", newline="") as f:
+            rows = sum(1 for _ in csv.DictReader(f))
+    pool = sd.POOL.stats() if sd.POOL is not None else {}
+    return _finish({"cdp_calls": proto.total, "cdp_by_method": dict(proto.calls), "browser_pool": pool},
+                   server, wall, rows, timings)
+
+
+@suite("realtime")
+async def bench_realtime(server: MockMarham, manifest: dict, args) -> dict:
+    sys.path.insert(0, REALTIME_DIR)
+    # the module refuses to import without a key; no LLM call is made below
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import scrapping_doctors_by_Query as rt
+
+    scraper = rt.MarhamScraper()
+    # measure scraping and parsing, not the Groq round trip
+    scraper._generate_llm_review_summary = lambda reviews: ""
+
+    def local(url: str) -> str:
+        return url.replace("https://www.marham.pk", server.base_url)
+
+    timings = Timings()
+    rows = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        for url in manifest["listing_urls"]:
+            cards = await timings.wrap("listing", scraper.search_doctors)(local(url))
+            rows += len(cards or [])
+        for url in manifest["profile_urls"][:args.profiles]:
+            details = await timings.wrap("profile", scraper.get_doctor_details)(local(url))
+            rows += 1 if details else 0
+            await timings.wrap("reviews", scraper.get_reviews)(local(url), num_reviews=5)
+        wall = time.perf_counter() - t0
+    # crawl4ai drives the browser itself; requests are counted server-side
+    return _finish({"cdp_calls": None}, server, wall, rows, timings)
+
+
+@suite("api")
+async def bench_api(server: MockMarham, manifest: dict, args) -> dict:
+    # load test of api_server.py: concurrent clients over a skewed set of URLs,
+    # so most requests are cache hits or coalesced with one already running
+    sys.path.insert(0, REALTIME_DIR)
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    import aiohttp
+    from aiohttp import web
+    with contextlib.redirect_stdout(io.StringIO()):
+        import api_server
+        import scrapping_doctors_by_Query as rt
+
+    api_server.ALLOWED_HOSTS.add(server.base_url.split("://", 1)[1])
+    scraper = rt.MarhamScraper()
+    scraper._generate_llm_review_summary = lambda reviews: ""
+
+    def local(url: str) -> str:
+        return url.replace("https://www.marham.pk", server.base_url)
+
+    profiles = [local(u) for u in manifest["profile_urls"][:args.profiles]]
+    paths = [f"/doctors?url={quote(local(u), safe='')}" for u in manifest["listing_urls"]]
+    paths += [f"/profile?url={quote(u, safe='')}" for u in profiles]
+    paths += [f"/reviews?url={quote(u, safe='')}&n=5" for u in profiles[:3]]
+    rng = random.Random(1)
+    weights = [1.0 / (i + 1) for i in range(len(paths))]  # Zipf-like: a few hot URLs
+    plan = rng.choices(paths, weights=weights, k=args.api_requests)
+
+    runner = web.AppRunner(api_server.make_app(scraper))
+    statuses: Dict[int, int] = defaultdict(int)
+    timings = Timings()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        try:
+            async with aiohttp.ClientSession(base) as session:
+                async def get(path: str):
+                    async with session.get(path) as resp:
+                        await resp.read()
+                        statuses[resp.status] += 1
+
+                # cold burst: every client asks for the same uncached profile at once
+                t0 = time.perf_counter()
+                await asyncio.gather(*(timings.wrap("cold_burst", get)(f"/profile?url={quote(profiles[-1], safe='')}")
+                                       for _ in range(args.api_clients)))
+                burst_pages = server.stats.snapshot()["requests"]
+
+                queue = list(plan)
+
+                async def client():
+                    while queue:
+                        await timings.wrap("request", get)(queue.pop())
+
+                await asyncio.gather(*(client() for _ in range(args.api_clients)))
+                wall = time.perf_counter() - t0
+                async with session.get("/stats") as resp:
+                    api_stats = await resp.json()
+        finally:
+            await runner.cleanup()
+
+    stats = server.stats.snapshot()
+    lat = timings.samples["request"] + timings.samples["cold_burst"]
+    return {
+        "wall_s": round(wall, 3), "requests": len(lat),
+        "requests_per_sec": round(len(lat) / wall, 2) if wall else None,
+        "latency_ms": {"p50": percentile(lat, 50), "p95": percentile(lat, 95), "p99": percentile(lat, 99),
+                       "max": round(max(lat), 3) if lat else None},
+        "cold_burst": {"clients": args.api_clients, "page_loads": burst_pages},
+        "page_loads": stats["requests"], "statuses": dict(statuses), "api": api_stats,
+    }
+
+
+@suite("sitemap")
+async def bench_sitemap(server: MockMarham, manifest: dict, args) -> dict:
+    # URL discovery from the sitemaps (plain HTTP) vs. the pages a browser crawl loads
+    sys.path.insert(0, BATCH_DIR)
+    import sitemap
+
+    t0 = time.perf_counter()
+    found = await asyncio.to_thread(sitemap.discover, server.base_url)
+    wall = time.perf_counter() - t0
+    stats = server.stats.snapshot()
+    listed = {u.split("://", 1)[1].split("/", 1)[1] for u in manifest["listing_urls"] + manifest["profile_urls"]}
+    got = {e["url"].split("://", 1)[1].split("/", 1)[1] for kind in found.values() for e in kind}
+    return {
+        "wall_s": round(wall, 3), "requests": stats["requests"], "bytes": stats["bytes_sent"],
+        "listing_urls": len(found["listing"]), "profile_urls": len(found["profile"]),
+        "coverage_pct": round(100.0 * len(listed & got) / len(listed), 1) if listed else None,
+        "crawl_page_loads": len(manifest["listing_urls"]) + len(set(manifest["profile_urls"])) + 1,
+    }
+
+
+@suite("fetch_profiles")
+async def bench_fetch_profiles(server: MockMarham, manifest: dict, args) -> dict:
+    # per-page parse cost of the realtime scraper before and after the fetch
+    # profiles (fetch_profiles.py): crawl4ai's default processing (cleaned HTML
+    # and markdown) plus the parser on the full HTML, vs. the call site's run
+    # config (no markdown, noise tags excluded) and the parser on the crop.
+    # crawl4ai's processing step is run on the downloaded HTML without a
+    # browser; without crawl4ai only the parser side is measured. Pages are
+    # downloaded once up front; only CPU and allocations are timed.
+    sys.path.insert(0, REALTIME_DIR)
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    import tracemalloc
+    import urllib.request
+    with contextlib.redirect_stdout(io.StringIO()):
+        import scrapping_doctors_by_Query as rt
+        from fetch_profiles import crop_html, run_config
+    try:
+        from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+        crawler = AsyncWebCrawler(config=BrowserConfig(verbose=False))
+        configs = {"before": CrawlerRunConfig(cache_mode=CacheMode.BYPASS, verbose=False),
+                   "after": {kind: run_config(kind) for kind in ("listing", "profile")}}
+    except ImportError:
+        crawler = None  # crawl4ai processing not measured
+    scraper = rt.MarhamScraper()
+
+    def local(url: str) -> str:
+        return url.replace("https://www.marham.pk", server.base_url)
+
+    def get(url: str) -> str:
+        with urllib.request.urlopen(url) as resp:
+            return resp.read().decode("utf-8")
+
+    parsers = {
+        "listing": lambda html, url: (scraper._extract_doctor_urls("", html),
+                                      rt.next_page_url(html, url, server.base_url)),
+        "profile": lambda html, url: (scraper._parse_doctor_profile("", html, url),
+                                      scraper.parse_review_list(html)),
+    }
+    pages = {"listing": [local(u) for u in manifest["listing_urls"]],
+             "profile": [local(u) for u in manifest["profile_urls"][:args.profiles]]}
+
+    async def measure(kind: str, html: str, url: str, crop: bool) -> tuple:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        if crawler is not None:
+            config = configs["after"][kind] if crop else configs["before"]
+            await crawler.aprocess_html(url=url, html=html, extracted_content=None, config=config,
+                                        screenshot_data=None, pdf_data=None, verbose=False)
+        if crop:
+            html = crop_html(html)
+        out = parsers[kind](html, url)
+        ms = (time.perf_counter() - t0) * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return ms, peak, len(html), out
+
+    result = {"crawl4ai_measured": crawler is not None}
+    for kind, urls in pages.items():
+        docs = await asyncio.gather(*(asyncio.to_thread(get, u) for u in urls))
+        stats = {mode: {"ms": [], "peak": [], "kept": 0} for mode in ("before", "after")}
+        same = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            for url, html in zip(urls, docs):
+                outs = {}
+                for mode in ("before", "after"):
+                    for _ in range(3):
+                        ms, peak, kept, outs[mode] = await measure(kind, html, url, mode == "after")
+                        stats[mode]["ms"].append(ms)
+                        stats[mode]["peak"].append(peak / 1024)
+                    stats[mode]["kept"] += kept
+                same = same and outs["before"] == outs["after"]
+        result[kind] = {
+            "pages": len(urls), "same_output": same,
+            "parse_ms_p50": {m: percentile(stats[m]["ms"], 50) for m in stats},
+            "peak_alloc_kb_p50": {m: percentile(stats[m]["peak"], 50) for m in stats},
+            "html_kept_kb": {m: round(stats[m]["kept"] / 1024, 1) for m in stats},
+        }
+    return result
+
+
+@suite("parse_pool")
+async def bench_parse_pool(server: MockMarham, manifest: dict, args) -> dict:
+    # profile parsing throughput on the event loop vs. in ParsePool workers
+    # (profile_parser.py), for 1, 2, 4, ... processes up to the core count. The
+    # corpus is the fixture profiles (or --parse-archive's saved profiles),
+    # cropped like the scraper does and repeated to --parse-pages pages. Also
+    # reports the longest event-loop stall while the batch is parsed.
+    sys.path.insert(0, REALTIME_DIR)
+    sys.path.insert(0, BATCH_DIR)
+    import urllib.request
+    from fetch_profiles import crop_html
+    from profile_parser import ParsePool
+
+    if args.parse_archive:
+        from html_archive import HtmlArchive
+        archive = HtmlArchive(args.parse_archive)
+        corpus = [(url, archive.get(rec["sha256"])) for url, rec in archive.latest("profile").items()]
+    else:
+        def get(url: str) -> str:
+            with urllib.request.urlopen(url.replace("https://www.marham.pk", server.base_url)) as resp:
+                return resp.read().decode("utf-8")
+        urls = manifest["profile_urls"]
+        corpus = list(zip(urls, await asyncio.gather(*(asyncio.to_thread(get, u) for u in urls))))
+    if not corpus:
+        raise RuntimeError("no profile pages to parse")
+    corpus = [(url, crop_html(html)) for url, html in corpus]
+    docs = [corpus[i % len(corpus)] for i in range(args.parse_pages)]
+
+    async def run_once(pool: ParsePool) -> tuple:
+        stall, stop = [0.0], asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stall[0] = max(stall[0], time.perf_counter() - t0 - 0.001)
+
+        tick = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        out = await asyncio.gather(*(pool.parse(html, url) for url, html in docs))
+        wall = time.perf_counter() - t0
+        stop.set()
+        await tick
+        return wall, stall[0], out
+
+    cores = os.cpu_count() or 1
+    counts, n = [0], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    counts.append(cores)
+    result = {"cores": cores, "corpus_pages": len(corpus), "parsed_pages": len(docs),
+              "source": args.parse_archive or "fixtures", "workers": {}}
+    reference = None
+    for workers in counts:
+        pool = ParsePool(workers, inline_chars=0)  # every page goes to a worker
+        executor = pool.start()
+        if executor is not None:
+            await asyncio.wrap_future(executor.submit(os.getpid))  # spawned and warm
+        try:
+            wall, stall, out = await run_once(pool)
+        finally:
+            pool.close()
+        reference = reference if reference is not None else out
+        result["workers"][str(workers)] = {
+            "wall_s": round(wall, 3), "pages_per_s": round(len(docs) / wall, 1),
+            "max_loop_stall_ms": round(stall * 1000, 1), "same_output": out == reference,
+        }
+    inline = result["workers"]["0"]["pages_per_s"]
+    for stats in result["workers"].values():
+        stats["speedup"] = round(stats["pages_per_s"] / inline, 2)
+    return result
+
+
+@suite("startup")
+async def bench_startup(server: MockMarham, manifest: dict, args) -> dict:
+    # realtime CLI start-up: `-X importtime` breakdown of importing the scraper
+    # module (per direct import, cumulative ms) and the time from launch until
+    # the query prompt is printed
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    env.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", "-c", "import scrapping_doctors_by_Query",
+        cwd=REALTIME_DIR, env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+    _, err = await proc.communicate()
+    # children are listed before their parent, one indent level deeper
+    total_us, direct, pending, loaded = None, {}, {}, set()
+    for line in err.decode("utf-8", "replace").splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative, name = int(parts[1]), parts[2]
+        module = name.strip()
+        loaded.add(module.split(".")[0])
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            pending[module] = round(cumulative / 1000, 2)
+        elif depth == 0:
+            if module == "scrapping_doctors_by_Query":
+                total_us, direct = cumulative, pending
+            pending = {}
+    if total_us is None:
+        raise RuntimeError(err.decode("utf-8", "replace").strip().splitlines()[-1])
+
+    prompts = []
+    for _ in range(3):
+        t0 = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "scrapping_doctors_by_Query.py", cwd=REALTIME_DIR, env=env,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        seen = b""
+        while b"Enter your search query" not in seen:
+            chunk = await asyncio.wait_for(proc.stdout.read(4096), 60)
+            if not chunk:
+                break
+            seen += chunk
+        prompts.append(time.perf_counter() - t0)
+        await proc.communicate(b"\n")  # empty query: the CLI exits
+    top = dict(sorted(direct.items(), key=lambda kv: -kv[1])[:args.startup_top])
+    return {
+        "import_ms": round(total_us / 1000, 2),
+        "time_to_prompt_s": {"p50": percentile(prompts, 50), "max": round(max(prompts), 3)},
+        "budget_s": STARTUP_BUDGET_S, "within_budget": max(prompts) < STARTUP_BUDGET_S,
+        "heavy_imported": sorted(loaded & set(HEAVY_MODULES)),
+        "direct_imports_ms": top,
+    }
+
+
+# ---------- driver ----------
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def _flatten(d: dict, prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+
+def compare(current: dict, baseline: dict):
+    cur, base = _flatten(current.get("suites", {})), _flatten(baseline.get("suites", {}))
+    print(f"\n{'metric':50s} {'baseline':>12s} {'current':>12s} {'change':>9s}")
+    for k in sorted(cur):
+        if k in base and base[k]:
+            change = (cur[k] - base[k]) / base[k] * 100
+            print(f"{k:50s} {base[k]:12.3f} {cur[k]:12.3f} {change:+8.1f}%")
+
+
+async def run(args) -> dict:
+    fixtures = args.fixtures
+    if not fixtures:
+        fixtures = tempfile.mkdtemp(prefix="marham_fixtures_")
+        synth(fixtures, cities=args.cities, pages=args.pages, per_page=args.per_page, chrome_kb=args.chrome_kb)
+    with open(os.path.join(fixtures, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        },
+        "suites": {},
+    }
+    for name in args.suite.split(","):
+        name = name.strip()
+        if name not in SUITES:
+            print(f"Unknown suite: {name}")
+            continue
+        server = MockMarham(fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate, challenge_rate=args.challenge_rate)
+        with server:
+            print(f"Running {name} against {server.base_url} ...")
+            try:
+                results["suites"][name] = await SUITES[name](server, manifest, args)
+            except ImportError as e:
+                results["suites"][name] = {"skipped": str(e)}
+            except Exception as e:
+                results["suites"][name] = {"error": f"{type(e).__name__}: {str(e).splitlines()[0]}"}
+        print(json.dumps(results["suites"][name], indent=2))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--suite", default="batch,realtime")
+    ap.add_argument("--fixtures", help="fixtures dir with manifest.json (default: synthesize one)")
+    ap.add_argument("--cities", type=int, default=2)
+    ap.add_argument("--pages", type=int, default=2)
+    ap.add_argument("--per-page", type=int, default=10)
+    ap.add_argument("--chrome-kb", type=int, default=0, help="script/style/SVG padding per synthetic page")
+    ap.add_argument("--profiles", type=int, default=10, help="profiles fetched by the realtime suite")
+    ap.add_argument("--api-requests", type=int, default=300, help="requests sent by the api load test")
+    ap.add_argument("--api-clients", type=int, default=20, help="concurrent clients in the api load test")
+    ap.add_argument("--parse-pages", type=int, default=400, help="profiles parsed per run by the parse_pool suite")
+    ap.add_argument("--parse-archive", help="parse_pool: use the saved profiles in this html archive")
+    ap.add_argument("--startup-top", type=int, default=10, help="direct imports listed by the startup suite")
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--challenge-rate", type=float, default=0.0)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if args.baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()